@@ -1,6 +1,7 @@
 from rest_framework import serializers
 from django.contrib.auth import get_user_model, authenticate
 from django.contrib.auth.password_validation import validate_password
+from pokopini.serializers import SparseFieldsetsMixin
 from .models import Address
 
 User = get_user_model()
@@ -95,7 +96,7 @@ class LoginSerializer(serializers.Serializer):
         return attrs
 
 
-class UserProfileSerializer(serializers.ModelSerializer):
+class UserProfileSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای نمایش و ویرایش پروفایل کاربر
     """
@@ -105,7 +106,7 @@ class UserProfileSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'username', 'date_joined']
 
 
-class AddressSerializer(serializers.ModelSerializer):
+class AddressSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای مدیریت آدرس‌های کاربر
     """
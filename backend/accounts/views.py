@@ -4,6 +4,7 @@ from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
 from rest_framework_simplejwt.tokens import RefreshToken
 from django.contrib.auth import authenticate
+from orders.guest_cart import merge_guest_cart
 from .models import Address, User
 from .serializers import RegisterSerializer, LoginSerializer, UserProfileSerializer, AddressSerializer
 
@@ -23,12 +24,15 @@ class RegisterView(generics.CreateAPIView):
         # ایجاد JWT token برای کاربر جدید
         refresh = RefreshToken.for_user(user)
         
-        return Response({
+        response = Response({
             'user': UserProfileSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
             'message': 'ثبت‌نام با موفقیت انجام شد.'
         }, status=status.HTTP_201_CREATED)
+        # سبد مهمان (اگر باشد) به سبد کاربر منتقل می‌شود
+        merge_guest_cart(request, response, user)
+        return response
 
 
 class LoginView(generics.GenericAPIView):
@@ -47,12 +51,15 @@ class LoginView(generics.GenericAPIView):
         # ایجاد JWT token
         refresh = RefreshToken.for_user(user)
 
-        return Response({
+        response = Response({
             'user': UserProfileSerializer(user).data,
             'refresh': str(refresh),
             'access': str(refresh.access_token),
             'message': 'ورود با موفقیت انجام شد.'
         }, status=status.HTTP_200_OK)
+        # سبد مهمان (اگر باشد) به سبد کاربر منتقل می‌شود
+        merge_guest_cart(request, response, user)
+        return response
 
 
 class ProfileView(generics.RetrieveUpdateAPIView):
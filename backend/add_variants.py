@@ -17,30 +17,9 @@ if product:
     sizes = ['newborn', '0-3m', '3-6m', '6-9m', '9-12m', '12-18m', '18-24m', 
              '2y', '3y', '4y', '5y', '6y', '7y', '8y', '9y', '10y', '11y', '12y']
     
-    variants_data = []
-    for color in colors:
-        for size in sizes:
-            variants_data.append({
-                'color': color,
-                'size': size,
-                'stock': 10  # موجودی پیش‌فرض
-            })
-    
-    for variant_data in variants_data:
-        variant, created = ProductVariant.objects.get_or_create(
-            product=product,
-            color=variant_data['color'],
-            size=variant_data['size'],
-            defaults={
-                'price': product.price,
-                'stock': variant_data['stock'],
-                'is_active': True
-            }
-        )
-        if created:
-            print(f"✓ ایجاد شد: {variant}")
-        else:
-            print(f"- قبلاً وجود داشت: {variant}")
+    # همه ترکیب‌ها با یک خواندن و یک bulk_create ساخته می‌شوند
+    created, skipped = product.create_variant_matrix(colors, sizes, stock=10)
+    print(f"✓ {created} تنوع ایجاد شد، {skipped} تنوع قبلاً وجود داشت")
     
     print(f"\nتعداد کل variants: {product.variants.count()}")
 else:
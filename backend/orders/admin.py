@@ -9,7 +9,7 @@ class CartItemInline(admin.TabularInline):
     """Inline برای نمایش آیتم‌های سبد خرید"""
     model = CartItem
     extra = 0
-    readonly_fields = ['product', 'quantity', 'subtotal', 'created_at']
+    readonly_fields = ['product', 'variant', 'quantity', 'subtotal', 'created_at']
     can_delete = False
 
 
@@ -0,0 +1,388 @@
+# نگهداری سبد خرید داغ بیرون از دیتابیس (CART_BACKEND)
+#
+#   db      (پیش‌فرض) هر تغییر مستقیم روی جدول‌های Cart/CartItem
+#   redis   هر سبد یک hash در Redis:  cart:<user_id> = {variant_id: تعداد, _cart, _created, _updated}
+#   locmem  همان رفتار در حافظه‌ی همین پردازه (توسعه و تست، بدون Redis)
+#
+# تغییرات سبد با HINCRBY/HDEL اتمیک روی hash انجام می‌شوند و شناسه‌ی کاربر در
+# مجموعه‌ی cart:dirty ثبت می‌شود. نوشتن در دیتابیس بعداً انجام می‌شود (write-behind):
+# با دستور flush_carts (دوره‌ای، مثلاً هر دقیقه با cron) و همیشه پیش از ثبت سفارش.
+# قیمت، موجودی و خروجی محصول هر تنوع از cache نسخه‌دار کاتالوگ خوانده می‌شود، پس
+# نمایش و تغییر سبد گرم هیچ query دیتابیسی ندارد. در این حالت شناسه‌ی هر قلم سبد
+# (id و آدرس‌های update/remove) همان شناسه‌ی تنوع است.
+
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.signals import setting_changed
+from django.db import transaction
+from django.dispatch import receiver
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from pokopini.fast_serializers import toman
+from products.cache import CATALOG_CACHE_TIMEOUT, catalog_cache_key
+from products.fast_serializers import ProductListFastSerializer
+from products.models import ProductVariant
+from products.serializers import ProductListSerializer
+from .models import Cart, CartItem
+
+DIRTY_KEY = 'cart:dirty'
+META_CART = '_cart'
+META_CREATED = '_created'
+META_UPDATED = '_updated'
+
+
+def load_cart(user_id):
+    """({variant_id: تعداد}, متادیتا) سبد کاربر از دیتابیس - برای بارگذاری اولیه‌ی store"""
+    cart, created = Cart.objects.get_or_create(user_id=user_id)
+    items = dict(CartItem.objects.filter(cart=cart).values_list('variant_id', 'quantity'))
+    meta = {
+        META_CART: cart.pk,
+        META_CREATED: cart.created_at.isoformat(),
+        META_UPDATED: cart.updated_at.isoformat(),
+    }
+    return items, meta
+
+
+def cart_from_meta(meta):
+    """
+    نمونه‌ی ذخیره‌نشده‌ی Cart برای خروجی (شناسه و تاریخ‌ها)؛
+    سبد مهمان (orders/guest_cart.py) متادیتا ندارد
+    """
+    return Cart(
+        pk=int(meta[META_CART]) if META_CART in meta else None,
+        created_at=parse_datetime(meta[META_CREATED]) if META_CREATED in meta else None,
+        updated_at=parse_datetime(meta[META_UPDATED]) if META_UPDATED in meta else None,
+    )
+
+
+class RedisCartStore:
+    """
+    هر سبد یک hash در Redis؛ تغییرات با HINCRBY و در یک MULTI همراه با ثبت در cart:dirty
+    """
+
+    # HSET فقط اگر قلم هنوز در سبد باشد (به‌روزرسانی تعداد، بدون زنده کردن قلم حذف‌شده)
+    SET_IF_EXISTS = """
+    if redis.call('HEXISTS', KEYS[1], ARGV[1]) == 1 then
+        redis.call('HSET', KEYS[1], ARGV[1], ARGV[2])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, client=None, ttl=None):
+        if client is None:
+            import redis
+            client = redis.Redis.from_url(settings.CART_REDIS_URL, decode_responses=True)
+        self.client = client
+        self.ttl = ttl or settings.CART_STORE_TTL
+        self._set_if_exists = self.client.register_script(self.SET_IF_EXISTS)
+
+    def _key(self, user_id):
+        return f'cart:{user_id}'
+
+    def _ensure_loaded(self, user_id):
+        key = self._key(user_id)
+        if self.client.exists(key):
+            return
+        items, meta = load_cart(user_id)
+        # HSETNX: اگر درخواست همزمان دیگری زودتر بارگذاری و تغییر داده باشد، بازنویسی نمی‌شود
+        pipe = self.client.pipeline()
+        for field, value in {**meta, **items}.items():
+            pipe.hsetnx(key, field, value)
+        pipe.expire(key, self.ttl)
+        pipe.execute()
+
+    def _touch(self, pipe, user_id):
+        pipe.hset(self._key(user_id), META_UPDATED, timezone.now().isoformat())
+        pipe.expire(self._key(user_id), self.ttl)
+        pipe.sadd(DIRTY_KEY, user_id)
+
+    @staticmethod
+    def _parse(raw):
+        items, meta = {}, {}
+        for field, value in raw.items():
+            if field.startswith('_'):
+                meta[field] = value
+            elif int(value) > 0:
+                items[int(field)] = int(value)
+        return items, meta
+
+    def get(self, user_id):
+        """({variant_id: تعداد}, متادیتا)"""
+        self._ensure_loaded(user_id)
+        return self._parse(self.client.hgetall(self._key(user_id)))
+
+    def incr(self, user_id, variant_id, quantity):
+        """افزایش اتمیک تعداد یک تنوع؛ تعداد جدید"""
+        self._ensure_loaded(user_id)
+        pipe = self.client.pipeline()
+        pipe.hincrby(self._key(user_id), variant_id, quantity)
+        self._touch(pipe, user_id)
+        return pipe.execute()[0]
+
+    def set(self, user_id, variant_id, quantity):
+        """تعیین تعداد یک قلم موجود در سبد؛ False اگر قلم در سبد نباشد"""
+        self._ensure_loaded(user_id)
+        if not self._set_if_exists(keys=[self._key(user_id)], args=[variant_id, quantity]):
+            return False
+        pipe = self.client.pipeline()
+        self._touch(pipe, user_id)
+        pipe.execute()
+        return True
+
+    def remove(self, user_id, variant_id):
+        """حذف یک قلم؛ False اگر در سبد نبود"""
+        self._ensure_loaded(user_id)
+        pipe = self.client.pipeline()
+        pipe.hdel(self._key(user_id), variant_id)
+        self._touch(pipe, user_id)
+        return bool(pipe.execute()[0])
+
+    def clear(self, user_id):
+        self._ensure_loaded(user_id)
+        fields = [field for field in self.client.hkeys(self._key(user_id)) if not field.startswith('_')]
+        pipe = self.client.pipeline()
+        if fields:
+            pipe.hdel(self._key(user_id), *fields)
+        self._touch(pipe, user_id)
+        pipe.execute()
+
+    def snapshot(self, user_id):
+        """وضعیت فعلی سبد بدون بارگذاری از دیتابیس؛ None اگر سبد در store نباشد"""
+        raw = self.client.hgetall(self._key(user_id))
+        return self._parse(raw) if raw else None
+
+    def invalidate(self, user_id):
+        """حذف سبد از store (بعد از تغییر مستقیم جدول‌ها)؛ بار بعد از دیتابیس خوانده می‌شود"""
+        self.client.delete(self._key(user_id))
+
+    def mark_dirty(self, user_id):
+        self.client.sadd(DIRTY_KEY, user_id)
+
+    def discard_dirty(self, user_id):
+        self.client.srem(DIRTY_KEY, user_id)
+
+    def pop_dirty(self, count):
+        return [int(user_id) for user_id in self.client.spop(DIRTY_KEY, count) or ()]
+
+
+class LocMemCartStore:
+    """
+    جایگزین درون‌پردازه‌ای RedisCartStore با همان رفتار؛ بین پردازه‌ها مشترک نیست
+    """
+
+    def __init__(self):
+        self._carts = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+
+    def _cart(self, user_id):
+        cart = self._carts.get(user_id)
+        if cart is None:
+            items, meta = load_cart(user_id)
+            cart = self._carts.setdefault(user_id, (items, {key: str(value) for key, value in meta.items()}))
+        return cart
+
+    def _touch(self, user_id):
+        self._carts[user_id][1][META_UPDATED] = timezone.now().isoformat()
+        self._dirty.add(user_id)
+
+    def get(self, user_id):
+        items, meta = self._cart(user_id)
+        with self._lock:
+            return {pk: qty for pk, qty in items.items() if qty > 0}, dict(meta)
+
+    def incr(self, user_id, variant_id, quantity):
+        items, meta = self._cart(user_id)
+        with self._lock:
+            items[variant_id] = items.get(variant_id, 0) + quantity
+            self._touch(user_id)
+            return items[variant_id]
+
+    def set(self, user_id, variant_id, quantity):
+        items, meta = self._cart(user_id)
+        with self._lock:
+            if variant_id not in items:
+                return False
+            items[variant_id] = quantity
+            self._touch(user_id)
+            return True
+
+    def remove(self, user_id, variant_id):
+        items, meta = self._cart(user_id)
+        with self._lock:
+            removed = items.pop(variant_id, None) is not None
+            self._touch(user_id)
+            return removed
+
+    def clear(self, user_id):
+        items, meta = self._cart(user_id)
+        with self._lock:
+            items.clear()
+            self._touch(user_id)
+
+    def snapshot(self, user_id):
+        with self._lock:
+            if user_id not in self._carts:
+                return None
+            items, meta = self._carts[user_id]
+            return {pk: qty for pk, qty in items.items() if qty > 0}, dict(meta)
+
+    def invalidate(self, user_id):
+        with self._lock:
+            self._carts.pop(user_id, None)
+
+    def mark_dirty(self, user_id):
+        with self._lock:
+            self._dirty.add(user_id)
+
+    def discard_dirty(self, user_id):
+        with self._lock:
+            self._dirty.discard(user_id)
+
+    def pop_dirty(self, count):
+        with self._lock:
+            popped = [self._dirty.pop() for _ in range(min(count, len(self._dirty)))]
+        return popped
+
+
+CART_STORES = {
+    'redis': RedisCartStore,
+    'locmem': LocMemCartStore,
+}
+
+_stores = {}
+
+
+def get_cart_store():
+    """store سبد بر اساس CART_BACKEND؛ None برای 'db' (بدون store)"""
+    backend = settings.CART_BACKEND
+    if backend == 'db':
+        return None
+    if backend not in _stores:
+        _stores[backend] = CART_STORES[backend]()
+    return _stores[backend]
+
+
+@receiver(setting_changed)
+def _reset_cart_stores(setting, **kwargs):
+    if setting.startswith('CART_'):
+        _stores.clear()
+
+
+# ----- نوشتن در دیتابیس (write-behind) -----
+
+def _write_cart(cart_id, items):
+    """جایگزینی اقلام سبد در دیتابیس با وضعیت store؛ یک تراکنش و یک upsert گروهی"""
+    # تنوع‌های حذف‌شده کنار گذاشته می‌شوند؛ محصول هر قلم هم از همین query است
+    products = dict(
+        ProductVariant._base_manager.filter(pk__in=items.keys()).values_list('pk', 'product_id')
+    )
+    with transaction.atomic():
+        CartItem.objects.filter(cart_id=cart_id).exclude(variant_id__in=products.keys()).delete()
+        CartItem.objects.bulk_create(
+            [
+                CartItem(cart_id=cart_id, variant_id=pk, product_id=products[pk], quantity=qty)
+                for pk, qty in items.items() if pk in products
+            ],
+            update_conflicts=True,
+            unique_fields=['cart', 'variant'],
+            update_fields=['quantity'],
+        )
+        Cart.objects.filter(pk=cart_id).update(updated_at=timezone.now())
+
+
+def flush_cart(store, user_id):
+    """
+    نوشتن سبد یک کاربر از store در دیتابیس؛ False اگر سبد در store نباشد.
+    کاربر پیش از خواندن از cart:dirty برداشته می‌شود تا تغییر همزمان دوباره ثبتش کند
+    """
+    store.discard_dirty(user_id)
+    try:
+        state = store.snapshot(user_id)
+        if state is None or META_CART not in state[1]:
+            return False
+        items, meta = state
+        _write_cart(int(meta[META_CART]), items)
+    except Exception:
+        store.mark_dirty(user_id)
+        raise
+    return True
+
+
+def flush_dirty_carts(store, batch_size=500):
+    """نوشتن همه‌ی سبدهای تغییرکرده؛ تعداد سبدهای نوشته‌شده"""
+    flushed = 0
+    while True:
+        user_ids = store.pop_dirty(batch_size)
+        if not user_ids:
+            return flushed
+        for index, user_id in enumerate(user_ids):
+            try:
+                flushed += flush_cart(store, user_id)
+            except Exception:
+                # بقیه‌ی این دسته برای اجرای بعدی در cart:dirty می‌مانند
+                for pending in user_ids[index + 1:]:
+                    store.mark_dirty(pending)
+                raise
+
+
+# ----- قیمت و خروجی اقلام از cache کاتالوگ -----
+
+def variant_fragments(variant_ids):
+    """
+    {variant_id: ردیف قلم سبد} با قیمت، موجودی و خروجی کامل محصول هر تنوع فعال از
+    cache نسخه‌دار کاتالوگ (با هر تغییر تنوع‌ها یا محصولات بی‌اعتبار می‌شود)؛
+    تنوع‌های غایب با یک query تنوع و یک query محصول خوانده می‌شوند.
+    مثل CartSerializer بدون request ساخته می‌شوند (آدرس نسبی تصاویر)
+    """
+    keys = {pk: catalog_cache_key('cart-variant', pk) for pk in variant_ids}
+    cached = cache.get_many(keys.values())
+    fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in keys if pk not in fragments]
+    if missing:
+        rows = [
+            {
+                'variant_id': row['id'], 'product_id': row['product_id'], 'variant__color': row['color'],
+                'variant__size': row['size'], 'variant__stock': row['stock'], 'price_toman': row['price_toman'],
+            }
+            for row in ProductVariant.objects.filter(
+                pk__in=missing, is_active=True, product__is_active=True
+            ).values('id', 'product_id', 'color', 'size', 'stock', price_toman=toman('price'))
+        ]
+        products = ProductListFastSerializer(ProductListSerializer().fields).by_id(
+            row['product_id'] for row in rows
+        ) if rows else {}
+        loaded = {row['variant_id']: {**row, 'product': products[row['product_id']]} for row in rows}
+        cache.set_many({keys[pk]: row for pk, row in loaded.items()}, CATALOG_CACHE_TIMEOUT)
+        fragments.update(loaded)
+    return fragments
+
+
+def discard_variant_fragments(variant_ids):
+    """حذف قطعه‌های سبدِ تنوع‌ها (مثلاً بعد از کم شدن موجودی با ثبت سفارش)"""
+    cache.delete_many([catalog_cache_key('cart-variant', pk) for pk in variant_ids])
+
+
+def represent_cart(fast, items, meta):
+    """
+    خروجی سبد store با CartFastSerializer (fast): {variant_id: تعداد} + قطعه‌های کاتالوگ
+    """
+    fragments = variant_fragments(sorted(items))
+    product_fields = fast.product_field_names
+    rows, products = [], {}
+    for pk in sorted(items):
+        fragment = fragments.get(pk)
+        if fragment is None:
+            # تنوع غیرفعال یا حذف‌شده؛ هنگام ثبت سفارش خطای همان قلم را می‌گیرد
+            continue
+        rows.append({**fragment, 'id': pk, 'quantity': items[pk], 'created_at': None})
+        if product_fields is not None:
+            products[fragment['product_id']] = {
+                name: fragment['product'][name] for name in product_fields
+            }
+    return fast.represent(cart_from_meta(meta), rows, products)
@@ -0,0 +1,170 @@
+from pokopini.fast_serializers import choice_labels, format_datetime, format_toman, readable_fields, toman
+from products.fast_serializers import COLOR_LABELS, SIZE_LABELS, ProductListFastSerializer
+from .models import CartItem, Order, OrderItem
+from .serializers import jalali_datetime
+
+STATUS_LABELS = choice_labels(Order.STATUS_CHOICES)
+
+
+def _nested_fields(fields, name):
+    """فیلدهای serializer تو در تو (بعد از ?fields= / ?omit=) یا None اگر خواسته نشده باشد"""
+    field = fields.get(name)
+    if field is None or field.write_only:
+        return None
+    return getattr(field, 'child', field).fields
+
+
+class CartFastSerializer:
+    """
+    معادل سریع CartSerializer: اقلام با .values() و محصولات با یک query
+    fields: CartSerializer(...).fields
+    """
+
+    def __init__(self, fields, request=None):
+        self.fields = fields
+        self.item_fields = _nested_fields(fields, 'items')
+        self.variant_fields = _nested_fields(self.item_fields or {}, 'variant')
+        product_fields = _nested_fields(self.item_fields or {}, 'product')
+        self.products = (
+            ProductListFastSerializer(product_fields, request) if product_fields is not None else None
+        )
+
+    def _variant_getters(self):
+        getters = {
+            'id': lambda row: row['variant_id'],
+            'color': lambda row: row['variant__color'],
+            'color_display': lambda row: COLOR_LABELS.get(row['variant__color'], row['variant__color']),
+            'size': lambda row: row['variant__size'],
+            'size_display': lambda row: SIZE_LABELS.get(row['variant__size'], row['variant__size']),
+            'price': lambda row: format_toman(row['price_toman']),
+            'stock': lambda row: row['variant__stock'],
+            'is_in_stock': lambda row: row['variant__stock'] > 0,
+        }
+        return [(name, getters[name]) for name in readable_fields(self.variant_fields or {})]
+
+    @property
+    def product_field_names(self):
+        """فیلدهای خواسته‌شده‌ی محصول هر قلم، یا None اگر محصول خواسته نشده باشد"""
+        return self.products.field_names if self.products is not None else None
+
+    def rows(self, cart):
+        """ردیف اقلام سبد؛ قیمت و موجودی تنوع همه‌ی اقلام در یک query"""
+        return list(
+            CartItem.objects.filter(cart_id=cart.pk).values(
+                'id', 'product_id', 'variant_id', 'variant__color', 'variant__size', 'variant__stock',
+                'quantity', 'created_at', price_toman=toman('variant__price'),
+            )
+        )
+
+    def _item_getters(self, products):
+        variant_getters = self._variant_getters()
+        getters = {
+            'id': lambda row: row['id'],
+            'product': lambda row: products[row['product_id']],
+            'variant': lambda row: {name: getter(row) for name, getter in variant_getters},
+            'quantity': lambda row: row['quantity'],
+            'unit_price': lambda row: format_toman(row['price_toman']),
+            'subtotal': lambda row: format_toman(row['price_toman'] * row['quantity']),
+            'created_at': lambda row: format_datetime(row['created_at']),
+        }
+        return [(name, getters[name]) for name in readable_fields(self.item_fields or {})]
+
+    def to_representation(self, cart):
+        rows = self.rows(cart)
+        products = {}
+        if self.products is not None and rows:
+            products = self.products.by_id(row['product_id'] for row in rows)
+        return self.represent(cart, rows, products)
+
+    def represent(self, cart, rows, products):
+        """
+        خروجی سبد از ردیف‌های اقلام و {product_id: خروجی محصول}
+        (ردیف‌ها از دیتابیس یا از cart_store)
+        """
+        item_getters = self._item_getters(products)
+        getters = {
+            'id': lambda: cart.pk,
+            'items': lambda: [{name: getter(row) for name, getter in item_getters} for row in rows],
+            'total_price': lambda: format_toman(sum(row['price_toman'] * row['quantity'] for row in rows)),
+            'items_count': lambda: sum(row['quantity'] for row in rows),
+            'created_at': lambda: format_datetime(cart.created_at),
+            'updated_at': lambda: format_datetime(cart.updated_at),
+        }
+        return {name: getters[name]() for name in readable_fields(self.fields)}
+
+
+class OrderFastSerializer:
+    """
+    معادل سریع OrderSerializer برای لیست سفارش‌ها روی ردیف‌های .values()
+    fields: OrderSerializer(...).fields
+    """
+
+    def __init__(self, fields, request=None):
+        self.fields = fields
+        self.item_fields = _nested_fields(fields, 'items')
+        product_fields = _nested_fields(self.item_fields or {}, 'product')
+        self.products = (
+            ProductListFastSerializer(product_fields, request) if product_fields is not None else None
+        )
+
+    VALUES = [
+        'id', 'user_id', 'address_id', 'status', 'shipping_method', 'payment_status',
+        'payment_ref_id', 'payment_date', 'created_at', 'updated_at',
+    ]
+
+    def values(self, queryset):
+        names = self.VALUES + (['user__username'] if 'user_username' in self.fields else [])
+        return queryset.values(
+            *names,
+            total_price_toman=toman('total_price'),
+            shipping_cost_toman=toman('shipping_cost'),
+        )
+
+    def _items(self, order_ids):
+        """{order_id: [خروجی اقلام]} با یک query برای اقلام و یک query برای محصولات"""
+        if self.item_fields is None:
+            return {}
+        rows = list(
+            OrderItem.objects.filter(order_id__in=order_ids)
+            .values('id', 'order_id', 'product_id', 'variant_id', 'quantity', price_toman=toman('price'))
+        )
+        products = {}
+        if self.products is not None and rows:
+            products = self.products.by_id(row['product_id'] for row in rows)
+        getters = {
+            'id': lambda row: row['id'],
+            'product': lambda row: products[row['product_id']],
+            'variant': lambda row: row['variant_id'],
+            'quantity': lambda row: row['quantity'],
+            'price': lambda row: format_toman(row['price_toman']),
+            'subtotal': lambda row: format_toman(row['price_toman'] * row['quantity']),
+        }
+        getters = [(name, getters[name]) for name in readable_fields(self.item_fields)]
+        items = {order_id: [] for order_id in order_ids}
+        for row in rows:
+            items[row['order_id']].append({name: getter(row) for name, getter in getters})
+        return items
+
+    def many(self, rows):
+        items = self._items([row['id'] for row in rows])
+        getters = {
+            'id': lambda row: row['id'],
+            'user': lambda row: row['user_id'],
+            'user_username': lambda row: row['user__username'],
+            'address': lambda row: row['address_id'],
+            'status': lambda row: row['status'],
+            'status_display': lambda row: STATUS_LABELS.get(row['status'], row['status']),
+            'total_price': lambda row: format_toman(row['total_price_toman']),
+            'shipping_method': lambda row: row['shipping_method'],
+            'shipping_cost': lambda row: format_toman(row['shipping_cost_toman']),
+            'payment_status': lambda row: row['payment_status'],
+            'payment_ref_id': lambda row: row['payment_ref_id'],
+            'payment_date': lambda row: format_datetime(row['payment_date']),
+            'items': lambda row: items[row['id']],
+            'created_at': lambda row: format_datetime(row['created_at']),
+            'created_at_jalali': lambda row: jalali_datetime(row['created_at']),
+            'updated_at': lambda row: format_datetime(row['updated_at']),
+            'updated_at_jalali': lambda row: jalali_datetime(row['updated_at']),
+        }
+        getters = [(name, getters[name]) for name in readable_fields(self.fields)]
+        return [{name: getter(row) for name, getter in getters} for row in rows]
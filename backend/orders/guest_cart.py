@@ -0,0 +1,177 @@
+# سبد خرید مهمان (کاربر وارد نشده)
+#
+# اقلام سبد مهمان ({variant_id: تعداد}) در cache با مهلت GUEST_CART_TTL نگه داشته
+# می‌شوند؛ کلید آن یک token تصادفی در کوکی امضاشده است. تا زمان ورود هیچ ردیفی در
+# دیتابیس ساخته نمی‌شود و token هم فقط با اولین افزودن به سبد ساخته می‌شود.
+# هنگام ورود یا ثبت‌نام (و با POST /api/orders/cart/merge/) سبد مهمان در یک تراکنش و
+# با یک upsert گروهی در سبد کاربر ادغام می‌شود. GuestCartStore همان رابط storeهای
+# cart_store را دارد، پس خروجی و شناسه‌ی اقلام (شناسه‌ی تنوع) مثل حالت Redis است.
+# هر تغییر (خواندن، تغییر و نوشتن dict اقلام) زیر قفل کوتاه همان token در cache
+# (cache.add اتمیک) انجام می‌شود تا دو درخواست همزمان یک مهمان تغییری را گم نکنند.
+
+import secrets
+import time
+from contextlib import contextmanager
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.utils import timezone
+
+from products.models import ProductVariant
+from .cart_store import flush_cart, get_cart_store
+from .models import Cart, CartItem
+
+COOKIE_SALT = 'orders.guest_cart'
+# قفل هر سبد مهمان خودش منقضی می‌شود، حتی اگر پردازه‌ی نگه‌دارنده از کار بیفتد
+LOCK_TIMEOUT = 5
+LOCK_POLL_INTERVAL = 0.01
+
+
+def get_guest_token(request):
+    """token سبد مهمان از کوکی امضاشده؛ None اگر نباشد یا امضا نامعتبر باشد"""
+    return request.get_signed_cookie(
+        settings.GUEST_CART_COOKIE_NAME, default=None, salt=COOKIE_SALT, max_age=settings.GUEST_CART_TTL
+    )
+
+
+def new_guest_token():
+    return secrets.token_urlsafe(24)
+
+
+def set_guest_cookie(response, token):
+    response.set_signed_cookie(
+        settings.GUEST_CART_COOKIE_NAME, token, salt=COOKIE_SALT, max_age=settings.GUEST_CART_TTL,
+        httponly=True, secure=settings.SESSION_COOKIE_SECURE, samesite=settings.SESSION_COOKIE_SAMESITE,
+    )
+
+
+def delete_guest_cookie(response):
+    response.delete_cookie(settings.GUEST_CART_COOKIE_NAME, samesite=settings.SESSION_COOKIE_SAMESITE)
+
+
+class GuestCartStore:
+    """
+    سبد مهمان در cache؛ همان رابط RedisCartStore با token به‌جای شناسه‌ی کاربر
+    """
+
+    def _key(self, token):
+        return f'guest-cart:{token}'
+
+    @contextmanager
+    def _locked(self, token):
+        """قفل انحصاری سبد token؛ فقط قفل خود (با مقدار یکتا) آزاد می‌شود"""
+        key, owner = f'{self._key(token)}:lock', secrets.token_hex(8)
+        while not cache.add(key, owner, LOCK_TIMEOUT):
+            time.sleep(LOCK_POLL_INTERVAL)
+        try:
+            yield
+        finally:
+            if cache.get(key) == owner:
+                cache.delete(key)
+
+    def _load(self, token):
+        if not token:
+            return {}
+        return cache.get(self._key(token)) or {}
+
+    def _save(self, token, items):
+        if items:
+            cache.set(self._key(token), items, settings.GUEST_CART_TTL)
+        else:
+            cache.delete(self._key(token))
+
+    def get(self, token):
+        return self._load(token), {}
+
+    def incr(self, token, variant_id, quantity):
+        with self._locked(token):
+            items = self._load(token)
+            items[variant_id] = items.get(variant_id, 0) + quantity
+            self._save(token, items)
+        return items[variant_id]
+
+    def set(self, token, variant_id, quantity):
+        with self._locked(token):
+            items = self._load(token)
+            if variant_id not in items:
+                return False
+            items[variant_id] = quantity
+            self._save(token, items)
+        return True
+
+    def remove(self, token, variant_id):
+        with self._locked(token):
+            items = self._load(token)
+            removed = items.pop(variant_id, None) is not None
+            self._save(token, items)
+        return removed
+
+    def clear(self, token):
+        if token:
+            cache.delete(self._key(token))
+
+    def pop(self, token):
+        """اقلام سبد و حذف آن در یک گام (برای ادغام)"""
+        if not token:
+            return {}
+        with self._locked(token):
+            items = self._load(token)
+            cache.delete(self._key(token))
+        return items
+
+
+guest_cart_store = GuestCartStore()
+
+
+def merge_into_user_cart(user, items):
+    """
+    ادغام {variant_id: تعداد} در سبد کاربر: یک تراکنش و یک upsert گروهی روی
+    (cart, variant)؛ تعداد اقلام مشترک جمع می‌شود. تعداد اقلام ادغام‌شده
+    """
+    store = get_cart_store()
+    if store is not None:
+        # سبد داغ کاربر اول در دیتابیس نوشته می‌شود و بعد از ادغام دوباره از دیتابیس خوانده می‌شود
+        flush_cart(store, user.id)
+
+    products = dict(
+        ProductVariant.objects.filter(pk__in=items.keys(), is_active=True).values_list('pk', 'product_id')
+    )
+    with transaction.atomic():
+        cart, created = Cart.objects.get_or_create(user=user)
+        existing = dict(
+            CartItem.objects.select_for_update()
+            .filter(cart=cart, variant_id__in=products.keys())
+            .values_list('variant_id', 'quantity')
+        )
+        merged = CartItem.objects.bulk_create(
+            [
+                CartItem(
+                    cart=cart, variant_id=pk, product_id=products[pk],
+                    quantity=existing.get(pk, 0) + items[pk],
+                )
+                for pk in products
+            ],
+            update_conflicts=True,
+            unique_fields=['cart', 'variant'],
+            update_fields=['quantity'],
+        )
+        Cart.objects.filter(pk=cart.pk).update(updated_at=timezone.now())
+
+    if store is not None:
+        store.invalidate(user.id)
+    return len(merged)
+
+
+def merge_guest_cart(request, response, user):
+    """
+    ادغام سبد مهمان درخواست (کوکی) در سبد کاربر و حذف سبد مهمان و کوکی آن؛
+    بعد از ورود و ثبت‌نام صدا زده می‌شود. تعداد اقلام ادغام‌شده
+    """
+    token = get_guest_token(request)
+    if token is None:
+        return 0
+    items = guest_cart_store.pop(token)
+    merged = merge_into_user_cart(user, items) if items else 0
+    delete_guest_cookie(response)
+    return merged
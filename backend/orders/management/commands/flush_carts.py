@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from orders.cart_store import flush_dirty_carts, get_cart_store
+
+
+class Command(BaseCommand):
+    """
+    نوشتن سبدهای تغییرکرده از cart_store (Redis) در جدول‌های Cart/CartItem.
+    برای اجرای دوره‌ای (مثلاً هر دقیقه با cron) در نظر گرفته شده است
+    """
+    help = 'نوشتن سبدهای خرید تغییرکرده از Redis در دیتابیس (write-behind)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='تعداد سبدهای برداشته‌شده از cart:dirty در هر دور (پیش‌فرض: 500)'
+        )
+
+    def handle(self, *args, **options):
+        store = get_cart_store()
+        if store is None:
+            raise CommandError('CART_BACKEND برابر db است؛ سبدی برای نوشتن وجود ندارد')
+
+        started = time.monotonic()
+        flushed = flush_dirty_carts(store, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {flushed} سبد خرید در دیتابیس نوشته شد ({time.monotonic() - started:.1f} ثانیه)'
+        ))
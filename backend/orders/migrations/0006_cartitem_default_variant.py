@@ -0,0 +1,44 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:02
+
+from django.db import migrations
+from django.db.models import Case, When
+
+
+def map_cart_items_to_variants(apps, schema_editor):
+    """
+    اقلام سبد بدون تنوع -> تنوع پیش‌فرض محصول (فعال و موجود با کمترین قیمت)؛
+    اقلام محصولاتی که هیچ تنوع فعالی ندارند قابل خرید نیستند و حذف می‌شوند
+    """
+    CartItem = apps.get_model('orders', 'CartItem')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    db = schema_editor.connection.alias
+
+    items = list(CartItem.objects.using(db).filter(variant__isnull=True).only('id', 'product_id'))
+    if not items:
+        return
+
+    defaults = {}
+    variants = ProductVariant.objects.using(db).filter(
+        product_id__in={item.product_id for item in items}, is_active=True
+    ).order_by('product_id', Case(When(stock__gt=0, then=0), default=1), 'price', 'id')
+    for product_id, variant_id in variants.values_list('product_id', 'id'):
+        defaults.setdefault(product_id, variant_id)
+
+    mapped, orphaned = [], []
+    for item in items:
+        item.variant_id = defaults.get(item.product_id)
+        (mapped if item.variant_id else orphaned).append(item)
+    CartItem.objects.using(db).bulk_update(mapped, ['variant'], batch_size=500)
+    CartItem.objects.using(db).filter(pk__in=[item.pk for item in orphaned]).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0014_productvariant_stock_non_negative'),
+        ('orders', '0005_cartitem_variant_orderitem_variant'),
+    ]
+
+    operations = [
+        migrations.RunPython(map_cart_items_to_variants, migrations.RunPython.noop),
+    ]
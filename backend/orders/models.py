@@ -1,6 +1,9 @@
+from functools import cached_property
 from django.db import models
+from django.db.models import DecimalField, F, Sum, Value
+from django.db.models.functions import Coalesce
 from django.conf import settings
-from products.models import Product
+from products.models import Product, ProductVariant
 from accounts.models import Address
 
 
@@ -24,15 +27,36 @@ class Cart(models.Model):
     def __str__(self):
         return f"سبد خرید {self.user.username}"
 
+    @cached_property
+    def totals(self):
+        """قیمت کل و تعداد اقلام سبد با یک aggregate روی قیمت تنوع‌ها"""
+        return self.items.aggregate(
+            total_price=Coalesce(
+                Sum(F('quantity') * F('variant__price'), output_field=DecimalField(max_digits=12, decimal_places=0)),
+                Value(0, output_field=DecimalField(max_digits=12, decimal_places=0)),
+            ),
+            items_count=Coalesce(Sum('quantity'), 0),
+        )
+
     @property
     def total_price(self):
         """محاسبه قیمت کل سبد خرید"""
-        return sum(item.subtotal for item in self.items.all())
+        return self.totals['total_price']
 
     @property
     def items_count(self):
         """تعداد کل آیتم‌های سبد"""
-        return sum(item.quantity for item in self.items.all())
+        return self.totals['items_count']
+
+
+class CartItemQuerySet(models.QuerySet):
+    """
+    QuerySet اقلام سبد
+    """
+
+    def priced(self, products=True):
+        """قیمت و موجودی تنوع هر قلم (و محصول آن) در همان query اقلام"""
+        return self.select_related('variant', 'product') if products else self.select_related('variant')
 
 
 class CartItem(models.Model):
@@ -50,21 +74,40 @@ class CartItem(models.Model):
         on_delete=models.CASCADE,
         verbose_name='محصول'
     )
+    variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.CASCADE,
+        related_name='cart_items',
+        verbose_name='تنوع (رنگ و سایز)'
+    )
     quantity = models.PositiveIntegerField(default=1, verbose_name='تعداد')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ افزودن')
 
+    objects = CartItemQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'آیتم سبد خرید'
         verbose_name_plural = 'آیتم‌های سبد خرید'
-        unique_together = ['cart', 'product']
+        unique_together = ['cart', 'variant']
 
     def __str__(self):
         return f"{self.product.name} x {self.quantity}"
 
+    def save(self, *args, **kwargs):
+        # محصول همیشه همان محصول تنوع است (برای خروجی و فیلترهای قبلی نگه داشته می‌شود)
+        if self.variant_id is not None and self.product_id is None:
+            self.product_id = self.variant.product_id
+        super().save(*args, **kwargs)
+
+    @property
+    def unit_price(self):
+        """قیمت واحد: قیمت تنوع انتخاب‌شده"""
+        return self.variant.price
+
     @property
     def subtotal(self):
         """محاسبه قیمت کل این آیتم"""
-        return self.product.price * self.quantity
+        return self.unit_price * self.quantity
 
 
 class Order(models.Model):
@@ -181,6 +224,14 @@ class OrderItem(models.Model):
         on_delete=models.CASCADE,
         verbose_name='محصول'
     )
+    variant = models.ForeignKey(
+        ProductVariant,
+        on_delete=models.SET_NULL,
+        null=True,
+        blank=True,
+        related_name='order_items',
+        verbose_name='تنوع (رنگ و سایز)'
+    )
     quantity = models.PositiveIntegerField(default=1, verbose_name='تعداد')
     price = models.DecimalField(
         max_digits=10,
@@ -1,20 +1,51 @@
+from collections import Counter
+from django.db import transaction
 from rest_framework import serializers
+from pokopini.serializers import SparseFieldsetsMixin
 from .models import Cart, CartItem, Order, OrderItem
+from .stock import InsufficientStock, decrement_variant_stock
+from products.models import ProductVariant
 from products.serializers import ProductListSerializer
 import jdatetime
 
 
-class CartItemSerializer(serializers.ModelSerializer):
+def jalali_datetime(value):
+    """تاریخ و ساعت شمسی برای نمایش"""
+    if value:
+        return jdatetime.datetime.fromgregorian(datetime=value).strftime('%Y/%m/%d %H:%M:%S')
+    return None
+
+
+class CartVariantSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
+    """
+    Serializer برای تنوع انتخاب‌شده‌ی آیتم سبد (قیمت و موجودی)
+    """
+    color_display = serializers.CharField(source='get_color_display', read_only=True)
+    size_display = serializers.CharField(source='get_size_display', read_only=True)
+    is_in_stock = serializers.BooleanField(read_only=True)
+
+    class Meta:
+        model = ProductVariant
+        fields = ['id', 'color', 'color_display', 'size', 'size_display', 'price', 'stock', 'is_in_stock']
+
+
+class CartItemSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای آیتم سبد خرید
     """
     product = ProductListSerializer(read_only=True)
-    product_id = serializers.IntegerField(write_only=True)
+    product_id = serializers.IntegerField(write_only=True, required=False)
+    variant = CartVariantSerializer(read_only=True)
+    variant_id = serializers.IntegerField(write_only=True, required=False)
+    unit_price = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
     subtotal = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
 
     class Meta:
         model = CartItem
-        fields = ['id', 'product', 'product_id', 'quantity', 'subtotal', 'created_at']
+        fields = [
+            'id', 'product', 'product_id', 'variant', 'variant_id', 'quantity',
+            'unit_price', 'subtotal', 'created_at'
+        ]
         read_only_fields = ['id', 'created_at']
 
     def validate_quantity(self, value):
@@ -32,8 +63,66 @@ class CartItemSerializer(serializers.ModelSerializer):
             raise serializers.ValidationError("محصول یافت نشد.")
         return value
 
+    def validate(self, attrs):
+        product_id = attrs.get('product_id')
+        variant_id = attrs.get('variant_id')
+        if variant_id is not None:
+            variant = ProductVariant.objects.filter(
+                id=variant_id, is_active=True, product__is_active=True
+            ).first()
+            if variant is None or product_id not in (None, variant.product_id):
+                raise serializers.ValidationError({'variant_id': "تنوع محصول یافت نشد."})
+        elif product_id is not None:
+            # سازگاری با کلاینت‌هایی که فقط product_id می‌فرستند: تنوع پیش‌فرض محصول
+            variant = ProductVariant.objects.defaults_for([product_id]).get(product_id)
+            if variant is None:
+                raise serializers.ValidationError({'product_id': "این محصول موجود نیست."})
+        else:
+            raise serializers.ValidationError("رنگ و سایز محصول (variant_id) را انتخاب کنید.")
+
+        if not variant.is_in_stock:
+            raise serializers.ValidationError({'variant_id': "این رنگ و سایز موجود نیست."})
+        attrs['variant'] = variant
+        return attrs
+
+
+class CartStoreItemSerializer(serializers.Serializer):
+    """
+    ورودی افزودن به سبد وقتی سبد در cart_store (CART_BACKEND=redis/locmem) یا سبد مهمان است؛
+    تنوع و موجودی از قطعه‌های cache کاتالوگ بررسی می‌شوند، نه با query
+    """
+    product_id = serializers.IntegerField(required=False)
+    variant_id = serializers.IntegerField(required=False)
+    quantity = serializers.IntegerField(default=1)
+
+    def validate_quantity(self, value):
+        if value < 1:
+            raise serializers.ValidationError("تعداد باید حداقل ۱ باشد.")
+        return value
+
+    def validate(self, attrs):
+        from .cart_store import variant_fragments
+        product_id = attrs.get('product_id')
+        variant_id = attrs.get('variant_id')
+        if variant_id is None:
+            if product_id is None:
+                raise serializers.ValidationError("رنگ و سایز محصول (variant_id) را انتخاب کنید.")
+            # سازگاری با کلاینت‌هایی که فقط product_id می‌فرستند: تنوع پیش‌فرض محصول
+            variant = ProductVariant.objects.filter(product__is_active=True).defaults_for([product_id]).get(product_id)
+            if variant is None:
+                raise serializers.ValidationError({'product_id': "این محصول موجود نیست."})
+            variant_id = variant.pk
+
+        fragment = variant_fragments([variant_id]).get(variant_id)
+        if fragment is None or product_id not in (None, fragment['product_id']):
+            raise serializers.ValidationError({'variant_id': "تنوع محصول یافت نشد."})
+        if fragment['variant__stock'] <= 0:
+            raise serializers.ValidationError({'variant_id': "این رنگ و سایز موجود نیست."})
+        attrs['variant_id'] = variant_id
+        return attrs
 
-class CartSerializer(serializers.ModelSerializer):
+
+class CartSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای سبد خرید
     """
@@ -47,7 +136,7 @@ class CartSerializer(serializers.ModelSerializer):
         read_only_fields = ['id', 'created_at', 'updated_at']
 
 
-class OrderItemSerializer(serializers.ModelSerializer):
+class OrderItemSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای آیتم سفارش
     """
@@ -56,10 +145,10 @@ class OrderItemSerializer(serializers.ModelSerializer):
 
     class Meta:
         model = OrderItem
-        fields = ['id', 'product', 'quantity', 'price', 'subtotal']
+        fields = ['id', 'product', 'variant', 'quantity', 'price', 'subtotal']
 
 
-class OrderSerializer(serializers.ModelSerializer):
+class OrderSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای سفارش
     """
@@ -81,17 +170,11 @@ class OrderSerializer(serializers.ModelSerializer):
 
     def get_created_at_jalali(self, obj):
         """تبدیل تاریخ ایجاد به شمسی"""
-        if obj.created_at:
-            jalali_date = jdatetime.datetime.fromgregorian(datetime=obj.created_at)
-            return jalali_date.strftime('%Y/%m/%d %H:%M:%S')
-        return None
+        return jalali_datetime(obj.created_at)
 
     def get_updated_at_jalali(self, obj):
         """تبدیل تاریخ به‌روزرسانی به شمسی"""
-        if obj.updated_at:
-            jalali_date = jdatetime.datetime.fromgregorian(datetime=obj.updated_at)
-            return jalali_date.strftime('%Y/%m/%d %H:%M:%S')
-        return None
+        return jalali_datetime(obj.updated_at)
 
     def validate_address(self, value):
         request = self.context.get('request')
@@ -125,39 +208,65 @@ class OrderCreateSerializer(serializers.Serializer):
         user = request.user
         address = Address.objects.get(id=validated_data['address_id'])
 
-        # بررسی وجود سبد خرید
-        try:
-            cart = Cart.objects.get(user=user)
-        except Cart.DoesNotExist:
-            raise serializers.ValidationError("سبد خرید خالی است.")
-
-        if not cart.items.exists():
-            raise serializers.ValidationError("سبد خرید خالی است.")
-
         # محاسبه هزینه ارسال
         shipping_method = validated_data.get('shipping_method', 'standard')
         shipping_cost = 50000 if shipping_method == 'express' else 30000
-        
-        # ایجاد سفارش
-        order = Order.objects.create(
-            user=user,
-            address=address,
-            total_price=cart.total_price + shipping_cost,
-            shipping_method=shipping_method,
-            shipping_cost=shipping_cost
-        )
-
-        # کپی کردن آیتم‌های سبد به سفارش
-        for cart_item in cart.items.all():
-            OrderItem.objects.create(
-                order=order,
-                product=cart_item.product,
-                quantity=cart_item.quantity,
-                price=cart_item.product.price
+
+        # سبد داغ (cart_store) پیش از خواندن اقلام در دیتابیس نوشته می‌شود
+        from .cart_store import flush_cart, get_cart_store
+        store = get_cart_store()
+        if store is not None:
+            flush_cart(store, user.id)
+
+        # کم کردن موجودی و ثبت سفارش در یک تراکنش: یا همه‌ی اقلام یا هیچ‌کدام
+        with transaction.atomic():
+            items = list(
+                CartItem.objects.filter(cart__user=user).select_related('product', 'variant__product').order_by('id')
+            )
+            if not items:
+                raise serializers.ValidationError("سبد خرید خالی است.")
+
+            errors = {
+                item.id: ["این رنگ و سایز دیگر فروخته نمی‌شود."]
+                for item in items if not item.variant.is_active
+            }
+            if errors:
+                raise serializers.ValidationError({'items': errors})
+
+            quantities = Counter()
+            for item in items:
+                quantities[item.variant_id] += item.quantity
+            try:
+                decrement_variant_stock(quantities)
+            except InsufficientStock as exc:
+                for item in items:
+                    variant = item.variant
+                    if variant.pk in exc.available:
+                        errors[item.id] = [
+                            f"موجودی «{variant}» کافی نیست (موجودی: {exc.available[variant.pk]})."
+                        ]
+                # موجودی بین شکست UPDATE و خواندن دوباره تغییر کرده باشد
+                raise serializers.ValidationError(
+                    {'items': errors or ["موجودی بعضی اقلام کافی نیست؛ دوباره تلاش کنید."]}
+                )
+
+            order = Order.objects.create(
+                user=user,
+                address=address,
+                total_price=sum(item.subtotal for item in items) + shipping_cost,
+                shipping_method=shipping_method,
+                shipping_cost=shipping_cost
             )
-            
-            # توجه: کم کردن موجودی باید از طریق ProductVariant انجام شود
-            # اگر سیستم variant دارید، باید موجودی variant مربوطه را کم کنید
+            OrderItem.objects.bulk_create([
+                OrderItem(
+                    order=order,
+                    product=item.product,
+                    variant=item.variant,
+                    quantity=item.quantity,
+                    price=item.unit_price
+                )
+                for item in items
+            ])
 
         # توجه: سبد خرید در فرانت‌اند خالی می‌شود
         # cart.items.all().delete()
@@ -0,0 +1,59 @@
+# کم کردن موجودی تنوع‌ها هنگام ثبت سفارش
+#
+# موجودی همه‌ی اقلام یک سفارش با یک UPDATE شرطی کم می‌شود:
+#   UPDATE products_productvariant
+#      SET stock = stock - CASE id WHEN 7 THEN 2 WHEN 9 THEN 1 END
+#    WHERE id IN (7, 9) AND is_active AND stock >= CASE id WHEN 7 THEN 2 WHEN 9 THEN 1 END
+# قفل ردیف‌ها را خود UPDATE می‌گیرد، پس دو خرید همزمان نمی‌توانند آخرین عدد را
+# هر دو بخرند: دومی شرط stock >= n را با مقدار تازه دوباره بررسی می‌کند. اگر حتی
+# یک ردیف به‌روزرسانی نشود، کل تغییر برگردانده می‌شود و خطای هر قلم جداگانه
+# گزارش می‌شود. CheckConstraint روی ProductVariant.stock آخرین سد است.
+# فروش کل cache کاتالوگ را بی‌اعتبار نمی‌کند (ProductVariantQuerySet.update_stock)؛
+# فقط قطعه‌های سبدِ همین تنوع‌ها بعد از commit حذف می‌شوند.
+
+from django.db import transaction
+from django.db.models import Case, F, PositiveIntegerField, Value, When
+
+from products.models import ProductVariant
+from .cart_store import discard_variant_fragments
+
+
+class InsufficientStock(Exception):
+    """
+    موجودی برای بعضی تنوع‌ها کافی نیست
+    available: {variant_id: موجودی قابل فروش} (برای تنوع‌های ناموجود یا غیرفعال 0)
+    """
+
+    def __init__(self, available):
+        super().__init__(available)
+        self.available = available
+
+
+def decrement_variant_stock(quantities, using=None):
+    """
+    کم کردن موجودی {variant_id: تعداد} با یک UPDATE شرطی؛ همه یا هیچ
+    باید داخل transaction.atomic() ثبت سفارش صدا زده شود
+    """
+    quantities = {pk: qty for pk, qty in quantities.items() if qty}
+    if not quantities:
+        return 0
+
+    requested = Case(
+        *[When(pk=pk, then=Value(qty)) for pk, qty in quantities.items()],
+        output_field=PositiveIntegerField(),
+    )
+    variants = ProductVariant.objects.using(using).filter(pk__in=quantities.keys(), is_active=True)
+    try:
+        # savepoint: اگر فقط بخشی از ردیف‌ها کم شوند، موجودی قبلی برای گزارش خطا برمی‌گردد
+        with transaction.atomic(using=using):
+            # update_stock() خلاصه‌ی موجودی محصولات مربوطه را هم به‌روزرسانی می‌کند
+            rows = variants.filter(stock__gte=requested).update_stock(F('stock') - requested)
+            if rows != len(quantities):
+                raise InsufficientStock({})
+    except InsufficientStock:
+        stock = dict(variants.values_list('pk', 'stock'))
+        raise InsufficientStock({
+            pk: stock.get(pk, 0) for pk, qty in quantities.items() if stock.get(pk, 0) < qty
+        })
+    transaction.on_commit(lambda: discard_variant_fragments(quantities), using=using)
+    return rows
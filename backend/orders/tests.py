@@ -1,10 +1,13 @@
-from django.test import TestCase
+import threading
+import unittest
+from django.db import connection
+from django.test import TestCase, TransactionTestCase, override_settings
 from django.contrib.auth import get_user_model
 from rest_framework.test import APITestCase
 from rest_framework import status
-from products.models import Product
+from products.models import Product, ProductVariant
 from accounts.models import Address
-from .models import Cart, CartItem, Order
+from .models import Cart, CartItem, Order, OrderItem
 
 User = get_user_model()
 
@@ -86,3 +89,499 @@ class OrderFlowTestCase(APITestCase):
         order = Order.objects.get(user=self.user)
         self.assertEqual(order.items.count(), 1)
         self.assertEqual(order.status, 'pending')
+
+
+class OrderSparseFieldsetsTestCase(APITestCase):
+    """تست‌های ?fields= و ?omit= روی سفارش‌ها و سبد خرید"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.product = Product.objects.create(
+            name='پیراهن', description='-', price=100000, category='boy', season='summer',
+        )
+        self.order = Order.objects.create(user=self.user, total_price=100000)
+        self.order.items.create(product=self.product, quantity=2, price=100000)
+        self.client.force_authenticate(user=self.user)
+
+    def test_nested_fields_and_prefetch(self):
+        """مسیرهای تو در تو؛ بدون items نه prefetch انجام می‌شود و نه تاریخ شمسی محاسبه می‌شود"""
+        response = self.client.get('/api/orders/orders/', {'fields': 'id,items.product.name,items.quantity'})
+        order = response.data['results'][0] if 'results' in response.data else response.data[0]
+        self.assertEqual(order, {'id': self.order.id, 'items': [{'product': {'name': 'پیراهن'}, 'quantity': 2}]})
+
+        with self.assertNumQueries(1):
+            response = self.client.get(f'/api/orders/orders/{self.order.id}/', {'omit': 'items,created_at_jalali'})
+        self.assertNotIn('items', response.data)
+        self.assertNotIn('created_at_jalali', response.data)
+        self.assertIn('updated_at_jalali', response.data)
+
+    def test_cart_fields(self):
+        """سبد خرید فقط تعداد را برمی‌گرداند"""
+        cart = Cart.objects.create(user=self.user)
+        variant = ProductVariant.objects.create(product=self.product, color='blue', size='2y', price=100000, stock=5)
+        CartItem.objects.create(cart=cart, variant=variant, quantity=3)
+        response = self.client.get('/api/orders/cart/', {'fields': 'items_count'})
+        self.assertEqual(response.data, {'items_count': 3})
+
+
+class OrderFastSerializationContractTestCase(APITestCase):
+    """قرارداد مسیر سریع: خروجی سبد خرید و لیست سفارش‌ها بایت‌به‌بایت با serializerهای اصلی یکسان است"""
+
+    def setUp(self):
+        from django.utils import timezone
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.products = [
+            Product.objects.create(
+                name=f'محصول {index}', description='-', price=120000 + index * 500,
+                category='girl', season='winter', image=f'products/o{index}.jpg',
+            )
+            for index in range(2)
+        ]
+        cart = Cart.objects.create(user=self.user)
+        for index, product in enumerate(self.products):
+            variant = ProductVariant.objects.create(
+                product=product, color='red', size='3y', price=product.price + 1000, stock=index,
+            )
+            CartItem.objects.create(cart=cart, variant=variant, quantity=index + 1)
+        paid = Order.objects.create(
+            user=self.user, total_price=300000, shipping_cost=30000, payment_status='paid',
+            payment_ref_id='REF-1', payment_date=timezone.now(), status='processing',
+        )
+        for product in self.products:
+            paid.items.create(product=product, quantity=2, price=product.price)
+        Order.objects.create(user=self.user, total_price=50000)
+        self.client.force_authenticate(user=self.user)
+
+    def assertSameOutput(self, name, url, params=None):
+        from unittest import mock
+        from .fast_serializers import CartFastSerializer, OrderFastSerializer
+
+        with override_settings(FAST_SERIALIZATION_VIEWS=[]):
+            expected = self.client.get(url, params)
+        with override_settings(FAST_SERIALIZATION_VIEWS=[name]), \
+                mock.patch.object(CartFastSerializer, 'to_representation', autospec=True,
+                                  side_effect=CartFastSerializer.to_representation) as cart, \
+                mock.patch.object(OrderFastSerializer, 'many', autospec=True,
+                                  side_effect=OrderFastSerializer.many) as orders:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(cart.call_count + orders.call_count, 1)
+        self.assertEqual(response.content, expected.content)
+
+    def test_cart_contract(self):
+        self.assertSameOutput('orders.cart', '/api/orders/cart/')
+        self.assertSameOutput('orders.cart', '/api/orders/cart/', {'fields': 'total_price,items.product.name'})
+        self.assertSameOutput('orders.cart', '/api/orders/cart/', {'omit': 'items.product,items.variant.stock'})
+
+    def test_order_list_contract(self):
+        self.assertSameOutput('orders.list', '/api/orders/orders/')
+        self.assertSameOutput('orders.list', '/api/orders/orders/', {'omit': 'items.product,user_username'})
+
+
+def create_buyer(username):
+    """کاربر با یک آدرس پیش‌فرض برای ثبت سفارش"""
+    user = User.objects.create_user(username=username, password='testpass123')
+    address = Address.objects.create(
+        user=user, full_name='کاربر تست', phone_number='09123456789', province='تهران',
+        city='تهران', postal_code='1234567890', address_line='آدرس تست', is_default=True,
+    )
+    return user, address
+
+
+class CheckoutStockTestCase(APITestCase):
+    """کم شدن موجودی تنوع‌ها هنگام ثبت سفارش (همه یا هیچ)"""
+
+    def setUp(self):
+        self.user, self.address = create_buyer('buyer')
+        self.product = Product.objects.create(
+            name='سرهمی', description='-', price=150000, category='baby', season='winter',
+        )
+        self.red = ProductVariant.objects.create(product=self.product, color='red', size='2y', price=150000, stock=3)
+        self.other = Product.objects.create(
+            name='کلاه', description='-', price=50000, category='boy', season='winter',
+        )
+        self.blue = ProductVariant.objects.create(product=self.other, color='blue', size='3y', price=50000, stock=1)
+        self.cart = Cart.objects.create(user=self.user)
+        self.client.force_authenticate(user=self.user)
+
+    def checkout(self):
+        return self.client.post('/api/orders/orders/', {'address_id': self.address.id})
+
+    def test_checkout_decrements_stock(self):
+        CartItem.objects.create(cart=self.cart, variant=self.red, quantity=2)
+        CartItem.objects.create(cart=self.cart, variant=self.blue, quantity=1)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.red.refresh_from_db()
+        self.blue.refresh_from_db()
+        self.assertEqual((self.red.stock, self.blue.stock), (1, 0))
+        self.assertEqual(
+            set(OrderItem.objects.values_list('variant_id', 'quantity')), {(self.red.id, 2), (self.blue.id, 1)}
+        )
+        self.other.refresh_from_db()
+        self.assertFalse(self.other.in_stock)
+
+    def test_unsatisfied_line_fails_whole_order(self):
+        ok = CartItem.objects.create(cart=self.cart, variant=self.red, quantity=2)
+        short = CartItem.objects.create(cart=self.cart, variant=self.blue, quantity=2)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['items']), {short.id})
+        self.assertNotIn(ok.id, response.data['items'])
+        self.assertFalse(Order.objects.exists())
+        self.red.refresh_from_db()
+        self.blue.refresh_from_db()
+        self.assertEqual((self.red.stock, self.blue.stock), (3, 1))
+
+    def test_inactive_variant_line(self):
+        item = CartItem.objects.create(cart=self.cart, variant=self.red, quantity=1)
+        ProductVariant.objects.filter(pk=self.red.pk).update(is_active=False)
+
+        response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(list(response.data['items']), [item.id])
+
+    def test_checkout_keeps_catalog_cache(self):
+        """فروش فقط وقتی کل cache کاتالوگ را بی‌اعتبار می‌کند که موجود بودن محصول عوض شود"""
+        from products.cache import get_catalog_version
+        CartItem.objects.create(cart=self.cart, variant=self.red, quantity=1)
+        version = get_catalog_version()
+        detail = self.client.get(f'/api/products/{self.product.id}/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+        self.assertEqual(get_catalog_version(), version)
+        # جزئیات محصول (موجودی تنوع‌ها) دوباره ساخته می‌شود
+        response = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertNotEqual(response['ETag'], detail['ETag'])
+        self.assertEqual(response.json()['variants'][0]['stock'], 2)
+
+        # آخرین عدد: محصول ناموجود می‌شود و نسخه‌ی کاتالوگ افزایش می‌یابد
+        CartItem.objects.create(cart=self.cart, variant=self.blue, quantity=1)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+        self.assertNotEqual(get_catalog_version(), version)
+
+    def test_competing_decrement_before_update(self):
+        """خرید دیگری بین خواندن سبد و UPDATE شرطی: همه یا هیچ با موجودی تازه"""
+        from unittest import mock
+        from django.db.models import F
+        from .stock import decrement_variant_stock
+        ok = CartItem.objects.create(cart=self.cart, variant=self.blue, quantity=1)
+        short = CartItem.objects.create(cart=self.cart, variant=self.red, quantity=2)
+
+        def competing(quantities):
+            # خریدار دیگر دو عدد را درست پیش از UPDATE ما می‌خرد
+            ProductVariant._base_manager.filter(pk=self.red.pk).update(stock=F('stock') - 2)
+            return decrement_variant_stock(quantities)
+
+        with mock.patch('orders.serializers.decrement_variant_stock', side_effect=competing):
+            response = self.checkout()
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(set(response.data['items']), {short.id})
+        self.assertIn('(موجودی: 1)', response.data['items'][short.id][0])
+        self.assertNotIn(ok.id, response.data['items'])
+        self.assertFalse(Order.objects.exists())
+        # خرید رقیب در همین اتصال بود و با تراکنش سفارش برگشت؛ کم شدن آبی هم برگشته است
+        self.blue.refresh_from_db()
+        self.assertEqual(self.blue.stock, 1)
+
+    def test_aggregates_after_sequential_orders(self):
+        """دو سفارش پشت سر هم روی دو تنوع یک محصول"""
+        green = ProductVariant.objects.create(
+            product=self.product, color='green', size='3y', price=160000, stock=1
+        )
+        CartItem.objects.create(cart=self.cart, variant=self.red, quantity=2)
+        self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.total_stock, self.product.in_stock), (2, True))
+
+        CartItem.objects.filter(cart=self.cart).delete()
+        CartItem.objects.create(cart=self.cart, variant=green, quantity=1)
+        self.assertEqual(self.checkout().status_code, status.HTTP_201_CREATED)
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.total_stock, self.product.in_stock), (1, True))
+        self.assertEqual((self.product.min_price, self.product.max_price), (150000, 160000))
+        self.assertEqual(self.product.variants_count, 2)
+
+    def test_stock_cannot_go_negative(self):
+        from django.db import IntegrityError, transaction
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            ProductVariant._base_manager.filter(pk=self.blue.pk).update(stock=-1)
+
+
+class CartVariantTestCase(APITestCase):
+    """اقلام سبد بر اساس تنوع: قیمت تنوع، جمع با aggregate و سازگاری با product_id"""
+
+    def setUp(self):
+        self.user = User.objects.create_user(username='buyer', password='testpass123')
+        self.product = Product.objects.create(
+            name='ژاکت', description='-', price=200000, category='girl', season='winter',
+        )
+        self.small = ProductVariant.objects.create(product=self.product, color='red', size='2y', price=210000, stock=0)
+        self.large = ProductVariant.objects.create(product=self.product, color='red', size='5y', price=240000, stock=4)
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, **data):
+        return self.client.post('/api/orders/cart/add/', data, format='json')
+
+    def test_lines_per_variant_with_variant_price(self):
+        navy = ProductVariant.objects.create(product=self.product, color='navy', size='5y', price=250000, stock=2)
+        self.assertEqual(self.add(variant_id=self.large.id, quantity=2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.add(variant_id=self.large.id).status_code, status.HTTP_201_CREATED)
+        response = self.add(variant_id=navy.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+        cart = response.data['cart']
+        self.assertEqual(
+            sorted((item['variant']['id'], item['quantity'], item['unit_price']) for item in cart['items']),
+            [(self.large.id, 3, '240000'), (navy.id, 1, '250000')],
+        )
+        self.assertEqual(cart['total_price'], '970000')
+        self.assertEqual(cart['items_count'], 4)
+
+    def test_product_id_uses_default_variant(self):
+        """کلاینت‌های قدیمی: تنوع موجود با کمترین قیمت"""
+        response = self.add(product_id=self.product.id)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(CartItem.objects.get().variant, self.large)
+
+        response = self.add(variant_id=self.small.id)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('variant_id', response.data)
+
+    def test_cart_queries(self):
+        """سبد، اقلام با قیمت و موجودی تنوع و محصول، و جمع سبد: سه query"""
+        cart = Cart.objects.create(user=self.user)
+        other = Product.objects.create(name='کلاه', description='-', price=50000, category='boy', season='winter')
+        for variant in (self.large, ProductVariant.objects.create(product=other, color='blue', size='3y', price=55000, stock=1)):
+            CartItem.objects.create(cart=cart, variant=variant, quantity=1)
+
+        with self.assertNumQueries(3):
+            response = self.client.get('/api/orders/cart/')
+        self.assertEqual(response.data['total_price'], '295000')
+        self.assertEqual([item['variant']['stock'] for item in response.data['items']], [4, 1])
+
+
+class CartStoreTestCase(APITestCase):
+    """سبد داغ در cart_store: تغییرات بدون دیتابیس، نوشتن با flush_carts و پیش از ثبت سفارش"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        # store تازه برای هر تست (تغییر تنظیمات CART_* storeها را از نو می‌سازد)
+        self.enterContext(override_settings(CART_BACKEND='locmem'))
+        self.user, self.address = create_buyer('buyer')
+        self.product = Product.objects.create(
+            name='بلوز', description='-', price=90000, category='girl', season='spring', image='products/b.jpg',
+        )
+        self.pink = ProductVariant.objects.create(product=self.product, color='pink', size='3y', price=95000, stock=5)
+        self.white = ProductVariant.objects.create(product=self.product, color='white', size='3y', price=99000, stock=2)
+        self.client.force_authenticate(user=self.user)
+
+    def add(self, variant, quantity=1):
+        return self.client.post('/api/orders/cart/add/', {'variant_id': variant.id, 'quantity': quantity}, format='json')
+
+    def flush(self):
+        from django.core.management import call_command
+        from io import StringIO
+        call_command('flush_carts', stdout=StringIO())
+
+    def test_write_behind(self):
+        self.assertEqual(self.add(self.pink, 2).status_code, status.HTTP_201_CREATED)
+        self.assertEqual(self.add(self.white).status_code, status.HTTP_201_CREATED)
+        # قطعه‌های کاتالوگ و سبد گرم: افزودن بدون هیچ query
+        with self.assertNumQueries(0):
+            response = self.add(self.pink)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['cart']['total_price'], '384000')
+        self.assertFalse(CartItem.objects.exists())
+
+        self.flush()
+        self.assertEqual(
+            set(CartItem.objects.values_list('variant_id', 'quantity')), {(self.pink.id, 3), (self.white.id, 1)}
+        )
+
+        # شناسه‌ی قلم همان شناسه‌ی تنوع است
+        response = self.client.put(f'/api/orders/cart/update/{self.pink.id}/', {'quantity': 4}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        response = self.client.delete(f'/api/orders/cart/remove/{self.white.id}/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(self.client.delete('/api/orders/cart/remove/999999/').status_code, status.HTTP_404_NOT_FOUND)
+        self.flush()
+        self.assertEqual(list(CartItem.objects.values_list('variant_id', 'quantity')), [(self.pink.id, 4)])
+
+    def test_same_output_as_database_cart(self):
+        import json
+        self.add(self.pink, 2)
+        self.add(self.white)
+        stored = json.loads(self.client.get('/api/orders/cart/').content)
+        self.flush()
+        with override_settings(CART_BACKEND='db'):
+            expected = json.loads(self.client.get('/api/orders/cart/').content)
+
+        def without_line_ids(cart):
+            return {
+                **cart,
+                'updated_at': None,
+                'items': sorted(
+                    ({**item, 'id': None, 'created_at': None} for item in cart['items']),
+                    key=lambda item: item['variant']['id'],
+                ),
+            }
+
+        self.assertEqual(without_line_ids(stored), without_line_ids(expected))
+
+    def test_checkout_flushes_cart(self):
+        self.add(self.white, 2)
+        response = self.client.post('/api/orders/orders/', {'address_id': self.address.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.white.refresh_from_db()
+        self.assertEqual(self.white.stock, 0)
+        self.assertEqual(list(OrderItem.objects.values_list('variant_id', 'quantity')), [(self.white.id, 2)])
+
+
+
+class GuestCartTestCase(APITestCase):
+    """سبد مهمان در cache با کوکی امضاشده و ادغام آن هنگام ورود"""
+
+    def setUp(self):
+        from django.core.cache import cache
+        cache.clear()
+        self.user, self.address = create_buyer('buyer')
+        self.product = Product.objects.create(
+            name='بلوز', description='-', price=90000, category='girl', season='spring', image='products/b.jpg',
+        )
+        self.pink = ProductVariant.objects.create(product=self.product, color='pink', size='3y', price=95000, stock=5)
+        self.white = ProductVariant.objects.create(product=self.product, color='white', size='3y', price=99000, stock=2)
+
+    def add(self, variant, quantity=1):
+        return self.client.post('/api/orders/cart/add/', {'variant_id': variant.id, 'quantity': quantity}, format='json')
+
+    def test_guest_cart_has_no_database_rows(self):
+        self.assertEqual(self.client.get('/api/orders/cart/').data['items'], [])
+        response = self.add(self.pink, 2)
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn('guest_cart', response.cookies)
+        self.add(self.white)
+
+        response = self.client.get('/api/orders/cart/')
+        self.assertEqual(response.data['total_price'], '289000')
+        self.assertEqual(response.data['items_count'], 3)
+        self.assertFalse(Cart.objects.exists())
+        self.assertFalse(CartItem.objects.exists())
+
+        # شناسه‌ی قلم همان شناسه‌ی تنوع است
+        response = self.client.put(f'/api/orders/cart/update/{self.pink.id}/', {'quantity': 3}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['cart']['items_count'], 4)
+
+        # کوکی دستکاری‌شده پذیرفته نمی‌شود
+        self.client.cookies['guest_cart'] = 'forged'
+        self.assertEqual(self.client.get('/api/orders/cart/').data['items'], [])
+
+    def test_login_merges_guest_cart(self):
+        cart = Cart.objects.create(user=self.user)
+        CartItem.objects.create(cart=cart, variant=self.pink, quantity=1)
+        self.add(self.pink, 2)
+        self.add(self.white)
+
+        response = self.client.post(
+            '/api/auth/login/', {'username': 'buyer', 'password': 'testpass123'}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.cookies['guest_cart'].value, '')
+        self.assertEqual(
+            set(cart.items.values_list('variant_id', 'quantity')), {(self.pink.id, 3), (self.white.id, 1)}
+        )
+
+        # سبد مهمان بعد از ادغام پاک شده است
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post('/api/orders/cart/merge/')
+        self.assertEqual(response.data['merged'], 0)
+        self.assertEqual(response.data['cart']['items_count'], 4)
+
+    def test_concurrent_adds_are_not_lost(self):
+        """افزودن‌های همزمان یک مهمان زیر قفل سبد انجام می‌شوند"""
+        import time
+        from unittest import mock
+        from django.core.cache import cache
+        from .guest_cart import guest_cart_store
+
+        class SlowCache:
+            # فاصله بین خواندن و نوشتن dict اقلام، تا رقابت درخواست‌ها رخ دهد
+            def __getattr__(self, name):
+                return getattr(cache, name)
+
+            def get(self, *args, **kwargs):
+                value = cache.get(*args, **kwargs)
+                time.sleep(0.005)
+                return value
+
+        barrier = threading.Barrier(10)
+
+        def add():
+            barrier.wait()
+            guest_cart_store.incr('token', self.pink.id, 1)
+
+        with mock.patch('orders.guest_cart.cache', SlowCache()):
+            threads = [threading.Thread(target=add) for _ in range(10)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(guest_cart_store.get('token')[0], {self.pink.id: 10})
+
+    def test_merge_requires_authentication(self):
+        self.add(self.pink)
+        self.assertEqual(self.client.post('/api/orders/cart/merge/').status_code, status.HTTP_401_UNAUTHORIZED)
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'قفل ردیف‌ها در SQLite همزمانی واقعی ندارد')
+class CheckoutConcurrencyTestCase(TransactionTestCase):
+    """۱۰۰ خرید همزمان برای ۱۰ عدد موجودی: هیچ فروش بیش از موجودی"""
+
+    BUYERS = 100
+    STOCK = 10
+
+    def setUp(self):
+        product = Product.objects.create(
+            name='پرفروش', description='-', price=99000, category='girl', season='summer',
+        )
+        self.variant = ProductVariant.objects.create(
+            product=product, color='pink', size='4y', price=99000, stock=self.STOCK,
+        )
+        self.buyers = []
+        for index in range(self.BUYERS):
+            user, address = create_buyer(f'buyer{index}')
+            cart = Cart.objects.create(user=user)
+            CartItem.objects.create(cart=cart, variant=self.variant, quantity=1)
+            self.buyers.append((user, address))
+
+    def test_no_oversell(self):
+        from rest_framework.test import APIClient
+        barrier = threading.Barrier(self.BUYERS)
+        results = []
+
+        def checkout(user, address):
+            client = APIClient()
+            client.force_authenticate(user=user)
+            try:
+                barrier.wait()
+                results.append(client.post('/api/orders/orders/', {'address_id': address.id}).status_code)
+            finally:
+                connection.close()
+
+        threads = [threading.Thread(target=checkout, args=buyer) for buyer in self.buyers]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results.count(status.HTTP_201_CREATED), self.STOCK)
+        self.assertEqual(results.count(status.HTTP_400_BAD_REQUEST), self.BUYERS - self.STOCK)
+        self.variant.refresh_from_db()
+        self.assertEqual(self.variant.stock, 0)
+        self.assertEqual(Order.objects.count(), self.STOCK)
@@ -1,59 +1,131 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.permissions import AllowAny, IsAuthenticated
+from django.db.models import Prefetch, prefetch_related_objects
 from django.utils import timezone
+from pokopini.fast_serializers import FastSerializationMixin
+from pokopini.serializers import is_field_requested, sparse_fieldsets
 from .models import Cart, CartItem, Order
 from .serializers import (
-    CartSerializer, CartItemSerializer,
+    CartSerializer, CartItemSerializer, CartStoreItemSerializer,
     OrderSerializer, OrderCreateSerializer
 )
+from .cart_store import get_cart_store, represent_cart
+from .guest_cart import (
+    get_guest_token, guest_cart_store, merge_guest_cart, new_guest_token, set_guest_cookie,
+)
+from .fast_serializers import CartFastSerializer, OrderFastSerializer
 from .payment_service import PaymentService
 
 
-class CartViewSet(viewsets.ViewSet):
+def cart_items_prefetch(products=True):
+    """اقلام سبد همراه با تنوع (قیمت و موجودی) و محصول در یک query"""
+    return Prefetch('items', queryset=CartItem.objects.priced(products=products))
+
+
+def cart_data(cart):
+    """خروجی کامل سبد بعد از تغییر اقلام"""
+    prefetch_related_objects([cart], cart_items_prefetch())
+    return CartSerializer(cart).data
+
+
+class CartViewSet(FastSerializationMixin, viewsets.ViewSet):
     """
     ViewSet برای مدیریت سبد خرید
     """
-    permission_classes = [IsAuthenticated]
+    # مهمان‌ها سبد مهمان (orders/guest_cart.py) دارند؛ ادغام فقط برای کاربر وارد شده
+    permission_classes = [AllowAny]
+
+    def _cart_store(self, request):
+        """
+        (store، مالک سبد): سبد مهمان با token کوکی، cart_store با شناسه‌ی کاربر،
+        یا (None, None) برای سبد دیتابیسی کاربر
+        """
+        if not request.user.is_authenticated:
+            return guest_cart_store, get_guest_token(request)
+        store = get_cart_store()
+        return store, request.user.id if store is not None else None
+
+    def _store_cart(self, request, store, owner):
+        """خروجی سبد از store (بدون query برای سبد و قطعه‌های کاتالوگ گرم)"""
+        items, meta = store.get(owner)
+        fast = CartFastSerializer(CartSerializer(**sparse_fieldsets(request)).fields)
+        return represent_cart(fast, items, meta)
 
     def list(self, request):
         """نمایش سبد خرید کاربر با بهینه‌سازی"""
-        cart, created = Cart.objects.prefetch_related('items__product').get_or_create(user=request.user)
-        serializer = CartSerializer(cart)
+        store, owner = self._cart_store(request)
+        if store is not None:
+            return Response(self._store_cart(request, store, owner))
+
+        if self.use_fast_serialization('orders.cart'):
+            cart, created = Cart.objects.get_or_create(user=request.user)
+            fields = CartSerializer(**sparse_fieldsets(request)).fields
+            return Response(CartFastSerializer(fields).to_representation(cart))
+
+        # فقط داده‌هایی که فیلدهای خواسته‌شده (?fields= / ?omit=) لازم دارند prefetch می‌شوند؛
+        # قیمت و موجودی تنوع‌ها در همان query اقلام و جمع سبد با یک aggregate
+        cart, created = Cart.objects.get_or_create(user=request.user)
+        if is_field_requested(request, 'items'):
+            prefetch_related_objects(
+                [cart], cart_items_prefetch(products=is_field_requested(request, 'items.product'))
+            )
+        serializer = CartSerializer(cart, **sparse_fieldsets(request))
         return Response(serializer.data)
 
     @action(detail=False, methods=['post'])
     def add(self, request):
         """افزودن محصول به سبد خرید"""
+        store, owner = self._cart_store(request)
+        if store is not None:
+            serializer = CartStoreItemSerializer(data=request.data, context={'request': request})
+            serializer.is_valid(raise_exception=True)
+            # token سبد مهمان فقط با اولین افزودن ساخته می‌شود
+            new_token = owner is None and store is guest_cart_store
+            if new_token:
+                owner = new_guest_token()
+            store.incr(owner, serializer.validated_data['variant_id'], serializer.validated_data['quantity'])
+            response = Response({
+                'message': 'محصول به سبد خرید اضافه شد.',
+                'cart': self._store_cart(request, store, owner)
+            }, status=status.HTTP_201_CREATED)
+            if new_token:
+                set_guest_cookie(response, owner)
+            return response
+
         cart, created = Cart.objects.get_or_create(user=request.user)
         
         serializer = CartItemSerializer(data=request.data)
         serializer.is_valid(raise_exception=True)
         
-        product_id = serializer.validated_data['product_id']
+        variant = serializer.validated_data['variant']
         quantity = serializer.validated_data.get('quantity', 1)
         
-        # بررسی وجود محصول در سبد
+        # بررسی وجود همین رنگ و سایز در سبد
         cart_item, created = CartItem.objects.get_or_create(
             cart=cart,
-            product_id=product_id,
-            defaults={'quantity': quantity}
+            variant=variant,
+            defaults={'product_id': variant.product_id, 'quantity': quantity}
         )
         
         if not created:
-            # اگر محصول قبلاً در سبد بود، تعداد را افزایش بده
+            # اگر قبلاً در سبد بود، تعداد را افزایش بده
             cart_item.quantity += quantity
             cart_item.save()
         
         return Response({
             'message': 'محصول به سبد خرید اضافه شد.',
-            'cart': CartSerializer(cart).data
+            'cart': cart_data(cart)
         }, status=status.HTTP_201_CREATED)
 
     @action(detail=False, methods=['put'], url_path='update/(?P<item_id>[^/.]+)')
     def update_item(self, request, item_id=None):
         """به‌روزرسانی تعداد محصول در سبد"""
+        store, owner = self._cart_store(request)
+        if store is not None:
+            return self._store_update_item(request, store, owner, item_id)
+
         try:
             cart = Cart.objects.get(user=request.user)
             cart_item = CartItem.objects.get(id=item_id, cart=cart)
@@ -73,12 +145,42 @@ class CartViewSet(viewsets.ViewSet):
         
         return Response({
             'message': 'تعداد محصول به‌روزرسانی شد.',
-            'cart': CartSerializer(cart).data
+            'cart': cart_data(cart)
+        })
+
+    def _store_update_item(self, request, store, owner, item_id):
+        """به‌روزرسانی تعداد در store (شناسه‌ی قلم همان شناسه‌ی تنوع است)"""
+        quantity = request.data.get('quantity')
+        if not quantity or int(quantity) < 1:
+            return Response({
+                'error': 'تعداد باید حداقل ۱ باشد.'
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        if not item_id.isdigit() or not store.set(owner, int(item_id), int(quantity)):
+            return Response({
+                'error': 'آیتم یافت نشد.'
+            }, status=status.HTTP_404_NOT_FOUND)
+
+        return Response({
+            'message': 'تعداد محصول به‌روزرسانی شد.',
+            'cart': self._store_cart(request, store, owner)
         })
 
     @action(detail=False, methods=['delete'], url_path='remove/(?P<item_id>[^/.]+)')
     def remove_item(self, request, item_id=None):
         """حذف محصول از سبد"""
+        store, owner = self._cart_store(request)
+        if store is not None:
+            # در store شناسه‌ی قلم همان شناسه‌ی تنوع است
+            if not item_id.isdigit() or not store.remove(owner, int(item_id)):
+                return Response({
+                    'error': 'آیتم یافت نشد.'
+                }, status=status.HTTP_404_NOT_FOUND)
+            return Response({
+                'message': 'محصول از سبد خرید حذف شد.',
+                'cart': self._store_cart(request, store, owner)
+            })
+
         try:
             cart = Cart.objects.get(user=request.user)
             cart_item = CartItem.objects.get(id=item_id, cart=cart)
@@ -91,12 +193,19 @@ class CartViewSet(viewsets.ViewSet):
         
         return Response({
             'message': 'محصول از سبد خرید حذف شد.',
-            'cart': CartSerializer(cart).data
+            'cart': cart_data(cart)
         })
 
     @action(detail=False, methods=['delete'])
     def clear(self, request):
         """خالی کردن سبد خرید"""
+        store, owner = self._cart_store(request)
+        if store is not None:
+            store.clear(owner)
+            return Response({
+                'message': 'سبد خرید خالی شد.'
+            })
+
         try:
             cart = Cart.objects.get(user=request.user)
             cart.items.all().delete()
@@ -107,8 +216,20 @@ class CartViewSet(viewsets.ViewSet):
             'message': 'سبد خرید خالی شد.'
         })
 
+    @action(detail=False, methods=['post'], permission_classes=[IsAuthenticated])
+    def merge(self, request):
+        """ادغام سبد مهمان (کوکی) در سبد کاربر - ورود و ثبت‌نام این کار را خودکار انجام می‌دهند"""
+        response = Response({'message': 'سبد خرید مهمان ادغام شد.'})
+        response.data['merged'] = merge_guest_cart(request, response, request.user)
+        store, owner = self._cart_store(request)
+        response.data['cart'] = (
+            self._store_cart(request, store, owner) if store is not None
+            else cart_data(Cart.objects.get_or_create(user=request.user)[0])
+        )
+        return response
+
 
-class OrderViewSet(viewsets.ModelViewSet):
+class OrderViewSet(FastSerializationMixin, viewsets.ModelViewSet):
     """
     ViewSet برای مدیریت سفارشات
     - کاربران عادی: فقط سفارشات خودشان
@@ -122,12 +243,30 @@ class OrderViewSet(viewsets.ModelViewSet):
         برای ادمین همه سفارشات، برای کاربران عادی فقط سفارشات خودشان
         با بهینه‌سازی برای کاهش تعداد queries
         """
-        queryset = Order.objects.select_related('user', 'address').prefetch_related('items__product')
+        queryset = Order.objects.all()
+        if is_field_requested(self.request, 'user_username'):
+            queryset = queryset.select_related('user')
+        if is_field_requested(self.request, 'items.product'):
+            queryset = queryset.prefetch_related('items__product')
+        elif is_field_requested(self.request, 'items'):
+            queryset = queryset.prefetch_related('items')
         
         if self.request.user.is_staff:
             return queryset
         return queryset.filter(user=self.request.user)
 
+    def list(self, request, *args, **kwargs):
+        if not self.use_fast_serialization('orders.list'):
+            return super().list(request, *args, **kwargs)
+
+        # مسیر سریع: ردیف‌های .values() بدون prefetch؛ اقلام و محصولات صفحه با دو query
+        fast = OrderFastSerializer(self.get_serializer().fields, request)
+        rows = fast.values(self.filter_queryset(self.get_queryset()))
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.many(page))
+        return Response(fast.many(list(rows)))
+
     def create(self, request):
         """ثبت سفارش جدید از سبد خرید"""
         serializer = OrderCreateSerializer(data=request.data, context={'request': request})
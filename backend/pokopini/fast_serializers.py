@@ -0,0 +1,66 @@
+# مسیر سریع serialization برای endpointهای پرترافیک خواندنی
+#
+# به‌جای ساختن نمونه‌ی مدل و گذر از فیلدهای DRF برای هر ردیف، خروجی مستقیماً از
+# ردیف‌های .values() ساخته می‌شود:
+#   - برچسب choiceها از قبل در dict محاسبه شده‌اند
+#   - قیمت‌ها در خود query به عدد صحیح تبدیل می‌شوند (بدون Decimal) و رشته‌ی تومان
+#     همان خروجی DecimalField(decimal_places=0) است
+#   - تاریخ‌ها همان قالب ISO 8601 فیلد DateTimeField را دارند
+# خروجی باید بایت‌به‌بایت با serializerهای اصلی یکسان باشد (تست‌های قرارداد در
+# products/tests.py و orders/tests.py). فعال‌سازی برای هر ویو جداگانه است
+# (FAST_SERIALIZATION_VIEWS) تا بتوان تأخیر دو مسیر را مقایسه کرد.
+
+from django.conf import settings
+from django.db.models import BigIntegerField
+from django.db.models.functions import Cast
+from django.utils import timezone
+
+
+def readable_fields(fields):
+    """نام فیلدهای خروجی serializer به همان ترتیب (بدون فیلدهای write_only)"""
+    return [name for name, field in fields.items() if not field.write_only]
+
+
+def choice_labels(choices):
+    """dict مقدار -> برچسب فارسی برای choices مدل"""
+    return {value: str(label) for value, label in choices}
+
+
+def toman(expression):
+    """تبدیل ستون قیمت به عدد صحیح در خود query"""
+    return Cast(expression, BigIntegerField())
+
+
+def format_toman(value):
+    """خروجی DecimalField(decimal_places=0) برای عدد صحیح تومان"""
+    return None if value is None else str(value)
+
+
+def format_datetime(value):
+    """خروجی DateTimeField با DATETIME_FORMAT پیش‌فرض (ISO 8601)"""
+    if not value:
+        return None
+    if settings.USE_TZ and timezone.is_aware(value):
+        value = value.astimezone(timezone.get_current_timezone())
+    value = value.isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+def file_url(storage, name, request=None):
+    """خروجی FileField/ImageField برای نام فایل ذخیره‌شده"""
+    if not name:
+        return None
+    url = storage.url(name)
+    return request.build_absolute_uri(url) if request is not None else url
+
+
+class FastSerializationMixin:
+    """
+    ویوهایی که مسیر سریع دارند؛ نام ویو (مثلاً 'products.list') باید در
+    FAST_SERIALIZATION_VIEWS باشد
+    """
+
+    def use_fast_serialization(self, name):
+        return name in getattr(settings, 'FAST_SERIALIZATION_VIEWS', ())
@@ -0,0 +1,46 @@
+# renderer JSON مبتنی بر orjson - پیش‌فرض REST_FRAMEWORK
+#
+# orjson رشته‌ها را بدون escape (مثل UNICODE_JSON=True و خروجی فارسی خوانا) و به‌صورت
+# فشرده می‌نویسد و datetime، UUID، dataclass و آرایه‌های numpy را خودش serialize می‌کند.
+# برای بقیه‌ی انواع (Decimal، رشته‌های ترجمه‌ی lazy، QuerySet، ...) همان encoder
+# پیش‌فرض DRF به‌کار می‌رود تا خروجی با JSONRenderer یکی بماند.
+
+import orjson
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_encoder = JSONEncoder()
+
+ORJSON_OPTIONS = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+
+# JSONRenderer این دو کاراکتر را برای امن بودن در <script> escape می‌کند
+_LINE_SEPARATORS = ((b'\xe2\x80\xa8', b'\\u2028'), (b'\xe2\x80\xa9', b'\\u2029'))
+
+
+def orjson_default(obj):
+    """انواعی که orjson نمی‌شناسد: Decimal، Promise، QuerySet، timedelta، ..."""
+    return _encoder.default(obj)
+
+
+def orjson_dumps(data, indent=False):
+    content = orjson.dumps(
+        data, default=orjson_default, option=ORJSON_OPTIONS | (orjson.OPT_INDENT_2 if indent else 0)
+    )
+    for raw, escaped in _LINE_SEPARATORS:
+        if raw in content:
+            content = content.replace(raw, escaped)
+    return content
+
+
+class ORJSONRenderer(JSONRenderer):
+    """
+    جایگزین JSONRenderer با orjson؛ همان media type و رفتار indent
+    (orjson فقط فاصله‌ی ۲ را پشتیبانی می‌کند)
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        renderer_context = renderer_context or {}
+        indent = self.get_indent(accepted_media_type, renderer_context)
+        return orjson_dumps(data, indent=bool(indent))
@@ -0,0 +1,140 @@
+# انتخاب فیلدهای خروجی API با ?fields= و ?omit=
+#
+#   ?fields=id,name,items.product.name   فقط این فیلدها (مسیرهای تو در تو با نقطه)
+#   ?omit=variants,items.product.image   همه‌ی فیلدها به جز این‌ها
+#
+# فیلدها پیش از ساخت خروجی حذف می‌شوند، پس SerializerMethodField و propertyهای
+# فیلدهای حذف‌شده اصلاً اجرا نمی‌شوند. ویوها با is_field_requested می‌توانند
+# prefetch و annotateهای بی‌استفاده را هم کنار بگذارند.
+
+FIELDS_PARAM = 'fields'
+OMIT_PARAM = 'omit'
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+
+
+def parse_field_paths(value):
+    """
+    'id,items.product.name' -> {'id': {}, 'items': {'product': {'name': {}}}}
+    درخت خالی برای یک فیلد یعنی «کل فیلد»
+    """
+    if value is None:
+        return None
+    paths = value.split(',') if isinstance(value, str) else value
+    tree = {}
+    for path in paths:
+        parts = [part for part in path.strip().split('.') if part]
+        if not parts:
+            continue
+        node = tree
+        for index, part in enumerate(parts):
+            if part in node and not node[part] and index < len(parts) - 1:
+                # «items» قبلاً کامل خواسته شده؛ «items.product» محدودش نمی‌کند
+                break
+            if index == len(parts) - 1:
+                node[part] = {}
+            else:
+                node = node.setdefault(part, {})
+    return tree
+
+
+def _subtree(tree, path):
+    """زیر درخت مربوط به یک serializer تو در تو؛ None یعنی بدون محدودیت"""
+    for part in path:
+        if tree is None:
+            return None
+        child = tree.get(part)
+        if not child:
+            # fields: فیلد کامل خواسته شده؛ omit: چیزی زیر این مسیر حذف نشده است
+            # (حذف کامل فیلد در سطح والد انجام شده است)
+            return None
+        tree = child
+    return tree
+
+
+def sparse_fieldsets(request):
+    """
+    پارامترهای fields و omit درخواست - برای serializerهایی که بدون context ساخته می‌شوند:
+    CartSerializer(cart, **sparse_fieldsets(request))
+    """
+    if request is None or request.method not in SAFE_METHODS:
+        return {}
+    params = {}
+    for name in (FIELDS_PARAM, OMIT_PARAM):
+        value = request.query_params.get(name)
+        if value:
+            params[name] = value
+    return params
+
+
+def is_field_requested(request, path):
+    """
+    آیا مسیر (مثلاً 'items.product') در خروجی این درخواست هست؟
+    برای حذف prefetch/annotate فیلدهایی که خواسته نشده‌اند
+    """
+    params = sparse_fieldsets(request)
+    parts = path.split('.')
+
+    fields = parse_field_paths(params.get(FIELDS_PARAM))
+    node = fields
+    for part in parts:
+        if not node:
+            break
+        if part not in node:
+            return False
+        node = node[part]
+
+    omit = parse_field_paths(params.get(OMIT_PARAM))
+    node = omit
+    for part in parts:
+        if node is None or part not in node:
+            return True
+        if not node[part]:
+            return False
+        node = node[part]
+    return True
+
+
+class SparseFieldsetsMixin:
+    """
+    حذف فیلدها بر اساس ?fields= و ?omit= درخواست (از context) یا آرگومان‌های
+    fields و omit سازنده. serializerهای تو در تو (که خودشان هم این mixin را دارند)
+    زیر مسیر خودشان را اعمال می‌کنند. فقط برای درخواست‌های خواندنی اعمال می‌شود
+    تا اعتبارسنجی ورودی تغییر نکند.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._sparse_params = {
+            name: kwargs.pop(name) for name in (FIELDS_PARAM, OMIT_PARAM) if name in kwargs
+        }
+        super().__init__(*args, **kwargs)
+
+    def _sparse_source(self):
+        """(پارامترها، مسیر این serializer نسبت به serializer صاحب پارامترها)"""
+        path = []
+        node = self
+        while node is not None:
+            if getattr(node, '_sparse_params', None):
+                return node._sparse_params, path
+            if node.field_name:
+                path.insert(0, node.field_name)
+            node = node.parent
+        return sparse_fieldsets(self.context.get('request')), path
+
+    def get_fields(self):
+        fields = super().get_fields()
+        params, path = self._sparse_source()
+        if not params:
+            return fields
+
+        allowed = _subtree(parse_field_paths(params.get(FIELDS_PARAM)), path)
+        if allowed:
+            for name in list(fields):
+                if name not in allowed:
+                    fields.pop(name)
+
+        omitted = _subtree(parse_field_paths(params.get(OMIT_PARAM)), path)
+        if omitted:
+            for name, subtree in omitted.items():
+                if not subtree:
+                    fields.pop(name, None)
+        return fields
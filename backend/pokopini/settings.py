@@ -177,6 +177,35 @@ MEDIA_ROOT = BASE_DIR / 'media'
 # WhiteNoise configuration for static files
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedStaticFilesStorage'
 
+# Static catalog snapshots (products/snapshots.py) - served directly by nginx
+CATALOG_SNAPSHOT_ROOT = os.environ.get('CATALOG_SNAPSHOT_ROOT', str(BASE_DIR / 'snapshots'))
+CATALOG_SNAPSHOT_URL = '/snapshots/catalog/'
+CATALOG_SNAPSHOT_PAGES = 3  # تعداد صفحه‌های اول هر دسته
+CATALOG_SNAPSHOT_KEEP = 3  # تعداد نسخه‌های قبلی که نگه داشته می‌شوند
+
+# مسیر سریع serialization (pokopini/fast_serializers.py) برای مقایسه‌ی تأخیر، به تفکیک ویو:
+# products.list، orders.cart، orders.list - مثال: FAST_SERIALIZATION_VIEWS=products.list,orders.cart
+FAST_SERIALIZATION_VIEWS = [
+    name for name in os.environ.get('FAST_SERIALIZATION_VIEWS', '').split(',') if name
+]
+
+# Popularity ranking (products/popularity.py) - با دستور refresh_popularity به‌روز می‌شود
+POPULARITY_HALF_LIFE_DAYS = 14  # هر ۱۴ روز وزن یک فروش نصف می‌شود
+POPULARITY_WINDOW_DAYS = 90  # فروش‌های قدیمی‌تر خوانده نمی‌شوند
+POPULARITY_RATING_PRIOR = 5  # تعداد نظر فرضی با میانگین کل (میانگین بیزی)
+POPULARITY_RATING_WEIGHT = 2.0  # هر ستاره بالاتر از میانگین معادل دو فروش تازه
+
+# سبد خرید داغ (orders/cart_store.py): db (پیش‌فرض، مستقیم روی جدول‌ها)، redis یا locmem
+# با redis/locmem تغییرات با دستور flush_carts (مثلاً هر دقیقه با cron) و پیش از ثبت سفارش
+# در دیتابیس نوشته می‌شوند
+CART_BACKEND = os.environ.get('CART_BACKEND', 'db')
+CART_REDIS_URL = os.environ.get('CART_REDIS_URL', os.environ.get('REDIS_URL', 'redis://localhost:6379/2'))
+CART_STORE_TTL = 60 * 60 * 24 * 30  # سبدهای بی‌تغییر بعد از ۳۰ روز از Redis پاک می‌شوند
+
+# سبد مهمان (orders/guest_cart.py): اقلام در cache با کلید token کوکی امضاشده؛ هنگام ورود ادغام می‌شود
+GUEST_CART_COOKIE_NAME = 'guest_cart'
+GUEST_CART_TTL = 60 * 60 * 24 * 7  # سبد مهمان بی‌تغییر بعد از ۷ روز پاک می‌شود
+
 # Caching Configuration (Redis for production)
 if os.environ.get('REDIS_URL'):
     CACHES = {
@@ -213,6 +242,16 @@ REST_FRAMEWORK = {
     ),
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
     'PAGE_SIZE': 12,
+    # JSON با orjson (pokopini/renderers.py و parsers.py)
+    'DEFAULT_RENDERER_CLASSES': (
+        'pokopini.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'pokopini.parsers.ORJSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 # JWT Configuration
@@ -137,6 +137,16 @@ SIMPLE_JWT = {
     'BLACKLIST_AFTER_ROTATION': True,
 }
 
+# API: فقط JSON (orjson) - بدون BrowsableAPIRenderer در production
+REST_FRAMEWORK['DEFAULT_RENDERER_CLASSES'] = (
+    'pokopini.renderers.ORJSONRenderer',
+)
+REST_FRAMEWORK['DEFAULT_PARSER_CLASSES'] = (
+    'pokopini.parsers.ORJSONParser',
+    'rest_framework.parsers.FormParser',
+    'rest_framework.parsers.MultiPartParser',
+)
+
 # API throttling
 REST_FRAMEWORK['DEFAULT_THROTTLE_RATES'] = {
     'anon': '100/hour',
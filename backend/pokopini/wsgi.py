@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pokopini.settings')
 
 application = get_wsgi_application()
+
+# ساخت ایندکس پیشنهاد جستجوی محصولات هنگام شروع هر worker
+from products.suggest import warm_up_suggest_index  # noqa: E402
+
+warm_up_suggest_index()
@@ -1,7 +1,27 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.contrib.admin import helpers
+from django.template.response import TemplateResponse
 from .models import Product, ProductVariant
 
 
+class VariantMatrixForm(forms.Form):
+    """
+    فرم اکشن ساخت گروهی تنوع‌ها - همان ورودی VariantMatrixSerializer
+    """
+    colors = forms.MultipleChoiceField(
+        choices=ProductVariant.COLOR_CHOICES, widget=forms.CheckboxSelectMultiple, label='رنگ‌ها'
+    )
+    sizes = forms.MultipleChoiceField(
+        choices=ProductVariant.SIZE_CHOICES, widget=forms.CheckboxSelectMultiple, label='سایزها'
+    )
+    price = forms.DecimalField(
+        max_digits=10, decimal_places=0, min_value=0, required=False,
+        label='قیمت (تومان)', help_text='خالی: قیمت پایه هر محصول'
+    )
+    stock = forms.IntegerField(min_value=0, initial=0, label='موجودی')
+
+
 class ProductVariantInline(admin.TabularInline):
     """
     Inline برای مدیریت تنوع محصولات
@@ -19,15 +39,19 @@ class ProductAdmin(admin.ModelAdmin):
     """
     list_display = [
         'name', 'product_code', 'category', 'season',
-        'price', 'variants_count', 'is_active', 'created_at'
+        'price', 'variants_count', 'total_stock', 'is_active', 'created_at'
     ]
-    list_filter = ['category', 'season', 'is_active', 'created_at']
+    list_filter = ['category', 'season', 'is_active', 'in_stock', 'created_at']
     search_fields = ['name', 'product_code', 'description']
     ordering = ['-created_at']
-    readonly_fields = ['product_code', 'created_at', 'updated_at']
+    readonly_fields = [
+        'product_code', 'min_price', 'max_price', 'total_stock', 'variants_count',
+        'created_at', 'updated_at'
+    ]
     list_editable = ['is_active', 'price']
     list_per_page = 20
     inlines = [ProductVariantInline]
+    actions = ['complete_variant_matrix']
     
     fieldsets = (
         ('اطلاعات اصلی', {
@@ -40,20 +64,45 @@ class ProductAdmin(admin.ModelAdmin):
             'fields': ('price',),
             'description': 'قیمت پایه محصول - می‌توان برای هر تنوع قیمت جداگانه تعیین کرد'
         }),
+        ('خلاصه تنوع‌ها', {
+            'fields': ('min_price', 'max_price', 'total_stock', 'variants_count'),
+            'description': 'این مقادیر با هر تغییر در تنوع‌ها به‌صورت خودکار به‌روزرسانی می‌شوند'
+        }),
         ('وضعیت', {
             'fields': ('is_active', 'created_at', 'updated_at')
         }),
     )
-    
-    def variants_count(self, obj):
-        """تعداد تنوع‌های محصول"""
-        return obj.variants.count()
-    variants_count.short_description = 'تعداد تنوع'
-    
-    def get_queryset(self, request):
-        """بهینه‌سازی query"""
-        qs = super().get_queryset(request)
-        return qs.prefetch_related('variants')
+
+    @admin.action(description='ساخت گروهی تنوع‌ها (رنگ × سایز)')
+    def complete_variant_matrix(self, request, queryset):
+        """
+        صفحه‌ی میانی: رنگ‌ها، سایزها، قیمت و موجودی پیش‌فرض؛ برای هر محصول انتخاب‌شده
+        ترکیب‌هایی که تنوع ندارند ساخته می‌شوند (مثل POST /api/products/{id}/variants/bulk/)
+        """
+        form = VariantMatrixForm(request.POST if 'apply' in request.POST else None)
+        if form.is_valid():
+            data = form.cleaned_data
+            created = skipped = 0
+            for product in queryset:
+                counts = product.create_variant_matrix(
+                    ProductVariant.sort_colors(data['colors']), ProductVariant.sort_sizes(data['sizes']),
+                    price=data['price'], stock=data['stock'],
+                )
+                created += counts[0]
+                skipped += counts[1]
+            self.message_user(
+                request, f'{created} تنوع جدید ساخته شد؛ {skipped} ترکیب از قبل وجود داشت', messages.SUCCESS
+            )
+            return None
+
+        return TemplateResponse(request, 'admin/products/product/variant_matrix.html', {
+            **self.admin_site.each_context(request),
+            'title': 'ساخت گروهی تنوع‌ها',
+            'opts': self.model._meta,
+            'form': form,
+            'queryset': queryset,
+            'action_checkbox_name': helpers.ACTION_CHECKBOX_NAME,
+        })
 
 
 @admin.register(ProductVariant)
@@ -0,0 +1,158 @@
+# نسخه‌ی کاتالوگ و cache نسخه‌دار
+#
+# یک شمارنده در cache که با هر تغییر محصولات، تنوع‌ها و نظرات افزایش می‌یابد.
+# - کلیدهای cache کاتالوگ نسخه را در خود دارند؛ با افزایش نسخه همه‌ی آن‌ها یک‌جا
+#   بی‌اعتبار می‌شوند (بدون شمردن و حذف کلیدها) و خودشان منقضی می‌شوند.
+# - لایه‌های cache درون‌پردازه‌ای (مثل ایندکس پیشنهاد جستجو) با مقایسه‌ی نسخه
+#   می‌فهمند که باید خود را به‌روز کنند.
+
+import hashlib
+import time
+from functools import wraps
+
+from django.core.cache import cache
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from django.utils.http import parse_etags
+
+CATALOG_VERSION_KEY = 'catalog:version'
+
+# کلیدها با تغییر کاتالوگ بی‌اعتبار می‌شوند؛ مهلت فقط برای آزاد شدن حافظه است
+CATALOG_CACHE_TIMEOUT = 60 * 60 * 24
+
+_MISSING = object()
+
+
+def _initial_version():
+    # مقدار اولیه وابسته به زمان است تا بعد از پاک شدن cache، نسخه‌ی قدیمی تکرار نشود
+    return int(time.time() * 1000)
+
+
+def get_catalog_version():
+    """نسخه‌ی فعلی کاتالوگ"""
+    version = cache.get(CATALOG_VERSION_KEY)
+    if version is None:
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), None)
+        version = cache.get(CATALOG_VERSION_KEY)
+    return version
+
+
+def bump_catalog_version():
+    """افزایش اتمیک نسخه‌ی کاتالوگ - همه‌ی کلیدهای cache کاتالوگ بی‌اعتبار می‌شوند"""
+    try:
+        return cache.incr(CATALOG_VERSION_KEY)
+    except ValueError:
+        # کلید وجود نداشت (اولین تغییر یا پاک شدن cache)
+        cache.add(CATALOG_VERSION_KEY, _initial_version(), None)
+        return cache.incr(CATALOG_VERSION_KEY)
+
+
+# ----- نسخه‌ی موجودی هر محصول -----
+# فروش فقط موجودی تنوع‌ها را کم می‌کند. تا وقتی موجود بودن محصول عوض نشود، به‌جای
+# افزایش نسخه‌ی کل کاتالوگ فقط نسخه‌ی موجودی همان محصول افزایش می‌یابد؛ خروجی‌هایی
+# که موجودی تنوع‌ها را دارند (جزئیات محصول) این نسخه را در کلید خود دارند.
+
+def _stock_version_key(product_id):
+    return f'catalog:stock:{product_id}'
+
+
+def get_stock_versions(product_ids):
+    """{product_id: نسخه‌ی موجودی} با یک خواندن از cache"""
+    keys = {pk: _stock_version_key(pk) for pk in product_ids}
+    cached = cache.get_many(keys.values())
+    versions = {}
+    for pk, key in keys.items():
+        if key not in cached:
+            cache.add(key, _initial_version(), None)
+            cached[key] = cache.get(key)
+        versions[pk] = cached[key]
+    return versions
+
+
+def bump_stock_versions(product_ids):
+    """افزایش نسخه‌ی موجودی محصولات - فقط خروجی‌های شامل موجودی تنوع‌ها بی‌اعتبار می‌شوند"""
+    for pk in product_ids:
+        key = _stock_version_key(pk)
+        try:
+            cache.incr(key)
+        except ValueError:
+            cache.add(key, _initial_version(), None)
+            cache.incr(key)
+
+
+def catalog_cache_key(namespace, *parts, version=None):
+    """
+    کلید cache کاتالوگ: catalog:<نسخه>:<namespace>:<hash اجزا>
+    """
+    if version is None:
+        version = get_catalog_version()
+    raw = '\x1f'.join(str(part) for part in parts)
+    digest = hashlib.sha1(raw.encode('utf-8')).hexdigest()
+    return f'catalog:{version}:{namespace}:{digest}'
+
+
+def catalog_cache_get_or_set(namespace, parts, compute, timeout=CATALOG_CACHE_TIMEOUT):
+    """
+    مقدار از cache نسخه‌ی فعلی کاتالوگ، یا محاسبه با compute() و ذخیره
+    """
+    key = catalog_cache_key(namespace, *parts)
+    value = cache.get(key, _MISSING)
+    if value is _MISSING:
+        value = compute()
+        cache.set(key, value, timeout)
+    return value
+
+
+# ----- cache پاسخ‌های HTTP کاتالوگ -----
+
+def _normalized_query(request):
+    return '&'.join(
+        f'{key}={value}'
+        for key in sorted(request.query_params)
+        for value in sorted(request.query_params.getlist(key))
+    )
+
+
+def cache_catalog_response(view_method):
+    """
+    cache بدنه‌ی render شده‌ی پاسخ‌های GET کاتالوگ با ETag قوی وابسته به نسخه‌ی کاتالوگ.
+    کلید: host، مسیر، query string یکسان‌شده، ادمین/عادی و نوع محتوای پاسخ.
+    If-None-Match منطبق بدون اجرای view پاسخ 304 می‌گیرد.
+    پاسخ‌های یک محصول (pk) نسخه‌ی موجودی آن را هم در کلید دارند.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        scope = 'staff' if request.user.is_staff else 'public'
+        pk = kwargs.get('pk')
+        key = catalog_cache_key(
+            'response', request.get_host(), request.path, _normalized_query(request),
+            scope, request.accepted_media_type,
+            get_stock_versions([pk])[pk] if pk is not None else None,
+        )
+        version, digest = key.split(':')[1], key.rsplit(':', 1)[1]
+        etag = f'"{version}-{digest[:20]}"'
+        cache_control = f'{scope if scope == "public" else "private"}, no-cache'
+
+        if etag in parse_etags(request.META.get('HTTP_IF_NONE_MATCH', '')):
+            response = HttpResponseNotModified()
+        else:
+            cached = cache.get(key)
+            if cached is not None:
+                content, content_type = cached
+                response = HttpResponse(content, content_type=content_type)
+            else:
+                response = self.finalize_response(
+                    request, view_method(self, request, *args, **kwargs), *args, **kwargs
+                )
+                if response.status_code != 200:
+                    return response
+                response.render()
+                cache.set(key, (response.content, response['Content-Type']), CATALOG_CACHE_TIMEOUT)
+
+        response['ETag'] = etag
+        response['Cache-Control'] = cache_control
+        patch_vary_headers(response, ['Accept', 'Authorization', 'Cookie'])
+        # APIView.finalize_response هدرهای پیش‌فرض (Vary: Accept) را دوباره روی پاسخ می‌نویسد
+        self.headers['Vary'] = response['Vary']
+        return response
+    return wrapper
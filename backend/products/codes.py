@@ -0,0 +1,116 @@
+# تخصیص کد محصول (PKP-XXXXX) پیش از درج
+#
+# PostgreSQL: sequence اختصاصی products_product_code_seq (ساخته شده در migration)
+# سایر دیتابیس‌ها (SQLite): جدول شمارنده‌ی CodeSequence که بلوک‌های کد را
+# یک‌جا رزرو می‌کند؛ کدهای باقی‌مانده‌ی بلوک در حافظه‌ی پردازه نگه داشته می‌شوند
+# (فقط وقتی رزرو خارج از تراکنش و قطعی است).
+# کد قبل از INSERT معلوم است، پس ذخیره‌ی تکی، bulk_create و ورود گروهی یک write دارند.
+# کدها یکتا هستند ولی ممکن است فاصله داشته باشند. کدهای صریح ورود گروهی
+# شمارنده را با advance_product_codes جلو می‌برند.
+
+import re
+import threading
+
+from django.db import connections, transaction
+from django.db.models import F
+
+PRODUCT_CODE_PREFIX = 'PKP'
+PRODUCT_CODE_SEQUENCE = 'products_product_code_seq'
+PRODUCT_CODE_RE = re.compile(rf'^{PRODUCT_CODE_PREFIX}-(\d+)$')
+
+# تعداد کدی که برای ذخیره‌های تکی از جدول شمارنده رزرو می‌شود
+CODE_BLOCK_SIZE = 20
+
+_blocks = {}
+_blocks_lock = threading.Lock()
+
+
+def format_product_code(number):
+    return f'{PRODUCT_CODE_PREFIX}-{number:05d}'
+
+
+def product_code_number(code):
+    """شماره‌ی کد PKP-XXXXX یا None"""
+    match = PRODUCT_CODE_RE.match(code or '')
+    return int(match.group(1)) if match else None
+
+
+def uses_sequence(using='default'):
+    return connections[using].vendor == 'postgresql'
+
+
+def _reserve(count, using):
+    """رزرو count شماره از جدول شمارنده - آخرین شماره‌ی رزرو شده را برمی‌گرداند"""
+    from .models import CodeSequence
+
+    with transaction.atomic(using=using):
+        updated = CodeSequence.objects.using(using).filter(name=PRODUCT_CODE_SEQUENCE).update(
+            value=F('value') + count
+        )
+        if not updated:
+            CodeSequence.objects.using(using).create(name=PRODUCT_CODE_SEQUENCE, value=count)
+        return CodeSequence.objects.using(using).get(name=PRODUCT_CODE_SEQUENCE).value
+
+
+def _allocate_numbers(count, using):
+    if uses_sequence(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                'SELECT nextval(%s) FROM generate_series(1, %s)', [PRODUCT_CODE_SEQUENCE, count]
+            )
+            return [row[0] for row in cursor.fetchall()]
+
+    # رزرو درون تراکنش با rollback برمی‌گردد، پس فقط در autocommit بلوک نگه داشته می‌شود
+    if count >= CODE_BLOCK_SIZE or connections[using].in_atomic_block:
+        last = _reserve(count, using)
+        return list(range(last - count + 1, last + 1))
+
+    with _blocks_lock:
+        block = _blocks.get(using)
+        if block is None or len(block) < count:
+            last = _reserve(CODE_BLOCK_SIZE, using)
+            block = _blocks[using] = list(range(last - CODE_BLOCK_SIZE + 1, last + 1))
+        numbers, _blocks[using] = block[:count], block[count:]
+        return numbers
+
+
+def allocate_product_codes(count, using='default'):
+    """count کد محصول جدید با یک رفت‌وبرگشت به دیتابیس (یا بدون آن، از بلوک رزرو شده)"""
+    if count <= 0:
+        return []
+    return [format_product_code(number) for number in _allocate_numbers(count, using)]
+
+
+def advance_product_codes(codes, using='default'):
+    """
+    جلو بردن sequence/شمارنده تا بعد از بزرگ‌ترین کد PKP-XXXXX داده‌شده؛ برای کدهایی
+    که از بیرون (ورود گروهی) می‌آیند تا کدهای تخصیصی بعدی با آن‌ها برخورد نکنند
+    """
+    from .models import CodeSequence
+
+    numbers = [number for number in map(product_code_number, codes) if number is not None]
+    if not numbers:
+        return
+    last = max(numbers)
+    if uses_sequence(using):
+        with connections[using].cursor() as cursor:
+            cursor.execute(
+                f'SELECT setval(%s, GREATEST(%s, (SELECT last_value FROM {PRODUCT_CODE_SEQUENCE})))',
+                [PRODUCT_CODE_SEQUENCE, last],
+            )
+        return
+
+    with transaction.atomic(using=using):
+        sequence, created = CodeSequence.objects.using(using).get_or_create(
+            name=PRODUCT_CODE_SEQUENCE, defaults={'value': last}
+        )
+        if not created:
+            CodeSequence.objects.using(using).filter(pk=sequence.pk, value__lt=last).update(value=last)
+    # بلوک‌های رزرو شده ممکن است شماره‌های گرفته‌شده را داشته باشند
+    reset_code_blocks()
+
+
+def reset_code_blocks():
+    """فراموش کردن بلوک‌های رزرو شده (مثلاً در تست‌ها یا بعد از تغییر شمارنده)"""
+    with _blocks_lock:
+        _blocks.clear()
@@ -0,0 +1,142 @@
+# شمارش facetهای کاتالوگ (دسته، فصل، رنگ، سایز، بازه قیمت، موجودی)
+#
+# هر facet با همه فیلترهای درخواست به‌جز فیلتر خودش شمرده می‌شود تا کاربر
+# بتواند گزینه‌های دیگرِ همان facet را هم ببیند. تعداد queries ثابت است
+# (یک query گروهی برای هر facet) و نتیجه بر اساس نسخه‌ی کاتالوگ cache می‌شود.
+
+from django.db.models import Count, Max, Min, Q
+
+from .cache import catalog_cache_get_or_set
+from .filters import ProductFilter
+from .models import Product, ProductVariant
+
+# بازه‌های قیمت (تومان) - None یعنی بدون حد
+PRICE_RANGES = [
+    (None, 100000),
+    (100000, 200000),
+    (200000, 500000),
+    (500000, None),
+]
+
+# نام‌های جایگزین پارامترها (FilterSidebar از colors و sizes استفاده می‌کند)
+PARAM_ALIASES = {'colors': 'color', 'sizes': 'size'}
+MULTI_VALUE_PARAMS = {'color', 'size'}
+
+
+def normalize_facet_params(query_params):
+    """
+    یکسان‌سازی پارامترهای فیلتر برای کلید cache: ترتیب، نام‌های جایگزین و مقادیر خالی
+    """
+    params = {}
+    for key in sorted(ProductFilter.facet_params() | {'search'}):
+        name = PARAM_ALIASES.get(key, key)
+        values = [value.strip() for value in query_params.getlist(key) if value.strip()]
+        if not values:
+            continue
+        if name in MULTI_VALUE_PARAMS:
+            merged = set(params.get(name, '').split(',')) - {''}
+            merged.update(v for value in values for v in value.split(',') if v)
+            params[name] = ','.join(sorted(merged))
+        else:
+            params[name] = values[-1]
+    return params
+
+
+def _choice_counts(rows, field, choices):
+    counts = {row[field]: row['count'] for row in rows}
+    return [
+        {'value': value, 'label': label, 'count': counts[value]}
+        for value, label in choices if counts.get(value)
+    ]
+
+
+def _toman(value):
+    return int(value) if value is not None else None
+
+
+def compute_facets(queryset, params):
+    """
+    محاسبه‌ی همه facetها برای queryset محصولات (بعد از جستجو) و پارامترهای یکسان‌شده
+    """
+    def narrowed(facet):
+        """
+        محصولات با همه فیلترها به‌جز فیلتر خود facet، و شرط‌های تنوع باقی‌مانده؛
+        شمارش facetهای تنوع همان شرط‌ها را روی همان تنوع می‌خواهد (مثل لیست)
+        """
+        data = {
+            key: value for key, value in params.items()
+            if key not in ProductFilter.FACET_PARAMS[facet]
+        }
+        product_filter = ProductFilter(data, queryset=queryset)
+        products = product_filter.qs.order_by()
+        return products, product_filter.variant_lookups()
+
+    def variant_counts(facet, field):
+        products, lookups = narrowed(facet)
+        return (
+            ProductVariant.objects
+            .filter(is_active=True, product__in=products.values('id'), **lookups)
+            .order_by()
+            .values(field)
+            .annotate(count=Count('product', distinct=True))
+        )
+
+    category_rows = narrowed('category')[0].values('category').annotate(count=Count('id'))
+    season_rows = narrowed('season')[0].values('season').annotate(count=Count('id'))
+
+    products, lookups = narrowed('price')
+    price_aggregates = {
+        f'range_{index}': Count('id', filter=ProductFilter.variant_condition({
+            **lookups,
+            **({'price__gte': low} if low is not None else {}),
+            **({'price__lt': high} if high is not None else {}),
+        }))
+        for index, (low, high) in enumerate(PRICE_RANGES)
+    }
+    price = products.aggregate(
+        lowest=Min('min_price'), highest=Max('max_price'), **price_aggregates
+    )
+
+    # «موجود» مثل فیلتر in_stock=true روی تنوع‌ها؛ «ناموجود» مثل in_stock=false روی ستون محصول
+    products, lookups = narrowed('in_stock')
+    stock = products.aggregate(
+        total=Count('id'),
+        available=Count('id', filter=ProductFilter.variant_condition({**lookups, 'stock__gt': 0})),
+        unavailable=Count('id', filter=Q(in_stock=False)),
+    )
+    in_stock_param = params.get('in_stock', '').lower()
+    if in_stock_param in ('true', '1'):
+        count = stock['available']
+    elif in_stock_param in ('false', '0'):
+        count = stock['unavailable']
+    else:
+        count = stock['total']
+
+    return {
+        'count': count,
+        'category': _choice_counts(category_rows, 'category', Product.CATEGORY_CHOICES),
+        'season': _choice_counts(season_rows, 'season', Product.SEASON_CHOICES),
+        'color': _choice_counts(variant_counts('color', 'color'), 'color', ProductVariant.COLOR_CHOICES),
+        'size': _choice_counts(variant_counts('size', 'size'), 'size', ProductVariant.SIZE_CHOICES),
+        'price': {
+            'min': _toman(price['lowest']),
+            'max': _toman(price['highest']),
+            'ranges': [
+                {'min': low, 'max': high, 'count': price[f'range_{index}']}
+                for index, (low, high) in enumerate(PRICE_RANGES)
+            ],
+        },
+        'in_stock': {
+            'true': stock['available'],
+            'false': stock['unavailable'],
+        },
+    }
+
+
+def get_facets(queryset, params, is_staff=False):
+    """facetها از cache نسخه‌دار کاتالوگ، یا محاسبه و ذخیره"""
+    scope = 'staff' if is_staff else 'public'
+    query = '&'.join(f'{key}={value}' for key, value in sorted(params.items()))
+    return catalog_cache_get_or_set(
+        'facets', (scope, query), lambda: compute_facets(queryset, params)
+    )
@@ -0,0 +1,91 @@
+import django_filters
+from django.db.models import Exists, OuterRef, Q
+
+from .models import Product, ProductVariant
+
+
+class CharInFilter(django_filters.BaseInFilter, django_filters.CharFilter):
+    """فیلتر چندمقداری با مقادیر جدا شده با کاما (color=red,blue)"""
+
+
+class ProductFilter(django_filters.FilterSet):
+    """
+    فیلترهای کاتالوگ محصولات - مشترک بین لیست محصولات و facets.
+    فیلترهای سطح تنوع (رنگ، سایز، قیمت، موجودی) با یک EXISTS روی تنوع‌های فعال
+    اعمال می‌شوند، پس همه‌ی شرط‌ها باید روی یک تنوع برقرار باشند
+    (مثلاً «قرمز سایز ۲ سال که موجود است»).
+    """
+    category = django_filters.ChoiceFilter(choices=Product.CATEGORY_CHOICES)
+    season = django_filters.ChoiceFilter(choices=Product.SEASON_CHOICES)
+    color = CharInFilter(method='filter_variant', label='رنگ')
+    colors = CharInFilter(method='filter_variant', label='رنگ‌ها')
+    size = CharInFilter(method='filter_variant', label='سایز')
+    sizes = CharInFilter(method='filter_variant', label='سایزها')
+    min_price = django_filters.NumberFilter(method='filter_variant', label='حداقل قیمت')
+    max_price = django_filters.NumberFilter(method='filter_variant', label='حداکثر قیمت')
+    in_stock = django_filters.BooleanFilter(method='filter_variant', label='فقط موجود')
+
+    # پارامترهایی که هر facet نادیده می‌گیرد (facet روی خودش فیلتر نمی‌شود)
+    FACET_PARAMS = {
+        'category': ['category'],
+        'season': ['season'],
+        'color': ['color', 'colors'],
+        'size': ['size', 'sizes'],
+        'price': ['min_price', 'max_price'],
+        'in_stock': ['in_stock'],
+    }
+
+    class Meta:
+        model = Product
+        fields = ['category', 'season']
+
+    def filter_variant(self, queryset, name, value):
+        # همه فیلترهای تنوع با هم در filter_queryset اعمال می‌شوند
+        return queryset
+
+    def variant_lookups(self):
+        """شرط‌های تنوع از روی مقادیر معتبر فرم"""
+        data = self.form.cleaned_data
+        lookups = {}
+        colors = {*(data.get('color') or []), *(data.get('colors') or [])}
+        sizes = {*(data.get('size') or []), *(data.get('sizes') or [])}
+        if colors:
+            lookups['color__in'] = sorted(colors)
+        if sizes:
+            lookups['size__in'] = sorted(sizes)
+        if data.get('min_price') is not None:
+            lookups['price__gte'] = data['min_price']
+        if data.get('max_price') is not None:
+            lookups['price__lte'] = data['max_price']
+        if data.get('in_stock'):
+            lookups['stock__gt'] = 0
+        return lookups
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+
+        if self.form.cleaned_data.get('in_stock') is False:
+            queryset = queryset.filter(in_stock=False)
+
+        lookups = self.variant_lookups()
+        if not lookups:
+            return queryset
+        return queryset.filter(self.variant_condition(lookups))
+
+    @staticmethod
+    def variant_condition(lookups):
+        """
+        شرط محصول برای شرط‌های تنوع: تنوع فعالی که همه‌ی lookups روی آن برقرار باشد
+        (facetها هم با همین شرط شمرده می‌شوند)
+        """
+        condition = Q(Exists(
+            ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True, **lookups)
+        ))
+        # محصول بدون تنوع فقط در فیلتر قیمت شرکت می‌کند (با قیمت پایه)
+        if set(lookups) <= {'price__gte', 'price__lte', 'price__lt'}:
+            condition |= Q(variants_count=0, **lookups)
+        return condition
+
+    @classmethod
+    def facet_params(cls):
+        return {param for params in cls.FACET_PARAMS.values() for param in params}
@@ -0,0 +1,143 @@
+# نسخه‌های واکنش‌گرای تصاویر محصولات
+#
+# برای هر تصویر آپلود شده چند عرض ثابت به دو فرمت WebP و JPEG (برای مرورگرهای قدیمی)
+# ساخته می‌شود. در فیلد image_variants فقط اطلاعات فشرده ذخیره می‌شود:
+#   {"src": "products/a.jpg", "w": 1600, "h": 2000, "v": [[320, 400], [640, 800], ...]}
+# مسیر هر نسخه از روی src و عرض ساخته می‌شود (products/derived/a-320w.webp).
+
+import io
+import logging
+import posixpath
+
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, UnidentifiedImageError
+
+logger = logging.getLogger(__name__)
+
+IMAGE_WIDTHS = (320, 640, 1024)
+
+# فرمت خروجی: (پسوند، فرمت Pillow، تنظیمات ذخیره)
+IMAGE_FORMATS = {
+    'webp': ('webp', 'WEBP', {'quality': 80, 'method': 4}),
+    'jpeg': ('jpg', 'JPEG', {'quality': 82, 'optimize': True, 'progressive': True}),
+}
+
+DERIVED_DIR = 'derived'
+
+
+def derivative_name(source, width, fmt):
+    """مسیر نسخه‌ی یک عرض و فرمت: <پوشه>/derived/<نام>-<عرض>w.<پسوند>"""
+    directory, filename = posixpath.split(source)
+    stem = posixpath.splitext(filename)[0]
+    extension = IMAGE_FORMATS[fmt][0]
+    return posixpath.join(directory, DERIVED_DIR, f'{stem}-{width}w.{extension}')
+
+
+def _encode(image, fmt):
+    _, pillow_format, options = IMAGE_FORMATS[fmt]
+    if pillow_format == 'JPEG' and image.mode != 'RGB':
+        background = Image.new('RGB', image.size, 'white')
+        background.paste(image, mask=image.getchannel('A') if 'A' in image.getbands() else None)
+        image = background
+    buffer = io.BytesIO()
+    image.save(buffer, pillow_format, **options)
+    return buffer.getvalue()
+
+
+def _store(storage, name, content):
+    # نام ثابت است و نباید با پسوند تصادفی ذخیره شود
+    if storage.exists(name):
+        storage.delete(name)
+    storage.save(name, ContentFile(content))
+
+
+def build_image_variants(storage, source):
+    """
+    ساخت نسخه‌های تصویر source در storage و برگرداندن داده‌ی فشرده‌ی image_variants.
+    تصویر هیچ‌وقت بزرگ‌تر از اندازه‌ی اصلی نمی‌شود.
+    """
+    with storage.open(source, 'rb') as file:
+        with Image.open(file) as original:
+            image = ImageOps.exif_transpose(original)
+            if image.mode not in ('RGB', 'RGBA'):
+                image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+            image.load()
+
+    width, height = image.size
+    widths = [w for w in IMAGE_WIDTHS if w < width] or [width]
+    variants = []
+    for target in widths:
+        resized = image.resize(
+            (target, max(1, round(height * target / width))), Image.Resampling.LANCZOS
+        ) if target != width else image
+        for fmt in IMAGE_FORMATS:
+            _store(storage, derivative_name(source, target, fmt), _encode(resized, fmt))
+        variants.append([target, resized.height])
+
+    return {'src': source, 'w': width, 'h': height, 'v': variants}
+
+
+def delete_image_variants(storage, data):
+    """حذف فایل‌های نسخه‌های قبلی (بعد از تعویض تصویر)"""
+    for width, _ in data.get('v', []):
+        for fmt in IMAGE_FORMATS:
+            name = derivative_name(data['src'], width, fmt)
+            if storage.exists(name):
+                storage.delete(name)
+
+
+def refresh_image_variants(instance, field_name='image'):
+    """
+    اگر تصویر instance عوض شده، نسخه‌ها ساخته و در image_variants ذخیره می‌شوند.
+    خطای خواندن تصویر ذخیره‌ی مدل را متوقف نمی‌کند.
+    """
+    field_file = getattr(instance, field_name)
+    current = instance.image_variants or {}
+    if field_file and current.get('src') == field_file.name:
+        return False
+    if not field_file and not current:
+        return False
+
+    storage = field_file.storage
+    data = {}
+    if field_file:
+        try:
+            data = build_image_variants(storage, field_file.name)
+        except (OSError, UnidentifiedImageError, Image.DecompressionBombError):
+            logger.warning('Could not build image variants for %s', field_file.name, exc_info=True)
+            return False
+    if current.get('src'):
+        delete_image_variants(storage, current)
+
+    instance.image_variants = data
+    # بدون سیگنال و به‌روزرسانی خلاصه‌ها - فقط همین ستون
+    type(instance)._base_manager.filter(pk=instance.pk).update(image_variants=data)
+    return True
+
+
+def image_variants_representation(data, storage, request=None):
+    """
+    خروجی API: ابعاد اصلی، srcset آماده برای هر فرمت و لیست نسخه‌ها
+    """
+    if not data or not data.get('v'):
+        return None
+
+    def url(name):
+        value = storage.url(name)
+        return request.build_absolute_uri(value) if request is not None else value
+
+    sources = []
+    srcset = {fmt: [] for fmt in IMAGE_FORMATS}
+    for width, height in data['v']:
+        source = {'width': width, 'height': height}
+        for fmt in IMAGE_FORMATS:
+            source[fmt] = url(derivative_name(data['src'], width, fmt))
+            srcset[fmt].append(f'{source[fmt]} {width}w')
+        sources.append(source)
+
+    return {
+        'width': data['w'],
+        'height': data['h'],
+        'srcset': {fmt: ', '.join(items) for fmt, items in srcset.items()},
+        'sources': sources,
+    }
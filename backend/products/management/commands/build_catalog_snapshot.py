@@ -0,0 +1,70 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.cache import get_catalog_version
+from products.snapshots import build_snapshot
+
+
+class Command(BaseCommand):
+    """
+    ساخت snapshot ایستای کاتالوگ (فایل‌های JSON از قبل gzip شده برای nginx).
+    با --watch به تغییر نسخه‌ی کاتالوگ گوش می‌دهد و بعد از آرام شدن تغییرات
+    (debounce) snapshot جدید منتشر می‌کند.
+    """
+    help = 'ساخت و انتشار snapshot ایستای کاتالوگ'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--watch',
+            action='store_true',
+            help='اجرای دائمی و ساخت مجدد بعد از هر تغییر کاتالوگ'
+        )
+        parser.add_argument(
+            '--debounce',
+            type=float,
+            default=30,
+            help='ثانیه‌هایی که نسخه باید بدون تغییر بماند تا ساخت شروع شود'
+        )
+        parser.add_argument(
+            '--max-delay',
+            type=float,
+            default=300,
+            help='حداکثر تأخیر ساخت در تغییرات پیوسته (ثانیه)'
+        )
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=5,
+            help='فاصله‌ی بررسی نسخه‌ی کاتالوگ (ثانیه)'
+        )
+
+    def build(self):
+        manifest = build_snapshot()
+        self.stdout.write(self.style.SUCCESS(
+            f"✓ snapshot نسخه‌ی {manifest['version']} منتشر شد ({manifest['files']} فایل)"
+        ))
+        return manifest['version']
+
+    def handle(self, *args, **options):
+        published = self.build()
+        if not options['watch']:
+            return
+
+        changed_at = None  # زمان اولین تغییر منتشرنشده
+        seen, seen_at = published, time.monotonic()
+        while True:
+            time.sleep(options['interval'])
+            version = str(get_catalog_version())
+            now = time.monotonic()
+            if version != seen:
+                seen, seen_at = version, now
+                changed_at = changed_at or now
+            if changed_at is None or version == published:
+                changed_at = None
+                continue
+            quiet = now - seen_at >= options['debounce']
+            overdue = now - changed_at >= options['max_delay']
+            if quiet or overdue:
+                published = self.build()
+                changed_at = None
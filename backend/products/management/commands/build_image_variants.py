@@ -0,0 +1,104 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.apps import apps
+from django.core.management.base import BaseCommand
+from django.db import connections
+
+from products.cache import bump_catalog_version
+from products.images import build_image_variants, delete_image_variants
+from products.models import Product, ProductVariant
+
+
+def _build(task):
+    """اجرا در پردازه‌ی جداگانه - فقط storage، بدون دیتابیس"""
+    label, pk, source, previous = task
+    storage = apps.get_model(label)._meta.get_field('image').storage
+    try:
+        data = build_image_variants(storage, source)
+    except Exception as exc:  # noqa: BLE001 - خطای یک تصویر بقیه را متوقف نمی‌کند
+        return label, pk, None, f'{source}: {exc}'
+    if previous.get('src') and previous['src'] != source:
+        delete_image_variants(storage, previous)
+    return label, pk, data, None
+
+
+class Command(BaseCommand):
+    """
+    ساخت نسخه‌های واکنش‌گرای (WebP/JPEG) تصاویر موجود محصولات و تنوع‌ها
+    به‌صورت موازی با چند پردازه
+    """
+    help = 'ساخت نسخه‌های کوچک‌شده‌ی تصاویر محصولات موجود'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=os.cpu_count() or 2,
+            help='تعداد پردازه‌ها'
+        )
+        parser.add_argument(
+            '--force',
+            action='store_true',
+            help='ساخت مجدد حتی برای تصاویری که نسخه دارند'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=200,
+            help='تعداد ردیف‌ها در هر به‌روزرسانی دیتابیس'
+        )
+
+    def _tasks(self, model, force):
+        rows = (
+            model._base_manager.exclude(image='').exclude(image__isnull=True)
+            .order_by('id').values_list('id', 'image', 'image_variants')
+        )
+        for pk, source, current in rows.iterator():
+            current = current or {}
+            if force or current.get('src') != source:
+                yield model._meta.label, pk, source, current
+
+    def handle(self, *args, **options):
+        tasks = [
+            *self._tasks(Product, options['force']),
+            *self._tasks(ProductVariant, options['force']),
+        ]
+        if not tasks:
+            self.stdout.write(self.style.SUCCESS('✓ همه تصاویر نسخه دارند'))
+            return
+
+        # اتصال‌های دیتابیس نباید با fork بین پردازه‌ها مشترک شوند
+        connections.close_all()
+
+        pending = {Product._meta.label: [], ProductVariant._meta.label: []}
+        done = failed = 0
+        with ProcessPoolExecutor(max_workers=options['workers']) as executor:
+            for label, pk, data, error in executor.map(_build, tasks, chunksize=4):
+                if error:
+                    failed += 1
+                    self.stderr.write(self.style.WARNING(f'  ✗ {error}'))
+                    continue
+                pending[label].append((pk, data))
+                done += 1
+                if len(pending[label]) >= options['batch_size']:
+                    self._save(label, pending[label])
+                    pending[label] = []
+                    self.stdout.write(f'  {done}/{len(tasks)} تصویر پردازش شد')
+
+        for label, rows in pending.items():
+            self._save(label, rows)
+        if done:
+            bump_catalog_version()
+
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ نسخه‌های {done} تصویر ساخته شد' + (f' ({failed} خطا)' if failed else '')
+        ))
+
+    def _save(self, label, rows):
+        if not rows:
+            return
+        model = apps.get_model(label)
+        objects = [model(pk=pk, image_variants=data) for pk, data in rows]
+        # _base_manager: بدون سیگنال‌ها و به‌روزرسانی خلاصه‌ی تنوع‌ها
+        model._base_manager.bulk_update(objects, ['image_variants'])
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from products.codes import allocate_product_codes
+from products.models import Product
+
+
+class Command(BaseCommand):
+    """
+    تولید کد محصول برای محصولاتی که کد ندارند - تخصیص و به‌روزرسانی دسته‌ای
+    """
+    help = 'تولید کد محصول برای محصولات بدون کد'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='تعداد محصولات در هر دسته'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(
+            Product.objects.filter(product_code__isnull=True).order_by('id').values_list('id', flat=True)
+        )
+        if not ids:
+            self.stdout.write(self.style.SUCCESS('✓ همه محصولات دارای کد محصول هستند'))
+            return
+
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            products = [
+                Product(pk=pk, product_code=code)
+                for pk, code in zip(batch, allocate_product_codes(len(batch)))
+            ]
+            Product.objects.bulk_update(products, ['product_code'])
+            self.stdout.write(f'  {start + len(batch)}/{len(ids)} محصول')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ کد برای {len(ids)} محصول تولید شد'))
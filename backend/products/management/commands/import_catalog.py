@@ -0,0 +1,336 @@
+import csv
+import json
+import time
+from decimal import Decimal, InvalidOperation
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from products.cache import bump_catalog_version
+from products.codes import advance_product_codes, allocate_product_codes
+from products.images import refresh_image_variants
+from products.models import Product, ProductVariant
+from products.search import update_search_vectors
+
+PRODUCT_UPDATE_FIELDS = ['name', 'description', 'price', 'category', 'season', 'image', 'is_active']
+# ستون‌هایی که محصول جدید حتماً لازم دارد و مقدار پیش‌فرض بقیه‌ی ستون‌ها
+PRODUCT_REQUIRED_FIELDS = ['name', 'price', 'category', 'season']
+PRODUCT_DEFAULTS = {'description': '', 'image': '', 'is_active': True}
+VARIANT_UPDATE_FIELDS = ['price', 'stock', 'is_active', 'sku']
+
+TRUE_VALUES = {'1', 'true', 'yes', 'y', 'بله'}
+
+
+class RowError(ValueError):
+    """ردیف نامعتبر - ردیف رد می‌شود و ورود ادامه پیدا می‌کند"""
+
+
+def _decimal(value, field):
+    try:
+        return Decimal(str(value).replace(',', '').strip())
+    except (InvalidOperation, ValueError):
+        raise RowError(f'{field} نامعتبر: {value!r}')
+
+
+def _bool(value, default=True):
+    if value in (None, ''):
+        return default
+    if isinstance(value, bool):
+        return value
+    return str(value).strip().lower() in TRUE_VALUES
+
+
+class Command(BaseCommand):
+    """
+    ورود گروهی کاتالوگ از فایل CSV یا JSONL با حافظه‌ی ثابت.
+
+    CSV: هر ردیف یک تنوع؛ ستون‌های محصول (product_code, name, description, price,
+    category, season, image, is_active) در ردیف‌های تنوع‌های یک محصول تکرار می‌شوند
+    و ستون‌های تنوع color, size, variant_price, stock, sku, variant_is_active هستند.
+    JSONL: هر خط یک ردیف مثل CSV، یا یک محصول با لیست "variants".
+
+    محصولات بدون product_code کد جدید می‌گیرند (products/codes.py).
+    محصولات جدید درج و محصولات موجود (بر اساس product_code) فقط در ستون‌هایی که در
+    فایل آمده‌اند به‌روزرسانی می‌شوند؛ پس فایل فقط قیمت و موجودی، توضیحات و تصویر را
+    پاک نمی‌کند. تنوع‌ها بر اساس (محصول، رنگ، سایز) با bulk_create(update_conflicts=True)
+    و باز هم فقط در ستون‌های آمده درج یا به‌روزرسانی می‌شوند؛ sku تکراری برای ترکیب
+    دیگر ردیف را رد می‌کند. خلاصه‌ی تنوع‌ها و بردار جستجو یک‌بار در پایان بازسازی می‌شوند.
+    """
+    help = 'ورود گروهی محصولات و تنوع‌ها از فایل CSV یا JSONL'
+
+    def add_arguments(self, parser):
+        parser.add_argument('path', help='مسیر فایل CSV یا JSONL')
+        parser.add_argument(
+            '--format',
+            choices=['csv', 'jsonl'],
+            help='فرمت فایل (پیش‌فرض: از روی پسوند)'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='تعداد تنوع‌ها در هر دسته'
+        )
+
+    # ----- خواندن فایل -----
+
+    def _rows(self, path, fmt):
+        """ردیف‌های تخت (یک تنوع یا محصول بدون تنوع در هر ردیف) به همراه شماره خط"""
+        with open(path, encoding='utf-8-sig', newline='') as file:
+            if fmt == 'csv':
+                for line, row in enumerate(csv.DictReader(file), start=2):
+                    yield line, row
+                return
+            for line, text in enumerate(file, start=1):
+                if not text.strip():
+                    continue
+                try:
+                    record = json.loads(text)
+                except json.JSONDecodeError as exc:
+                    yield line, exc
+                    continue
+                variants = record.pop('variants', None)
+                if not variants:
+                    yield line, record
+                    continue
+                for variant in variants:
+                    yield line, {
+                        **record,
+                        **{f'variant_{key}' if key in ('price', 'is_active') else key: value
+                           for key, value in variant.items()},
+                    }
+
+    def _parse(self, row):
+        """
+        (فیلدهای محصول، فیلدهای تنوع یا None) - فیلدهای محصول فقط ستون‌هایی که
+        در ردیف آمده‌اند (ستون غایب یا مقدار خالی برای name، price، category و season)
+        """
+        if isinstance(row, Exception):
+            raise RowError(str(row))
+
+        name = (row.get('name') or '').strip()
+        code = (row.get('product_code') or '').strip() or None
+        if not name and not code:
+            raise RowError('name یا product_code لازم است')
+
+        product = {'product_code': code}
+        if name:
+            product['name'] = name
+        if row.get('price') not in (None, ''):
+            product['price'] = _decimal(row['price'], 'price')
+        if row.get('category') not in (None, ''):
+            if row['category'] not in self.categories:
+                raise RowError(f'category نامعتبر: {row["category"]!r}')
+            product['category'] = row['category']
+        if row.get('season') not in (None, ''):
+            if row['season'] not in self.seasons:
+                raise RowError(f'season نامعتبر: {row["season"]!r}')
+            product['season'] = row['season']
+        for field in ('description', 'image'):
+            if row.get(field) is not None:
+                product[field] = row[field]
+        if row.get('is_active') not in (None, ''):
+            product['is_active'] = _bool(row['is_active'])
+
+        color, size = row.get('color'), row.get('size')
+        if not color and not size:
+            return product, None
+        if color not in self.colors:
+            raise RowError(f'color نامعتبر: {color!r}')
+        if size not in self.sizes:
+            raise RowError(f'size نامعتبر: {size!r}')
+        # مثل محصول، فقط ستون‌هایی که در ردیف آمده‌اند
+        variant = {'color': color, 'size': size}
+        if row.get('variant_price') not in (None, ''):
+            variant['price'] = _decimal(row['variant_price'], 'variant_price')
+        if row.get('stock') not in (None, ''):
+            try:
+                variant['stock'] = int(row['stock'])
+            except ValueError:
+                raise RowError(f'stock نامعتبر: {row["stock"]!r}')
+            if variant['stock'] < 0:
+                raise RowError('موجودی نمی‌تواند منفی باشد')
+        if (row.get('sku') or '').strip():
+            variant['sku'] = row['sku'].strip()
+        if row.get('variant_is_active') not in (None, ''):
+            variant['is_active'] = _bool(row['variant_is_active'])
+        return product, variant
+
+    def reject(self, message):
+        self.errors += 1
+        self.stderr.write(self.style.WARNING(f'  ✗ {message}'))
+
+    # ----- نوشتن دسته‌ها -----
+
+    @transaction.atomic
+    def _flush(self, products, variants):
+        if not products:
+            return
+        # کدهای PKP صریح فایل شمارنده را جلو می‌برند تا کدهای تخصیصی با آن‌ها برخورد نکنند
+        advance_product_codes(
+            fields['product_code'] for fields in products.values() if fields['product_code']
+        )
+        existing = {
+            code: {'price': price, 'image': image, 'image_variants': image_variants}
+            for code, price, image, image_variants in Product.objects.filter(
+                product_code__in=[fields['product_code'] for fields in products.values() if fields['product_code']]
+            ).values_list('product_code', 'price', 'image', 'image_variants')
+        }
+        # محصول جدید همه‌ی ستون‌های لازم را می‌خواهد
+        for key, fields in list(products.items()):
+            if fields['product_code'] in existing:
+                continue
+            missing = [name for name in PRODUCT_REQUIRED_FIELDS if name not in fields]
+            if missing:
+                self.reject(f'محصول {fields["product_code"] or fields["name"]}: ستون {", ".join(missing)} لازم است')
+                del products[key]
+        variants = [(key, line, fields) for key, line, fields in variants if key in products]
+
+        # محصولات بدون کد در یک فایل با نام‌شان یکی می‌شوند و کدشان یک‌جا تخصیص می‌یابد
+        new = [key for key, fields in products.items() if fields['product_code'] is None]
+        for key, code in zip(new, allocate_product_codes(len(new))):
+            products[key]['product_code'] = code
+            self.codes_by_name[products[key]['name']] = code
+
+        # محصولات موجود فقط در ستون‌هایی که در فایل آمده‌اند به‌روزرسانی می‌شوند؛
+        # هر گروه از ردیف‌ها با ستون‌های یکسان یک bulk_create جدا دارد
+        now = timezone.now()
+        groups = {}
+        # تصاویر عوض‌شده: {product_code: نسخه‌های تصویر قبلی}؛ bulk_create سیگنال post_save ندارد
+        images = {}
+        for fields in products.values():
+            current = existing.get(fields['product_code'])
+            if current:
+                names = [name for name in PRODUCT_UPDATE_FIELDS if name in fields]
+                # قیمت فعلی فقط برای معتبر بودن ردیف INSERT؛ به‌روزرسانی نمی‌شود مگر در names باشد
+                fields = {'price': current['price'], **fields}
+                if 'image' in fields and fields['image'] != current['image']:
+                    # نسخه‌های تصویر قبلی تا ساخته شدن نسخه‌های تازه نمایش داده نمی‌شوند
+                    fields['image_variants'] = {}
+                    names.append('image_variants')
+                    images[fields['product_code']] = current['image_variants'] or {}
+            else:
+                names = PRODUCT_UPDATE_FIELDS
+                if fields.get('image'):
+                    images[fields['product_code']] = {}
+            groups.setdefault(tuple(names), []).append(
+                Product(**{**PRODUCT_DEFAULTS, **fields}, updated_at=now)
+            )
+        for names, objects in groups.items():
+            Product.objects.bulk_create(
+                objects,
+                update_conflicts=True,
+                unique_fields=['product_code'],
+                update_fields=[*names, 'updated_at'],
+            )
+        # bulk_create با update_conflicts روی همه دیتابیس‌ها id برنمی‌گرداند
+        codes = [fields['product_code'] for fields in products.values()]
+        ids = dict(Product.objects.filter(product_code__in=codes).values_list('product_code', 'id'))
+        self.product_ids.update(ids.values())
+        if images:
+            previous = {ids[code]: data for code, data in images.items()}
+            transaction.on_commit(lambda: self._build_images(previous))
+
+        # sku صریحی که مال ترکیب (محصول، رنگ، سایز) دیگری است ردیف را رد می‌کند
+        owners = {
+            sku: (product_id, color, size)
+            for sku, product_id, color, size in ProductVariant._base_manager.filter(
+                sku__in=[fields['sku'] for _, _, fields in variants if 'sku' in fields]
+            ).values_list('sku', 'product_id', 'color', 'size')
+        }
+        rows = {}
+        for key, line, fields in variants:
+            product = products[key]
+            combination = (ids[product['product_code']], fields['color'], fields['size'])
+            if 'sku' in fields and owners.setdefault(fields['sku'], combination) != combination:
+                self.reject(f'خط {line}: sku {fields["sku"]!r} متعلق به تنوع دیگری است')
+                continue
+            rows[combination] = (fields, product)
+
+        # ستون‌های غایب فقط برای درج مقدار پیش‌فرض می‌گیرند و به‌روزرسانی نمی‌شوند
+        groups = {}
+        for (product_id, color, size), (fields, product) in rows.items():
+            names = tuple(name for name in VARIANT_UPDATE_FIELDS if name in fields)
+            groups.setdefault(names, []).append(ProductVariant(
+                product_id=product_id, color=color, size=size,
+                sku=fields.get('sku') or f'{product_id}-{color}-{size}',
+                price=fields.get('price', product.get('price', existing.get(product['product_code'], {}).get('price'))),
+                stock=fields.get('stock', 0),
+                is_active=fields.get('is_active', True),
+            ))
+        # _base_manager: خلاصه‌ی محصولات در پایان یک‌بار بازسازی می‌شود
+        for names, objects in groups.items():
+            if names:
+                ProductVariant._base_manager.bulk_create(
+                    objects,
+                    update_conflicts=True,
+                    unique_fields=['product', 'color', 'size'],
+                    update_fields=list(names),
+                )
+            else:
+                ProductVariant._base_manager.bulk_create(objects, ignore_conflicts=True)
+        self.variant_count += len(rows)
+
+    def _build_images(self, previous):
+        """ساخت نسخه‌های تصویر محصولاتی که تصویرشان عوض شده و حذف نسخه‌های قبلی"""
+        for product in Product._base_manager.filter(pk__in=previous).only('id', 'image', 'image_variants'):
+            product.image_variants = previous[product.pk]
+            refresh_image_variants(product)
+
+    def handle(self, *args, **options):
+        path = Path(options['path'])
+        if not path.exists():
+            raise CommandError(f'فایل {path} وجود ندارد')
+        fmt = options['format'] or ('jsonl' if path.suffix in ('.jsonl', '.ndjson') else 'csv')
+        batch_size = options['batch_size']
+
+        self.categories = dict(Product.CATEGORY_CHOICES)
+        self.seasons = dict(Product.SEASON_CHOICES)
+        self.colors = dict(ProductVariant.COLOR_CHOICES)
+        self.sizes = dict(ProductVariant.SIZE_CHOICES)
+        self.codes_by_name = {}
+        self.product_ids = set()
+        self.variant_count = 0
+
+        self.errors = 0
+        started = time.monotonic()
+        rows = 0
+        products, variants = {}, []
+        for line, row in self._rows(path, fmt):
+            try:
+                product, variant = self._parse(row)
+            except RowError as exc:
+                self.reject(f'خط {line}: {exc}')
+                continue
+
+            rows += 1
+            if product['product_code'] is None:
+                product['product_code'] = self.codes_by_name.get(product['name'])
+            key = product['product_code'] or f'name:{product["name"]}'
+            products[key] = product
+            if variant:
+                variants.append((key, line, variant))
+
+            if len(variants) >= batch_size or len(products) >= batch_size:
+                self._flush(products, variants)
+                products, variants = {}, []
+                elapsed = time.monotonic() - started
+                self.stdout.write(f'  {rows} ردیف ({rows / elapsed:.0f} ردیف در ثانیه)')
+        self._flush(products, variants)
+
+        self.stdout.write('  بازسازی خلاصه‌ی تنوع‌ها و بردار جستجو...')
+        ids = sorted(self.product_ids)
+        for start in range(0, len(ids), 1000):
+            batch = Product.objects.filter(pk__in=ids[start:start + 1000])
+            batch.refresh_variant_aggregates()
+            update_search_vectors(batch)
+        bump_catalog_version()
+
+        elapsed = time.monotonic() - started
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ {rows} ردیف ({len(ids)} محصول، {self.variant_count} تنوع) در {elapsed:.1f} ثانیه '
+            f'- {rows / max(elapsed, 1e-6):.0f} ردیف در ثانیه'
+            + (f' ({self.errors} ردیف نامعتبر)' if self.errors else '')
+        ))
@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+
+
+class Command(BaseCommand):
+    """
+    بازسازی خلاصه‌ی تنوع‌ها (قیمت، موجودی، رنگ و سایز) برای همه محصولات
+    """
+    help = 'بازسازی فیلدهای خلاصه‌ی تنوع‌ها روی همه محصولات'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='تعداد محصولات در هر دسته'
+        )
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+
+        total = 0
+        for start in range(0, len(ids), batch_size):
+            batch = ids[start:start + batch_size]
+            total += Product.objects.filter(pk__in=batch).refresh_variant_aggregates()
+            self.stdout.write(f'  {total}/{len(ids)} محصول به‌روزرسانی شد')
+
+        self.stdout.write(self.style.SUCCESS(f'✓ خلاصه‌ی تنوع‌های {total} محصول بازسازی شد'))
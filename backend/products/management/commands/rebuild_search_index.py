@@ -0,0 +1,38 @@
+from django.core.management.base import BaseCommand
+
+from products.models import Product
+from products.search import is_search_supported, update_search_vectors
+
+
+class Command(BaseCommand):
+    """
+    محاسبه‌ی مجدد search_vector همه محصولات (PostgreSQL)
+    """
+    help = 'بازسازی بردار جستجوی متنی محصولات'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='تعداد محصولات در هر دسته'
+        )
+        parser.add_argument(
+            '--missing-only',
+            action='store_true',
+            help='فقط محصولاتی که بردار جستجو ندارند'
+        )
+
+    def handle(self, *args, **options):
+        queryset = Product.objects.order_by('id')
+        if not is_search_supported(queryset.db):
+            self.stdout.write(self.style.WARNING(
+                'جستجوی متنی فقط روی PostgreSQL فعال است؛ کاری انجام نشد'
+            ))
+            return
+
+        if options['missing_only']:
+            queryset = queryset.filter(search_vector__isnull=True)
+
+        total = update_search_vectors(queryset, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(f'✓ بردار جستجوی {total} محصول به‌روزرسانی شد'))
@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.popularity import refresh_popularity
+
+
+class Command(BaseCommand):
+    """
+    محاسبه‌ی دوباره‌ی امتیاز محبوبیت محصولات از فروش اخیر و امتیاز نظرات.
+    برای اجرای دوره‌ای (مثلاً هر ساعت با cron) در نظر گرفته شده است
+    """
+    help = 'به‌روزرسانی امتیاز محبوبیت محصولات (محصولات ویژه و ordering=popularity)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--half-life',
+            type=float,
+            help='نیمه‌عمر وزن فروش به روز (پیش‌فرض: POPULARITY_HALF_LIFE_DAYS)'
+        )
+        parser.add_argument(
+            '--window',
+            type=int,
+            help='بازه‌ی فروش‌های خوانده‌شده به روز (پیش‌فرض: POPULARITY_WINDOW_DAYS)'
+        )
+
+    def handle(self, *args, **options):
+        started = time.monotonic()
+        changed = refresh_popularity(half_life=options['half_life'], window=options['window'])
+        self.stdout.write(self.style.SUCCESS(
+            f'✓ امتیاز محبوبیت {changed} محصول به‌روزرسانی شد ({time.monotonic() - started:.1f} ثانیه)'
+        ))
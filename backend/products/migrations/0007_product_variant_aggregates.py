@@ -0,0 +1,97 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:04
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Min, Q, Sum
+
+
+def fill_variant_aggregates(apps, schema_editor):
+    Product = apps.get_model('products', 'Product')
+    ProductVariant = apps.get_model('products', 'ProductVariant')
+    db = schema_editor.connection.alias
+
+    variants = ProductVariant.objects.using(db).filter(is_active=True).order_by()
+    stats = {
+        row['product_id']: row
+        for row in variants.values('product_id').annotate(
+            min_price=Min('price'),
+            max_price=Max('price'),
+            total_stock=Sum('stock'),
+            variants_count=Count('id'),
+            in_stock_count=Count('id', filter=Q(stock__gt=0)),
+        )
+    }
+    colors, sizes = {}, {}
+    for product_id, color, size in variants.values_list('product_id', 'color', 'size'):
+        colors.setdefault(product_id, set()).add(color)
+        sizes.setdefault(product_id, set()).add(size)
+
+    def choice_order(field_name):
+        choices = ProductVariant._meta.get_field(field_name).choices
+        order = {value: index for index, (value, _) in enumerate(choices)}
+        return lambda value: (order.get(value, len(order)), value)
+
+    color_key, size_key = choice_order('color'), choice_order('size')
+
+    products = list(Product.objects.using(db).only('id', 'price'))
+    for product in products:
+        row = stats.get(product.id)
+        product.min_price = row['min_price'] if row else product.price
+        product.max_price = row['max_price'] if row else product.price
+        product.total_stock = (row['total_stock'] or 0) if row else 0
+        product.in_stock = bool(row and row['in_stock_count'])
+        product.variants_count = row['variants_count'] if row else 0
+        product.available_colors = sorted(colors.get(product.id, ()), key=color_key)
+        product.available_sizes = sorted(sizes.get(product.id, ()), key=size_key)
+
+    Product.objects.using(db).bulk_update(
+        products,
+        ['min_price', 'max_price', 'total_stock', 'in_stock',
+         'variants_count', 'available_colors', 'available_sizes'],
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0006_product_product_code'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='available_colors',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='رنگ\u200cهای موجود'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='available_sizes',
+            field=models.JSONField(blank=True, default=list, editable=False, verbose_name='سایزهای موجود'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='in_stock',
+            field=models.BooleanField(default=False, editable=False, verbose_name='موجود'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='max_price',
+            field=models.DecimalField(blank=True, decimal_places=0, editable=False, max_digits=10, null=True, verbose_name='بیشترین قیمت (تومان)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='min_price',
+            field=models.DecimalField(blank=True, decimal_places=0, editable=False, max_digits=10, null=True, verbose_name='کمترین قیمت (تومان)'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='total_stock',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='موجودی کل'),
+        ),
+        migrations.AddField(
+            model_name='product',
+            name='variants_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد تنوع'),
+        ),
+        migrations.RunPython(fill_variant_aggregates, migrations.RunPython.noop),
+    ]
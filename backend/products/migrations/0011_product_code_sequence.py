@@ -0,0 +1,51 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:18
+
+import re
+
+from django.db import migrations, models
+
+SEQUENCE = 'products_product_code_seq'
+
+
+def create_code_sequence(apps, schema_editor):
+    # شماره‌گذاری بعد از بزرگ‌ترین کد PKP-XXXXX موجود ادامه پیدا می‌کند
+    Product = apps.get_model('products', 'Product')
+    CodeSequence = apps.get_model('products', 'CodeSequence')
+    pattern = re.compile(r'^PKP-(\d+)$')
+    last = 0
+    for code in Product.objects.exclude(product_code__isnull=True).values_list('product_code', flat=True).iterator():
+        match = pattern.match(code)
+        if match:
+            last = max(last, int(match.group(1)))
+
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'CREATE SEQUENCE IF NOT EXISTS {SEQUENCE} START WITH {last + 1}')
+    else:
+        CodeSequence.objects.update_or_create(name=SEQUENCE, defaults={'value': last})
+
+
+def drop_code_sequence(apps, schema_editor):
+    if schema_editor.connection.vendor == 'postgresql':
+        schema_editor.execute(f'DROP SEQUENCE IF EXISTS {SEQUENCE}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0010_productvariant_filter_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='CodeSequence',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False, verbose_name='نام')),
+                ('value', models.BigIntegerField(default=0, verbose_name='آخرین مقدار')),
+            ],
+            options={
+                'verbose_name': 'شمارنده',
+                'verbose_name_plural': 'شمارنده‌ها',
+            },
+        ),
+        migrations.RunPython(create_code_sequence, drop_code_sequence),
+    ]
@@ -0,0 +1,68 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:22
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0011_product_code_sequence'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RecommendationRun',
+            fields=[
+                ('name', models.CharField(max_length=50, primary_key=True, serialize=False, verbose_name='نام')),
+                ('last_payment_date', models.DateTimeField(blank=True, null=True, verbose_name='آخرین تاریخ پرداخت')),
+                ('last_order_id', models.BigIntegerField(default=0, verbose_name='آخرین سفارش')),
+                ('orders_processed', models.PositiveIntegerField(default=0, verbose_name='تعداد سفارش\u200cها')),
+                ('updated_at', models.DateTimeField(auto_now=True, verbose_name='تاریخ اجرا')),
+            ],
+            options={
+                'verbose_name': 'اجرای پیشنهادها',
+                'verbose_name_plural': 'اجراهای پیشنهادها',
+            },
+        ),
+        migrations.CreateModel(
+            name='RelatedProduct',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('rank', models.PositiveSmallIntegerField(verbose_name='رتبه')),
+                ('score', models.PositiveIntegerField(verbose_name='امتیاز')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('related', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'محصول مرتبط',
+                'verbose_name_plural': 'محصولات مرتبط',
+                'ordering': ['product', 'rank'],
+            },
+        ),
+        migrations.CreateModel(
+            name='ProductPairCount',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('count', models.PositiveIntegerField(default=0, verbose_name='تعداد')),
+                ('product_a', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+                ('product_b', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='products.product')),
+            ],
+            options={
+                'verbose_name': 'هم\u200cخریدی',
+                'verbose_name_plural': 'هم\u200cخریدی\u200cها',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='relatedproduct',
+            constraint=models.UniqueConstraint(fields=('product', 'rank'), name='products_related_rank_unique'),
+        ),
+        migrations.AddIndex(
+            model_name='productpaircount',
+            index=models.Index(fields=['product_b'], name='products_pr_product_e7b1e9_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='productpaircount',
+            constraint=models.UniqueConstraint(fields=('product_a', 'product_b'), name='products_pair_unique'),
+        ),
+    ]
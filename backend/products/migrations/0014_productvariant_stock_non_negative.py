@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 13:38
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0013_product_popularity'),
+    ]
+
+    operations = [
+        migrations.AddConstraint(
+            model_name='productvariant',
+            constraint=models.CheckConstraint(check=models.Q(('stock__gte', 0)), name='products_pv_stock_non_negative'),
+        ),
+    ]
@@ -1,6 +1,157 @@
-from django.db import models
+from django.contrib.postgres.search import SearchVectorField
+from django.db import models, router, transaction
+from django.db.models import Case, Count, Exists, F, Max, Min, OuterRef, Q, Subquery, Sum, When, Window
+from django.db.models.functions import Coalesce, RowNumber
 from django.core.exceptions import ValidationError
 
+from .cache import bump_catalog_version, bump_stock_versions
+from .codes import allocate_product_codes
+from .search import is_search_supported, product_search_vector
+
+
+class ProductQuerySet(models.QuerySet):
+    """QuerySet محصولات"""
+
+    # ستون‌هایی که ProductListSerializer لازم دارد
+    LIST_FIELDS = [
+        'id', 'name', 'product_code', 'price', 'min_price', 'max_price', 'category',
+        'season', 'image', 'image_variants', 'in_stock', 'variants_count', 'popularity', 'created_at',
+    ]
+
+    def for_list(self):
+        """
+        برنامه‌ی query برای لیست محصولات: فقط ستون‌های لازم، بدون prefetch
+        (توضیحات طولانی و تنوع‌ها بارگذاری نمی‌شوند)
+        """
+        return self.only(*self.LIST_FIELDS)
+
+    def for_detail(self, variants=True):
+        """برنامه‌ی query برای جزئیات محصول: همراه با تنوع‌ها (مگر variants=False)"""
+        queryset = self.defer('search_vector')
+        return queryset.prefetch_related('variants') if variants else queryset
+
+    def bulk_create(self, objs, *args, **kwargs):
+        """محصولات بدون کد، کدشان را با یک تخصیص گروهی پیش از درج می‌گیرند"""
+        objs = list(objs)
+        missing = [obj for obj in objs if not obj.product_code]
+        for obj, code in zip(missing, allocate_product_codes(len(missing), using=self.db)):
+            obj.product_code = code
+        return super().bulk_create(objs, *args, **kwargs)
+
+    bulk_create.alters_data = True
+
+    def top_per_category(self, limit, categories=None):
+        """
+        جدیدترین limit محصول هر دسته در یک query:
+        ROW_NUMBER() OVER (PARTITION BY category ORDER BY created_at DESC)
+        """
+        queryset = self
+        if categories is not None:
+            queryset = queryset.filter(category__in=categories)
+        return queryset.annotate(
+            category_rank=Window(
+                RowNumber(),
+                partition_by=F('category'),
+                order_by=[F('created_at').desc(), F('id').desc()],
+            )
+        ).filter(category_rank__lte=limit).order_by('category', 'category_rank')
+
+    def with_variant_stats(self):
+        """
+        محاسبه‌ی زنده‌ی موجودی، بازه قیمت و تعداد تنوع‌های فعال با subquery
+        (بدون GROUP BY روی کل جدول محصولات و بدون N+1)
+        """
+        variants = ProductVariant.objects.filter(product=OuterRef('pk'), is_active=True).order_by()
+        per_product = variants.values('product')
+
+        return self.annotate(
+            live_in_stock=Exists(variants.filter(stock__gt=0)),
+            live_min_price=Coalesce(
+                Subquery(per_product.annotate(value=Min('price')).values('value')[:1]),
+                F('price'),
+            ),
+            live_max_price=Coalesce(
+                Subquery(per_product.annotate(value=Max('price')).values('value')[:1]),
+                F('price'),
+            ),
+            live_variants_count=Coalesce(
+                Subquery(per_product.annotate(value=Count('id')).values('value')[:1]),
+                0,
+            ),
+        )
+
+    def refresh_variant_aggregates(self, stock_only=False):
+        """
+        محاسبه مجدد خلاصه‌ی تنوع‌ها (قیمت، موجودی، رنگ و سایز) برای محصولات این QuerySet
+        با چند query گروهی، بدون توجه به تعداد محصولات.
+        stock_only: فقط موجودی تنوع‌ها عوض شده (فروش)؛ نسخه‌ی کاتالوگ فقط اگر موجود بودن
+        محصولی عوض شود افزایش می‌یابد و در غیر این صورت فقط نسخه‌ی موجودی همان محصولات
+        """
+        with transaction.atomic(using=self.db):
+            # قفل ردیف‌های محصول به ترتیب pk پیش از خواندن آمار تنوع‌ها: دو به‌روزرسانی
+            # هم‌زمان روی یک محصول پشت سر هم اجرا می‌شوند و deadlock نمی‌سازند
+            locked = self.select_for_update().only('id', 'price', 'in_stock').order_by('pk')
+            products = {p.pk: p for p in locked}
+            if not products:
+                return 0
+            was_in_stock = {pk: product.in_stock for pk, product in products.items()}
+
+            variants = ProductVariant.objects.filter(product_id__in=products.keys(), is_active=True)
+            stats = {
+                row['product_id']: row
+                for row in variants.order_by().values('product_id').annotate(
+                    min_price=Min('price'),
+                    max_price=Max('price'),
+                    total_stock=Sum('stock'),
+                    variants_count=Count('id'),
+                    in_stock_count=Count('id', filter=Q(stock__gt=0)),
+                )
+            }
+            colors, sizes = {}, {}
+            for product_id, color, size in variants.order_by().values_list('product_id', 'color', 'size'):
+                colors.setdefault(product_id, set()).add(color)
+                sizes.setdefault(product_id, set()).add(size)
+
+            for product_id, product in products.items():
+                row = stats.get(product_id)
+                if row:
+                    product.min_price = row['min_price']
+                    product.max_price = row['max_price']
+                    product.total_stock = row['total_stock'] or 0
+                    product.in_stock = row['in_stock_count'] > 0
+                    product.variants_count = row['variants_count']
+                else:
+                    product.min_price = product.max_price = product.price
+                    product.total_stock = 0
+                    product.in_stock = False
+                    product.variants_count = 0
+                product.available_colors = ProductVariant.sort_colors(colors.get(product_id, ()))
+                product.available_sizes = ProductVariant.sort_sizes(sizes.get(product_id, ()))
+
+            Product.objects.using(self.db).bulk_update(
+                products.values(), Product.VARIANT_AGGREGATE_FIELDS, batch_size=500
+            )
+            if stock_only and all(p.in_stock == was_in_stock[pk] for pk, p in products.items()):
+                transaction.on_commit(lambda: bump_stock_versions(products), using=self.db)
+            else:
+                transaction.on_commit(bump_catalog_version, using=self.db)
+        return len(products)
+
+
+class CodeSequence(models.Model):
+    """
+    شمارنده‌ی کدها برای دیتابیس‌های بدون sequence (SQLite) - products/codes.py
+    """
+    name = models.CharField(max_length=100, primary_key=True, verbose_name='نام')
+    value = models.BigIntegerField(default=0, verbose_name='آخرین مقدار')
+
+    class Meta:
+        verbose_name = 'شمارنده'
+        verbose_name_plural = 'شمارنده‌ها'
+
+    def __str__(self):
+        return f'{self.name}: {self.value}'
+
 
 class Product(models.Model):
     """
@@ -18,6 +169,12 @@ class Product(models.Model):
         ('summer', 'تابستان'),
         ('fall', 'پاییز'),
     ]
+
+    # فیلدهایی که از روی تنوع‌های فعال محصول نگه‌داری می‌شوند
+    VARIANT_AGGREGATE_FIELDS = [
+        'min_price', 'max_price', 'total_stock', 'in_stock',
+        'variants_count', 'available_colors', 'available_sizes',
+    ]
     
     name = models.CharField(max_length=200, verbose_name='نام محصول')
     product_code = models.CharField(
@@ -47,10 +204,44 @@ class Product(models.Model):
         upload_to='products/',
         verbose_name='تصویر محصول'
     )
+    # نسخه‌های واکنش‌گرای تصویر (products/images.py) - بعد از ذخیره ساخته می‌شوند
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='نسخه‌های تصویر')
     is_active = models.BooleanField(default=True, verbose_name='فعال')
+
+    # خلاصه‌ی تنوع‌ها - با هر تغییر ProductVariant به‌روزرسانی می‌شوند
+    min_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=0,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='کمترین قیمت (تومان)'
+    )
+    max_price = models.DecimalField(
+        max_digits=10,
+        decimal_places=0,
+        null=True,
+        blank=True,
+        editable=False,
+        verbose_name='بیشترین قیمت (تومان)'
+    )
+    total_stock = models.PositiveIntegerField(default=0, editable=False, verbose_name='موجودی کل')
+    in_stock = models.BooleanField(default=False, editable=False, verbose_name='موجود')
+    variants_count = models.PositiveIntegerField(default=0, editable=False, verbose_name='تعداد تنوع')
+    available_colors = models.JSONField(default=list, blank=True, editable=False, verbose_name='رنگ‌های موجود')
+    available_sizes = models.JSONField(default=list, blank=True, editable=False, verbose_name='سایزهای موجود')
+
+    # بردار جستجوی متنی (فقط PostgreSQL) - ایندکس GIN در migration ساخته می‌شود
+    search_vector = SearchVectorField(null=True, editable=False)
+
+    # امتیاز محبوبیت (فروش با وزن زمانی + امتیاز نظرات) - products/popularity.py
+    popularity = models.FloatField(default=0, editable=False, verbose_name='محبوبیت')
+
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
     updated_at = models.DateTimeField(auto_now=True, verbose_name='تاریخ به‌روزرسانی')
 
+    objects = ProductQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'محصول'
         verbose_name_plural = 'محصولات'
@@ -62,51 +253,71 @@ class Product(models.Model):
             models.Index(fields=['season', 'is_active']),
             models.Index(fields=['price']),
             models.Index(fields=['-created_at']),
+            models.Index(fields=['is_active', '-popularity']),
         ]
 
     def __str__(self):
         return self.name
     
     def save(self, *args, **kwargs):
-        # تولید کد محصول خودکار اگر وجود نداشته باشد
+        # محصول بدون تنوع: بازه قیمت همان قیمت پایه است
+        if not self.variants_count:
+            self.min_price = self.max_price = self.price
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None and 'price' in update_fields:
+                kwargs['update_fields'] = {*update_fields, 'min_price', 'max_price'}
+
+        # به‌روزرسانی بردار جستجو در همان query ذخیره (فقط PostgreSQL)
+        using = kwargs.get('using') or router.db_for_write(Product, instance=self)
+        update_fields = kwargs.get('update_fields')
+        refresh_search = is_search_supported(using) and (
+            update_fields is None or {'name', 'description'} & set(update_fields)
+        )
+        if refresh_search:
+            self.search_vector = product_search_vector(self.name, self.description)
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'search_vector'}
+
+        # تولید کد محصول خودکار اگر وجود نداشته باشد - قبل از درج، بدون ذخیره‌ی دوم
         if not self.product_code:
-            # استفاده از ID برای تولید کد یکتا
-            super().save(*args, **kwargs)
-            self.product_code = f"PKP-{self.id:05d}"
-            super().save(update_fields=['product_code'])
-        else:
-            super().save(*args, **kwargs)
+            self.product_code = allocate_product_codes(1, using=using)[0]
+            if kwargs.get('update_fields') is not None:
+                kwargs['update_fields'] = {*kwargs['update_fields'], 'product_code'}
+        super().save(*args, **kwargs)
+
+        if refresh_search:
+            # مقدار در دیتابیس محاسبه شده؛ فیلد deferred می‌شود تا در صورت نیاز خوانده شود
+            self.__dict__.pop('search_vector', None)
 
     @property
     def is_in_stock(self):
-        """بررسی موجود بودن محصول - چک کردن موجودی تمام variants"""
-        return self.variants.filter(stock__gt=0).exists()
-    
-    @property
-    def min_price(self):
-        """کمترین قیمت از بین variants"""
-        variants = self.variants.all()
-        if variants.exists():
-            return min(v.price for v in variants)
-        return self.price
-    
-    @property
-    def max_price(self):
-        """بیشترین قیمت از بین variants"""
-        variants = self.variants.all()
-        if variants.exists():
-            return max(v.price for v in variants)
-        return self.price
-    
-    @property
-    def available_colors(self):
-        """لیست رنگ‌های موجود"""
-        return list(self.variants.values_list('color', flat=True).distinct())
-    
-    @property
-    def available_sizes(self):
-        """لیست سایزهای موجود"""
-        return list(self.variants.values_list('size', flat=True).distinct())
+        """بررسی موجود بودن محصول - از روی خلاصه‌ی ذخیره‌شده‌ی variants"""
+        return self.in_stock
+
+    def refresh_variant_aggregates(self):
+        """محاسبه مجدد خلاصه‌ی تنوع‌های این محصول"""
+        Product.objects.filter(pk=self.pk).refresh_variant_aggregates()
+        self.refresh_from_db(fields=self.VARIANT_AGGREGATE_FIELDS)
+
+    def create_variant_matrix(self, colors, sizes, price=None, stock=0):
+        """
+        ساخت تنوع‌های رنگ × سایز که هنوز وجود ندارند، با یک خواندن و یک bulk_create.
+        خلاصه‌ی تنوع‌های محصول یک‌بار به‌روزرسانی می‌شود. خروجی: (تعداد ساخته‌شده، تعداد ردشده)
+        """
+        colors, sizes = list(dict.fromkeys(colors)), list(dict.fromkeys(sizes))
+        existing = set(self.variants.values_list('color', 'size'))
+        price = price if price is not None else self.price
+        missing = [
+            ProductVariant(
+                product=self, color=color, size=size, price=price, stock=stock,
+                sku=f'{self.id}-{color}-{size}',
+            )
+            for color in colors for size in sizes if (color, size) not in existing
+        ]
+        if missing:
+            ProductVariant.objects.bulk_create(missing)
+            self.refresh_from_db(fields=self.VARIANT_AGGREGATE_FIELDS)
+        return len(missing), len(colors) * len(sizes) - len(missing)
 
     def get_category_display_fa(self):
         """نمایش دسته‌بندی به فارسی"""
@@ -117,6 +328,70 @@ class Product(models.Model):
         return dict(self.SEASON_CHOICES).get(self.season, self.season)
 
 
+class ProductVariantQuerySet(models.QuerySet):
+    """
+    QuerySet تنوع‌ها - تغییرات گروهی، خلاصه‌ی محصولات مربوطه را
+    در همان تراکنش به‌روزرسانی می‌کنند
+    """
+
+    def _refresh_products(self, product_ids):
+        Product.objects.using(self.db).filter(pk__in=product_ids).refresh_variant_aggregates()
+
+    def update(self, **kwargs):
+        with transaction.atomic(using=self.db):
+            product_ids = set(self.values_list('product_id', flat=True))
+            rows = super().update(**kwargs)
+            if 'product' in kwargs or 'product_id' in kwargs:
+                product_ids |= set(self.values_list('product_id', flat=True))
+            self._refresh_products(product_ids)
+        return rows
+
+    update.alters_data = True
+
+    def update_stock(self, stock):
+        """
+        تغییر موجودی تنوع‌ها هنگام فروش: خلاصه‌ی محصولات در همان تراکنش به‌روز می‌شود
+        ولی کل cache کاتالوگ فقط وقتی بی‌اعتبار می‌شود که موجود بودن محصولی عوض شود
+        """
+        with transaction.atomic(using=self.db):
+            product_ids = set(self.values_list('product_id', flat=True))
+            rows = super().update(stock=stock)
+            Product.objects.using(self.db).filter(pk__in=product_ids).refresh_variant_aggregates(stock_only=True)
+        return rows
+
+    update_stock.alters_data = True
+
+    def bulk_update(self, objs, fields, batch_size=None):
+        objs = list(objs)
+        with transaction.atomic(using=self.db):
+            rows = super().bulk_update(objs, fields, batch_size=batch_size)
+            self._refresh_products({obj.product_id for obj in objs})
+        return rows
+
+    bulk_update.alters_data = True
+
+    def bulk_create(self, objs, *args, **kwargs):
+        with transaction.atomic(using=self.db):
+            objs = super().bulk_create(objs, *args, **kwargs)
+            self._refresh_products({obj.product_id for obj in objs})
+        return objs
+
+    bulk_create.alters_data = True
+
+    def defaults_for(self, product_ids):
+        """
+        {product_id: تنوع پیش‌فرض} - تنوع فعال موجود با کمترین قیمت؛ برای اقلامی که
+        بدون انتخاب رنگ و سایز به سبد اضافه می‌شوند
+        """
+        variants = self.filter(product_id__in=product_ids, is_active=True).order_by(
+            'product_id', Case(When(stock__gt=0, then=0), default=1), 'price', 'id'
+        )
+        defaults = {}
+        for variant in variants:
+            defaults.setdefault(variant.product_id, variant)
+        return defaults
+
+
 class ProductVariant(models.Model):
     """
     مدل تنوع محصول (رنگ و سایز مختلف)
@@ -193,14 +468,43 @@ class ProductVariant(models.Model):
         null=True,
         verbose_name='تصویر (اختیاری)'
     )
+    image_variants = models.JSONField(default=dict, blank=True, editable=False, verbose_name='نسخه‌های تصویر')
     is_active = models.BooleanField(default=True, verbose_name='فعال')
     created_at = models.DateTimeField(auto_now_add=True, verbose_name='تاریخ ایجاد')
-    
+
+    objects = ProductVariantQuerySet.as_manager()
+
     class Meta:
         verbose_name = 'تنوع محصول'
         verbose_name_plural = 'تنوع محصولات'
         unique_together = ['product', 'color', 'size']
         ordering = ['product', 'color', 'size']
+        indexes = [
+            # فیلترهای رنگ/سایز روی تنوع‌های موجود (ProductFilter)
+            models.Index(
+                fields=['color', 'size'],
+                condition=Q(is_active=True, stock__gt=0),
+                name='products_pv_color_size_instock',
+            ),
+            models.Index(
+                fields=['size'],
+                condition=Q(is_active=True, stock__gt=0),
+                name='products_pv_size_instock',
+            ),
+            # بازه قیمت تنوع‌های فعال هر محصول (EXISTS همبسته روی product)
+            models.Index(
+                fields=['product', 'price'],
+                condition=Q(is_active=True),
+                name='products_pv_product_price',
+            ),
+        ]
+        constraints = [
+            # آخرین سد در برابر فروش بیش از موجودی (کم کردن شرطی در orders/stock.py)
+            models.CheckConstraint(
+                check=Q(stock__gte=0),
+                name='products_pv_stock_non_negative',
+            ),
+        ]
     
     def __str__(self):
         return f"{self.product.name} - {self.get_color_display()} - {self.get_size_display()}"
@@ -209,6 +513,18 @@ class ProductVariant(models.Model):
     def is_in_stock(self):
         """بررسی موجود بودن"""
         return self.stock > 0
+
+    @classmethod
+    def sort_colors(cls, colors):
+        """مرتب‌سازی رنگ‌ها به ترتیب COLOR_CHOICES"""
+        order = {value: index for index, (value, _) in enumerate(cls.COLOR_CHOICES)}
+        return sorted(colors, key=lambda c: (order.get(c, len(order)), c))
+
+    @classmethod
+    def sort_sizes(cls, sizes):
+        """مرتب‌سازی سایزها به ترتیب SIZE_CHOICES (از کوچک به بزرگ)"""
+        order = {value: index for index, (value, _) in enumerate(cls.SIZE_CHOICES)}
+        return sorted(sizes, key=lambda s: (order.get(s, len(order)), s))
     
     def clean(self):
         """اعتبارسنجی"""
@@ -222,4 +538,68 @@ class ProductVariant(models.Model):
         # تولید SKU خودکار
         if not self.sku:
             self.sku = f"{self.product.id}-{self.color}-{self.size}"
-        super().save(*args, **kwargs)
+        # خلاصه‌ی تنوع‌های محصول (signals.py) در همین تراکنش به‌روزرسانی می‌شود
+        using = kwargs.get('using') or router.db_for_write(ProductVariant, instance=self)
+        with transaction.atomic(using=using):
+            super().save(*args, **kwargs)
+
+    def delete(self, using=None, keep_parents=False):
+        using = using or router.db_for_write(ProductVariant, instance=self)
+        with transaction.atomic(using=using):
+            return super().delete(using=using, keep_parents=keep_parents)
+
+
+class ProductPairCount(models.Model):
+    """
+    ماتریس تُنُک هم‌خریدی: تعداد سفارش‌های پرداخت‌شده‌ای که هر دو محصول را داشته‌اند
+    (هر جفت یک‌بار با product_a < product_b) - products/recommendations.py
+    """
+    product_a = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    product_b = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    count = models.PositiveIntegerField(default=0, verbose_name='تعداد')
+
+    class Meta:
+        verbose_name = 'هم‌خریدی'
+        verbose_name_plural = 'هم‌خریدی‌ها'
+        constraints = [
+            models.UniqueConstraint(fields=['product_a', 'product_b'], name='products_pair_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['product_b']),
+        ]
+
+
+class RelatedProduct(models.Model):
+    """
+    K محصول پرتکرار «معمولاً با هم خریده می‌شوند» برای هر محصول
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    related = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='+')
+    rank = models.PositiveSmallIntegerField(verbose_name='رتبه')
+    score = models.PositiveIntegerField(verbose_name='امتیاز')
+
+    class Meta:
+        verbose_name = 'محصول مرتبط'
+        verbose_name_plural = 'محصولات مرتبط'
+        ordering = ['product', 'rank']
+        constraints = [
+            models.UniqueConstraint(fields=['product', 'rank'], name='products_related_rank_unique'),
+        ]
+
+
+class RecommendationRun(models.Model):
+    """
+    آخرین سفارش پردازش‌شده (watermark) برای محاسبه‌ی افزایشی هم‌خریدی
+    """
+    name = models.CharField(max_length=50, primary_key=True, verbose_name='نام')
+    last_payment_date = models.DateTimeField(null=True, blank=True, verbose_name='آخرین تاریخ پرداخت')
+    last_order_id = models.BigIntegerField(default=0, verbose_name='آخرین سفارش')
+    orders_processed = models.PositiveIntegerField(default=0, verbose_name='تعداد سفارش‌ها')
+    updated_at = models.DateTimeField(auto_now=True, verbose_name='تاریخ اجرا')
+
+    class Meta:
+        verbose_name = 'اجرای پیشنهادها'
+        verbose_name_plural = 'اجراهای پیشنهادها'
+
+    def __str__(self):
+        return f'{self.name}: {self.last_payment_date}'
@@ -1,9 +1,10 @@
 # بهینه‌سازی‌های مربوط به محصولات
 
 from django.db import models
-from django.core.cache import cache
 from django.db.models import Prefetch, Count, Avg
-from .models import Product, Review
+from reviews.models import Review
+from .cache import bump_catalog_version, catalog_cache_get_or_set
+from .models import Product
 
 class OptimizedProductQuerySet(models.QuerySet):
     """QuerySet بهینه‌سازی شده برای محصولات"""
@@ -26,7 +27,7 @@ class OptimizedProductQuerySet(models.QuerySet):
     
     def active_products(self):
         """فقط محصولات فعال"""
-        return self.filter(is_active=True, stock__gt=0)
+        return self.filter(is_active=True, in_stock=True)
     
     def by_category(self, category):
         """فیلتر بر اساس دسته‌بندی"""
@@ -44,67 +45,57 @@ class OptimizedProductQuerySet(models.QuerySet):
         )
     
     def featured(self):
-        """محصولات ویژه (بر اساس فروش و امتیاز)"""
-        return self.with_stats().filter(
+        """
+        محصولات ویژه (بر اساس فروش و امتیاز) - از ستون از پیش محاسبه‌شده‌ی popularity
+        خوانده می‌شود، بدون join و group by روی نظرات (products/popularity.py)
+        """
+        return self.filter(
             is_active=True,
-            stock__gt=0
-        ).order_by('-average_rating', '-review_count')[:8]
+            in_stock=True
+        ).order_by('-popularity', '-created_at')[:8]
 
 class ProductCacheManager:
-    """مدیریت cache برای محصولات"""
+    """
+    مدیریت cache برای محصولات - کلیدها نسخه‌ی کاتالوگ را در خود دارند،
+    پس هر تغییر محصول، تنوع یا نظر همه‌ی آن‌ها را یک‌جا بی‌اعتبار می‌کند
+    """
     
     CACHE_TIMEOUT = 300  # 5 minutes
     
+    @staticmethod
+    def products():
+        return OptimizedProductQuerySet(model=Product)
+    
     @staticmethod
     def get_featured_products():
         """دریافت محصولات ویژه از cache"""
-        cache_key = 'featured_products'
-        products = cache.get(cache_key)
-        
-        if products is None:
-            products = list(
-                Product.objects.with_stats()
-                .active_products()
-                .featured()
-            )
-            cache.set(cache_key, products, ProductCacheManager.CACHE_TIMEOUT)
-        
-        return products
+        return catalog_cache_get_or_set(
+            'featured_products', (),
+            lambda: list(ProductCacheManager.products().featured()),
+            ProductCacheManager.CACHE_TIMEOUT,
+        )
     
     @staticmethod
     def get_category_products(category, page=1, page_size=12):
         """دریافت محصولات دسته‌بندی از cache"""
-        cache_key = f'category_products_{category}_{page}_{page_size}'
-        products = cache.get(cache_key)
-        
-        if products is None:
-            start = (page - 1) * page_size
-            end = start + page_size
-            
-            products = list(
-                Product.objects.with_stats()
+        start = (page - 1) * page_size
+        end = start + page_size
+        return catalog_cache_get_or_set(
+            'category_products', (category, page, page_size),
+            lambda: list(
+                ProductCacheManager.products()
+                .with_stats()
                 .active_products()
                 .by_category(category)
                 .order_by('-created_at')[start:end]
-            )
-            cache.set(cache_key, products, ProductCacheManager.CACHE_TIMEOUT)
-        
-        return products
+            ),
+            ProductCacheManager.CACHE_TIMEOUT,
+        )
     
     @staticmethod
     def invalidate_product_cache(product_id=None):
-        """پاک کردن cache محصولات"""
-        cache_keys = [
-            'featured_products',
-            f'product_detail_{product_id}' if product_id else None,
-        ]
-        
-        # پاک کردن cache دسته‌بندی‌ها
-        for category in ['baby', 'girl', 'boy']:
-            for page in range(1, 6):  # فرض 5 صفحه اول
-                cache_keys.append(f'category_products_{category}_{page}_12')
-        
-        cache.delete_many([key for key in cache_keys if key])
+        """بی‌اعتبار کردن همه‌ی cache کاتالوگ (همه صفحه‌ها، فیلترها و اندازه‌ها)"""
+        bump_catalog_version()
 
 # Middleware برای cache headers
 class CacheControlMiddleware:
@@ -0,0 +1,147 @@
+# صفحه‌بندی keyset (cursor) برای اسکرول بی‌پایان کاتالوگ
+#
+# به‌جای OFFSET و COUNT(*)، هر صفحه از آخرین ردیف صفحه‌ی قبل ادامه پیدا می‌کند:
+#   WHERE (created_at, id) < (:created_at, :id) ORDER BY created_at DESC, id DESC LIMIT n
+# پس هزینه‌ی هر صفحه به عمق اسکرول بستگی ندارد و از ایندکس‌های
+# (is_active, -created_at) و (price) استفاده می‌شود.
+
+import base64
+import json
+from collections import OrderedDict
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from django.utils.encoding import force_str
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class ProductCursorPagination(BasePagination):
+    """
+    صفحه‌بندی cursor محصولات - با ?pagination=cursor یا ?cursor=... فعال می‌شود.
+    ترتیب keyset از ordering درخواست گرفته می‌شود (price، -price، created_at، ...)
+    و id همیشه برای یکتا بودن کلید اضافه می‌شود. خروجی شامل count نیست.
+    """
+    cursor_query_param = 'cursor'
+    mode_query_param = 'pagination'
+    mode_value = 'cursor'
+    page_size = api_settings.PAGE_SIZE
+    default_ordering = '-created_at'
+    invalid_cursor_message = 'cursor نامعتبر است'
+
+    @classmethod
+    def is_requested(cls, request):
+        """آیا درخواست صفحه‌بندی cursor را خواسته است؟"""
+        params = request.query_params
+        return params.get(cls.mode_query_param) == cls.mode_value or cls.cursor_query_param in params
+
+    def get_ordering(self, queryset, view):
+        """
+        فیلد keyset: اولین فیلد ordering اگر جزو ordering_fields ویو باشد،
+        در غیر این صورت (مثلاً رتبه‌ی جستجو) -created_at
+        """
+        allowed = getattr(view, 'ordering_fields', None) or []
+        for field in queryset.query.order_by:
+            if isinstance(field, str) and field.lstrip('-') in allowed:
+                return field
+            break
+        return self.default_ordering
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.ordering = self.get_ordering(queryset, view)
+        self.field = self.ordering.lstrip('-')
+        self.descending = self.ordering.startswith('-')
+
+        position, reverse = self.decode_cursor(request, queryset.model)
+
+        # برای صفحه‌ی قبلی، ترتیب برعکس پیمایش و نتیجه دوباره برعکس می‌شود
+        descending = self.descending != reverse
+        prefix = '-' if descending else ''
+        queryset = queryset.order_by(f'{prefix}{self.field}', f'{prefix}id')
+        if position is not None:
+            queryset = queryset.filter(self._after(position, descending))
+
+        results = list(queryset[:self.page_size + 1])
+        has_more = len(results) > self.page_size
+        results = results[:self.page_size]
+        if reverse:
+            results.reverse()
+
+        self.page = results
+        if reverse:
+            self.has_next = position is not None
+            self.has_previous = has_more
+        else:
+            self.has_next = has_more
+            self.has_previous = position is not None
+        return results
+
+    def _after(self, position, descending):
+        value, pk = position
+        op = 'lt' if descending else 'gt'
+        return Q(**{f'{self.field}__{op}': value}) | Q(**{self.field: value, f'id__{op}': pk})
+
+    # ----- cursor -----
+
+    def encode_cursor(self, obj, reverse=False):
+        # obj نمونه‌ی مدل یا ردیف .values() (مسیر سریع serialization) است
+        if isinstance(obj, dict):
+            value, pk = obj[self.field], obj['id']
+        else:
+            value, pk = getattr(obj, self.field), obj.pk
+        payload = {'o': self.ordering, 'p': [force_str(value), pk]}
+        if reverse:
+            payload['r'] = 1
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        token = base64.urlsafe_b64encode(data).decode('ascii').rstrip('=')
+        return replace_query_param(self.base_url, self.cursor_query_param, token)
+
+    def decode_cursor(self, request, model):
+        """(موقعیت، جهت) - موقعیت None یعنی صفحه‌ی اول"""
+        token = request.query_params.get(self.cursor_query_param)
+        if not token:
+            return None, False
+        try:
+            data = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+            # cursorی که با ordering دیگری ساخته شده، معتبر نیست
+            if data['o'] != self.ordering:
+                raise ValueError
+            raw_value, pk = data['p']
+            value = model._meta.get_field(self.field).to_python(raw_value)
+            return (value, int(pk)), bool(data.get('r'))
+        except (TypeError, ValueError, KeyError, ValidationError):
+            raise NotFound(self.invalid_cursor_message)
+
+    def get_next_link(self):
+        if not self.has_next or not self.page:
+            return None
+        return self.encode_cursor(self.page[-1])
+
+    def get_previous_link(self):
+        if not self.has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self.page[0], reverse=True)
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('previous', self.get_previous_link()),
+            ('results', data),
+        ]))
+
+    def get_paginated_response_schema(self, schema):
+        return {
+            'type': 'object',
+            'properties': {
+                'next': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'previous': {'type': 'string', 'nullable': True, 'format': 'uri'},
+                'results': schema,
+            },
+        }
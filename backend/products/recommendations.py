@@ -0,0 +1,180 @@
+# «معمولاً با هم خریده می‌شوند» - محاسبه‌ی آفلاین از اقلام سفارش‌های پرداخت‌شده
+#
+# ۱. سفارش‌های پرداخت‌شده‌ی بعد از watermark قبلی (paid_at, order_id) خوانده می‌شوند
+# ۲. شناسه‌ی محصولات به بازه‌ی 0..n-1 نگاشت می‌شود و همه‌ی جفت‌های هر سفارش
+#    با عملیات برداری NumPy ساخته و با کلید a*n+b شمرده می‌شوند (ماتریس تُنُک)
+# ۳. شمارش‌ها به ProductPairCount اضافه می‌شوند و K همسایه‌ی پرتکرار فقط برای
+#    محصولاتی که جفت جدید داشته‌اند در RelatedProduct بازسازی می‌شود
+
+import itertools
+
+import numpy as np
+from django.db import transaction
+from django.db.models import Q
+from django.db.models.functions import Coalesce
+
+from .cache import bump_catalog_version
+from .models import ProductPairCount, RecommendationRun, RelatedProduct
+
+RUN_NAME = 'bought_together'
+DEFAULT_TOP_K = 20
+# سفارش‌های خیلی بزرگ (خرید عمده) همبستگی واقعی نشان نمی‌دهند و جفت‌هایشان درجه دوم رشد می‌کند
+MAX_ORDER_ITEMS = 30
+CHUNK_SIZE = 500
+
+
+def _chunks(values, size=CHUNK_SIZE):
+    for start in range(0, len(values), size):
+        yield values[start:start + size]
+
+
+def _paid_orders():
+    from orders.models import Order
+    return Order.objects.filter(payment_status='paid').annotate(
+        paid_at=Coalesce('payment_date', 'created_at')
+    )
+
+
+def _after(paid_at, order_id):
+    """سفارش‌های بعد از نقطه‌ی (paid_at, order_id)"""
+    return Q(paid_at__gt=paid_at) | Q(paid_at=paid_at, id__gt=order_id)
+
+
+def co_occurrence(order_ids, product_ids, max_items=MAX_ORDER_ITEMS):
+    """
+    شمارش جفت‌های هم‌خرید.
+    ورودی: آرایه‌های هم‌طول مرتب بر اساس (order_id, product_id) و بدون تکرار.
+    خروجی: (a, b, count) با a < b
+    """
+    empty = np.empty(0, dtype=np.int64)
+    if len(order_ids) < 2:
+        return empty, empty, empty
+
+    # نگاشت شناسه‌ها به 0..n-1 تا کلید جفت‌ها در int64 جا شود
+    products, local = np.unique(product_ids, return_inverse=True)
+    n = len(products)
+
+    starts = np.flatnonzero(np.r_[True, order_ids[1:] != order_ids[:-1]])
+    sizes = np.diff(np.r_[starts, len(order_ids)])
+    keep = np.repeat((sizes > 1) & (sizes <= max_items), sizes)
+    order_ids, local = order_ids[keep], local[keep]
+
+    # عنصر i با عنصر i+offset جفت می‌شود اگر در همان سفارش باشد؛ چون اقلام هر سفارش
+    # مرتب‌اند، a < b است و هر جفت دقیقاً یک‌بار ساخته می‌شود
+    keys = []
+    for offset in range(1, max_items):
+        same = order_ids[offset:] == order_ids[:-offset]
+        if not same.any():
+            break
+        keys.append(local[:-offset][same] * n + local[offset:][same])
+    if not keys:
+        return empty, empty, empty
+
+    pairs, counts = np.unique(np.concatenate(keys), return_counts=True)
+    return products[pairs // n], products[pairs % n], counts.astype(np.int64)
+
+
+def _merge_pair_counts(a, b, counts):
+    """افزودن شمارش‌های جدید به ProductPairCount (upsert)"""
+    existing = {}
+    for chunk in _chunks(np.unique(a).tolist()):
+        rows = ProductPairCount.objects.filter(product_a_id__in=chunk).values_list(
+            'product_a_id', 'product_b_id', 'count'
+        )
+        existing.update(((x, y), count) for x, y, count in rows)
+
+    objects = [
+        ProductPairCount(product_a_id=x, product_b_id=y, count=count + existing.get((x, y), 0))
+        for x, y, count in zip(a.tolist(), b.tolist(), counts.tolist())
+    ]
+    ProductPairCount.objects.bulk_create(
+        objects,
+        batch_size=2000,
+        update_conflicts=True,
+        unique_fields=['product_a', 'product_b'],
+        update_fields=['count'],
+    )
+
+
+def _rebuild_related(product_ids, top_k):
+    """بازسازی top-K همسایه‌ها برای محصولات داده‌شده"""
+    for chunk in _chunks(product_ids):
+        rows = np.array(
+            list(ProductPairCount.objects.filter(
+                Q(product_a_id__in=chunk) | Q(product_b_id__in=chunk)
+            ).values_list('product_a_id', 'product_b_id', 'count')),
+            dtype=np.int64,
+        ).reshape(-1, 3)
+
+        # ماتریس متقارن: هر جفت برای هر دو طرف همسایه است
+        src = np.concatenate([rows[:, 0], rows[:, 1]])
+        dst = np.concatenate([rows[:, 1], rows[:, 0]])
+        cnt = np.concatenate([rows[:, 2], rows[:, 2]])
+        mask = np.isin(src, chunk)
+        src, dst, cnt = src[mask], dst[mask], cnt[mask]
+
+        # مرتب‌سازی بر اساس محصول، سپس تعداد نزولی و برای تساوی شناسه‌ی همسایه
+        order = np.lexsort((dst, -cnt, src))
+        src, dst, cnt = src[order], dst[order], cnt[order]
+        starts = np.flatnonzero(np.r_[True, src[1:] != src[:-1]]) if len(src) else np.empty(0, dtype=np.int64)
+        rank = np.arange(len(src)) - np.repeat(starts, np.diff(np.r_[starts, len(src)]))
+        keep = rank < top_k
+
+        RelatedProduct.objects.filter(product_id__in=chunk).delete()
+        RelatedProduct.objects.bulk_create([
+            RelatedProduct(product_id=product, related_id=related, rank=position + 1, score=score)
+            for product, related, position, score in zip(
+                src[keep].tolist(), dst[keep].tolist(), rank[keep].tolist(), cnt[keep].tolist()
+            )
+        ], batch_size=2000)
+
+
+def build_recommendations(top_k=DEFAULT_TOP_K, full=False, max_items=MAX_ORDER_ITEMS, chunk_size=10000):
+    """
+    به‌روزرسانی افزایشی هم‌خریدی از سفارش‌های پرداخت‌شده‌ی جدید.
+    full=True همه‌چیز را از ابتدا می‌سازد. خروجی: خلاصه‌ی اجرا
+    """
+    from orders.models import OrderItem
+
+    with transaction.atomic():
+        run, _ = RecommendationRun.objects.select_for_update().get_or_create(name=RUN_NAME)
+        if full:
+            ProductPairCount.objects.all().delete()
+            RelatedProduct.objects.all().delete()
+            run.last_payment_date, run.last_order_id, run.orders_processed = None, 0, 0
+
+        orders = _paid_orders()
+        if run.last_payment_date is not None:
+            orders = orders.filter(_after(run.last_payment_date, run.last_order_id))
+        # سقف این اجرا ثابت می‌شود تا سفارش‌هایی که حین اجرا پرداخت می‌شوند دفعه‌ی بعد خوانده شوند
+        last = orders.order_by('-paid_at', '-id').values('paid_at', 'id').first()
+        if last is None:
+            return {'orders': 0, 'pairs': 0, 'products': 0}
+        orders = orders.exclude(_after(last['paid_at'], last['id']))
+        order_count = orders.count()
+
+        items = (
+            OrderItem.objects.filter(order__in=orders.values('id'))
+            .values_list('order_id', 'product_id')
+            .order_by('order_id', 'product_id')
+            .distinct()
+        )
+        rows = np.fromiter(
+            itertools.chain.from_iterable(items.iterator(chunk_size=chunk_size)), dtype=np.int64
+        ).reshape(-1, 2)
+        a, b, counts = co_occurrence(rows[:, 0], rows[:, 1], max_items=max_items)
+
+        affected = np.unique(np.concatenate([a, b])).tolist()
+        if len(counts):
+            _merge_pair_counts(a, b, counts)
+            _rebuild_related(affected, top_k)
+
+        run.last_payment_date = last['paid_at']
+        run.last_order_id = last['id']
+        run.orders_processed += order_count
+        run.save()
+
+        if affected:
+            transaction.on_commit(bump_catalog_version)
+
+    return {'orders': order_count, 'pairs': len(counts), 'products': len(affected)}
@@ -0,0 +1,115 @@
+# جستجوی متنی محصولات
+#
+# PostgreSQL: ستون search_vector با ایندکس GIN و رتبه‌بندی با SearchRank
+# سایر دیتابیس‌ها (SQLite در محیط توسعه): همان جستجوی icontains روی name و description
+
+import re
+
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db import connections
+from django.db.models import F, Value
+from rest_framework import filters
+
+# تنظیمات tsvector - stemmer زبان فارسی در PostgreSQL وجود ندارد
+SEARCH_CONFIG = 'simple'
+
+ZWNJ = '\u200c'
+
+_PERSIAN_TRANSLATION = str.maketrans({
+    # ی و ک عربی به فارسی
+    '\u064a': '\u06cc',  # ي → ی
+    '\u0649': '\u06cc',  # ى → ی
+    '\u0643': '\u06a9',  # ك → ک
+    # ارقام فارسی و عربی به لاتین
+    **{chr(0x06f0 + i): str(i) for i in range(10)},
+    **{chr(0x0660 + i): str(i) for i in range(10)},
+    # نیم‌فاصله و کشیده حذف می‌شوند (می‌خواهم = میخواهم)
+    ZWNJ: None,
+    '\u0640': None,
+})
+
+# اعراب (فتحه، کسره، تشدید، ...)
+_DIACRITICS_RE = re.compile('[\u064b-\u0652\u0670]')
+_TOKEN_RE = re.compile(r'\w+')
+
+
+def normalize_persian(text):
+    """یکسان‌سازی متن فارسی برای جستجو"""
+    if not text:
+        return ''
+    text = _DIACRITICS_RE.sub('', text.translate(_PERSIAN_TRANSLATION))
+    return ' '.join(text.lower().split())
+
+
+def search_tokens(text):
+    """کلمات متن یکسان‌شده"""
+    return _TOKEN_RE.findall(normalize_persian(text))
+
+
+def is_search_supported(using='default'):
+    """جستجوی متنی فقط روی PostgreSQL فعال است"""
+    return connections[using].vendor == 'postgresql'
+
+
+def product_search_vector(name, description):
+    """عبارت tsvector محصول - نام با وزن A و توضیحات با وزن B"""
+    return (
+        SearchVector(Value(normalize_persian(name)), weight='A', config=SEARCH_CONFIG)
+        + SearchVector(Value(normalize_persian(description)), weight='B', config=SEARCH_CONFIG)
+    )
+
+
+def product_search_query(text):
+    """
+    ساخت tsquery با تطبیق پیشوندی برای هر کلمه (کفش بچ → کفش:* & بچ:*)
+    """
+    tokens = search_tokens(text)
+    if not tokens:
+        return None
+    raw = ' & '.join(f'{token}:*' for token in tokens)
+    return SearchQuery(raw, search_type='raw', config=SEARCH_CONFIG)
+
+
+def update_search_vectors(queryset, batch_size=500):
+    """محاسبه‌ی مجدد search_vector برای محصولات QuerySet به‌صورت دسته‌ای"""
+    if not is_search_supported(queryset.db):
+        return 0
+
+    total = 0
+    batch = []
+    for product in queryset.only('id', 'name', 'description').iterator(chunk_size=batch_size):
+        product.search_vector = product_search_vector(product.name, product.description)
+        batch.append(product)
+        if len(batch) >= batch_size:
+            total += queryset.model.objects.using(queryset.db).bulk_update(batch, ['search_vector'])
+            batch = []
+    if batch:
+        total += queryset.model.objects.using(queryset.db).bulk_update(batch, ['search_vector'])
+    return total
+
+
+class ProductSearchFilter(filters.SearchFilter):
+    """
+    جستجوی محصولات با full-text search در PostgreSQL و رتبه‌بندی نتایج؛
+    روی سایر دیتابیس‌ها به SearchFilter معمولی برمی‌گردد
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        search_terms = self.get_search_terms(request)
+        if not search_terms:
+            return queryset
+
+        if not is_search_supported(queryset.db):
+            return super().filter_queryset(request, queryset, view)
+
+        query = product_search_query(' '.join(search_terms))
+        if query is None:
+            return queryset.none()
+
+        queryset = queryset.filter(search_vector=query).annotate(
+            search_rank=SearchRank(F('search_vector'), query)
+        )
+        # اگر ترتیب صریحی خواسته نشده، نتایج بر اساس رتبه مرتب می‌شوند
+        if not request.query_params.get(filters.OrderingFilter.ordering_param):
+            queryset = queryset.order_by('-search_rank', '-created_at')
+        return queryset
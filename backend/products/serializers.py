@@ -1,65 +1,136 @@
 from rest_framework import serializers
+from pokopini.serializers import SparseFieldsetsMixin
+from .images import image_variants_representation
 from .models import Product, ProductVariant
 
 
-class ProductVariantSerializer(serializers.ModelSerializer):
+class ImageVariantsField(serializers.ReadOnlyField):
+    """
+    نسخه‌های واکنش‌گرای تصویر: ابعاد اصلی و srcset آماده برای WebP و JPEG
+    """
+
+    def __init__(self, image_field='image', **kwargs):
+        super().__init__(**kwargs)
+        self.image_field = image_field
+
+    def to_representation(self, value):
+        storage = self.parent.Meta.model._meta.get_field(self.image_field).storage
+        return image_variants_representation(value, storage, self.context.get('request'))
+
+
+class ProductVariantSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای تنوع محصولات
     """
     color_display = serializers.CharField(source='get_color_display', read_only=True)
     size_display = serializers.CharField(source='get_size_display', read_only=True)
     is_in_stock = serializers.BooleanField(read_only=True)
+    image_variants = ImageVariantsField()
     
     class Meta:
         model = ProductVariant
         fields = [
             'id', 'color', 'color_display', 'size', 'size_display',
-            'price', 'stock', 'sku', 'image', 'is_in_stock', 'is_active'
+            'price', 'stock', 'sku', 'image', 'image_variants', 'is_in_stock', 'is_active'
         ]
         read_only_fields = ['id', 'sku']
 
 
-class ProductSerializer(serializers.ModelSerializer):
+class ProductSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای محصولات
     """
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     season_display = serializers.CharField(source='get_season_display', read_only=True)
-    is_in_stock = serializers.BooleanField(read_only=True)
+    is_in_stock = serializers.BooleanField(source='in_stock', read_only=True)
     variants = ProductVariantSerializer(many=True, read_only=True)
     available_colors = serializers.ListField(read_only=True)
     available_sizes = serializers.ListField(read_only=True)
     min_price = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
     max_price = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'product_code', 'description', 'price', 'category', 'category_display',
-            'season', 'season_display', 'image', 'is_in_stock', 'is_active',
+            'season', 'season_display', 'image', 'image_variants', 'is_in_stock', 'is_active',
             'variants', 'available_colors', 'available_sizes', 'min_price', 'max_price',
             'created_at', 'updated_at'
         ]
         read_only_fields = ['id', 'product_code', 'created_at', 'updated_at']
 
 
-class ProductListSerializer(serializers.ModelSerializer):
+class ProductListSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer ساده برای لیست محصولات (بدون جزئیات کامل)
+    اگر QuerySet با with_variant_stats() ساخته شده باشد، مقادیر زنده‌ی annotate شده
+    جای ستون‌های ذخیره‌شده خوانده می‌شوند
     """
+    VARIANT_STATS_ANNOTATIONS = {
+        'is_in_stock': 'live_in_stock',
+        'min_price': 'live_min_price',
+        'max_price': 'live_max_price',
+        'variants_count': 'live_variants_count',
+    }
+
     category_display = serializers.CharField(source='get_category_display', read_only=True)
     season_display = serializers.CharField(source='get_season_display', read_only=True)
-    is_in_stock = serializers.BooleanField(read_only=True)
+    is_in_stock = serializers.BooleanField(source='in_stock', read_only=True)
     min_price = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
     max_price = serializers.DecimalField(max_digits=10, decimal_places=0, read_only=True)
-    variants_count = serializers.SerializerMethodField()
+    variants_count = serializers.IntegerField(read_only=True)
+    image_variants = ImageVariantsField()
 
     class Meta:
         model = Product
         fields = [
             'id', 'name', 'product_code', 'price', 'min_price', 'max_price', 'category', 'category_display',
-            'season', 'season_display', 'image', 'is_in_stock', 'variants_count', 'created_at'
+            'season', 'season_display', 'image', 'image_variants', 'is_in_stock', 'variants_count', 'created_at'
         ]
-    
-    def get_variants_count(self, obj):
-        return obj.variants.count()
+
+    def to_representation(self, instance):
+        data = super().to_representation(instance)
+        for field_name, annotation in self.VARIANT_STATS_ANNOTATIONS.items():
+            if field_name in data and hasattr(instance, annotation):
+                data[field_name] = self.fields[field_name].to_representation(
+                    getattr(instance, annotation)
+                )
+        return data
+
+
+class VariantMatrixSerializer(serializers.Serializer):
+    """
+    ورودی ساخت گروهی تنوع‌ها: همه ترکیب‌های رنگ × سایز که وجود ندارند ساخته می‌شوند
+    """
+    colors = serializers.ListField(
+        child=serializers.ChoiceField(choices=ProductVariant.COLOR_CHOICES), allow_empty=False
+    )
+    sizes = serializers.ListField(
+        child=serializers.ChoiceField(choices=ProductVariant.SIZE_CHOICES), allow_empty=False
+    )
+    price = serializers.DecimalField(max_digits=10, decimal_places=0, min_value=0, required=False)
+    stock = serializers.IntegerField(min_value=0, default=0)
+
+
+class ProductBatchSerializer(serializers.Serializer):
+    """
+    پارامترهای دریافت گروهی محصولات: ids=1,5,9 و shape=list|detail
+    """
+    MAX_IDS = 50
+
+    ids = serializers.CharField()
+    shape = serializers.ChoiceField(choices=['list', 'detail'], default='list')
+
+    def validate_ids(self, value):
+        try:
+            ids = [int(part) for part in value.split(',') if part.strip()]
+        except ValueError:
+            raise serializers.ValidationError('شناسه‌ها باید عدد و با کاما جدا شده باشند.')
+        # تکراری‌ها حذف می‌شوند و ترتیب درخواست حفظ می‌شود
+        ids = list(dict.fromkeys(ids))
+        if not ids:
+            raise serializers.ValidationError('حداقل یک شناسه لازم است.')
+        if len(ids) > self.MAX_IDS:
+            raise serializers.ValidationError(f'حداکثر {self.MAX_IDS} شناسه در هر درخواست مجاز است.')
+        return ids
@@ -0,0 +1,38 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .cache import bump_catalog_version
+from .images import refresh_image_variants
+from .models import Product, ProductVariant
+
+
+@receiver(post_save, sender=ProductVariant)
+@receiver(post_delete, sender=ProductVariant)
+def refresh_product_variant_aggregates(sender, instance, using, **kwargs):
+    """
+    به‌روزرسانی خلاصه‌ی تنوع‌های محصول در همان تراکنشِ ذخیره/حذف تنوع
+    (ProductVariant.save/delete تراکنش را باز می‌کنند؛ نسخه‌ی کاتالوگ بعد از commit افزایش می‌یابد)
+    """
+    Product.objects.using(using).filter(pk=instance.product_id).refresh_variant_aggregates()
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def bump_catalog_version_on_product_change(sender, instance, using, **kwargs):
+    """افزایش نسخه‌ی کاتالوگ بعد از commit تغییرات محصول"""
+    transaction.on_commit(bump_catalog_version, using=using)
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_save, sender=ProductVariant)
+def generate_image_variants(sender, instance, using, raw=False, **kwargs):
+    """ساخت نسخه‌های تصویر بعد از commit، اگر تصویر عوض شده باشد"""
+    if raw:
+        return
+
+    def generate():
+        if refresh_image_variants(instance):
+            bump_catalog_version()
+
+    transaction.on_commit(generate, using=using)
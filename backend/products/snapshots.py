@@ -0,0 +1,157 @@
+# snapshotهای ایستای کاتالوگ برای سرو مستقیم توسط nginx
+#
+# ساختار پوشه (CATALOG_SNAPSHOT_ROOT):
+#   versions/<version>/manifest.json.gz
+#   versions/<version>/featured.json.gz
+#   versions/<version>/facets.json.gz
+#   versions/<version>/categories/<category>/page-<n>.json.gz
+#   versions/<version>/products/<id>.json.gz
+#   current -> versions/<version>    (symlink، با os.replace به‌صورت اتمیک عوض می‌شود)
+#
+# فایل‌ها از قبل gzip شده‌اند (nginx: gzip_static always + gunzip). مسیرهای نسخه‌دار
+# تغییر نمی‌کنند و cache طولانی دارند؛ فقط manifest.json فعلی باید دوباره خوانده شود.
+#
+# فروش فقط نسخه‌ی موجودی محصول را عوض می‌کند، نه نسخه‌ی کاتالوگ را؛ پس فایل‌های جزئیات
+# موجودی تک‌تک تنوع‌ها را ندارند و کلاینت آن را زنده از /api/products/<id>/ می‌گیرد.
+
+import gzip
+import json
+import os
+import shutil
+import time
+from pathlib import Path
+
+from django.conf import settings
+from django.utils import timezone
+from pokopini.renderers import ORJSONRenderer
+from rest_framework.settings import api_settings
+
+from .cache import get_catalog_version
+from .facets import compute_facets
+from .models import Product
+from .serializers import ProductListSerializer, ProductSerializer
+
+CURRENT_LINK = 'current'
+VERSIONS_DIR = 'versions'
+MANIFEST_NAME = 'manifest.json'
+# فیلدهایی که با هر فروش عوض می‌شوند و در snapshot کهنه می‌مانند
+DETAIL_OMIT = 'variants.stock,variants.is_in_stock'
+
+
+def snapshot_root():
+    return Path(settings.CATALOG_SNAPSHOT_ROOT)
+
+
+class SnapshotWriter:
+    """نوشتن فایل‌های gzip شده‌ی یک نسخه"""
+
+    def __init__(self, directory):
+        self.directory = directory
+        self.renderer = ORJSONRenderer()
+        self.files = 0
+
+    def write(self, name, data):
+        path = self.directory / f'{name}.gz'
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # mtime=0: خروجی برای داده‌ی یکسان همیشه یکسان است
+        with open(path, 'wb') as raw, gzip.GzipFile(fileobj=raw, mode='wb', mtime=0) as file:
+            file.write(self.renderer.render(data))
+        self.files += 1
+
+
+def _page(queryset, page, page_size, url):
+    """بدنه‌ی یک صفحه با همان شکل PageNumberPagination"""
+    count = queryset.count()
+    start = (page - 1) * page_size
+    results = ProductListSerializer(queryset[start:start + page_size], many=True).data
+    return {
+        'count': count,
+        'next': f'{url}page-{page + 1}.json' if start + page_size < count else None,
+        'previous': f'{url}page-{page - 1}.json' if page > 1 else None,
+        'results': results,
+    }
+
+
+def build_snapshot(pages=None, keep=None, chunk_size=500):
+    """
+    ساخت snapshot برای نسخه‌ی فعلی کاتالوگ و انتشار اتمیک آن.
+    اگر snapshot همین نسخه منتشر شده باشد، کاری انجام نمی‌شود. خروجی: manifest
+    """
+    pages = pages or settings.CATALOG_SNAPSHOT_PAGES
+    keep = keep or settings.CATALOG_SNAPSHOT_KEEP
+    version = str(get_catalog_version())
+    current = read_manifest()
+    if current and current['version'] == version:
+        return current
+
+    root = snapshot_root()
+    directory = root / VERSIONS_DIR / version
+    building = directory.with_name(f'.{version}.building')
+    shutil.rmtree(building, ignore_errors=True)
+    writer = SnapshotWriter(building)
+    base_url = f'{settings.CATALOG_SNAPSHOT_URL}{version}/'
+    started = time.monotonic()
+
+    products = Product.objects.filter(is_active=True)
+    page_size = api_settings.PAGE_SIZE
+
+    writer.write('featured.json', ProductListSerializer(
+        products.for_list().order_by('-popularity', '-created_at')[:8], many=True
+    ).data)
+    writer.write('facets.json', compute_facets(products, {}))
+
+    for category, _ in Product.CATEGORY_CHOICES:
+        queryset = products.filter(category=category).for_list().order_by('-created_at', '-id')
+        url = f'{base_url}categories/{category}/'
+        for page in range(1, pages + 1):
+            body = _page(queryset, page, page_size, url)
+            writer.write(f'categories/{category}/page-{page}.json', body)
+            if body['next'] is None:
+                break
+
+    detail = products.for_detail().order_by('id')
+    for product in detail.iterator(chunk_size=chunk_size):
+        writer.write(f'products/{product.id}.json', ProductSerializer(product, omit=DETAIL_OMIT).data)
+
+    manifest = {
+        'version': version,
+        'built_at': timezone.now().isoformat(),
+        'base_url': base_url,
+        'files': writer.files,
+        'build_seconds': round(time.monotonic() - started, 2),
+    }
+    writer.write(MANIFEST_NAME, manifest)
+
+    # انتشار: جابه‌جایی پوشه و سپس symlink موقت که با os.replace جای current را می‌گیرد
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(building, directory)
+    temp_link = root / f'.{CURRENT_LINK}.{os.getpid()}'
+    if temp_link.is_symlink():
+        temp_link.unlink()
+    temp_link.symlink_to(Path(VERSIONS_DIR) / version, target_is_directory=True)
+    os.replace(temp_link, root / CURRENT_LINK)
+
+    _prune(root / VERSIONS_DIR, keep, version)
+    return manifest
+
+
+def _prune(versions, keep, current):
+    """حذف نسخه‌های قدیمی - چند نسخه نگه داشته می‌شود تا کلاینت‌های در حال خواندن خطا نگیرند"""
+    directories = sorted(
+        (path for path in versions.iterdir() if path.is_dir() and not path.name.startswith('.')),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True,
+    )
+    for path in directories[keep:]:
+        if path.name != current:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def read_manifest():
+    """manifest منتشرشده‌ی فعلی یا None"""
+    path = snapshot_root() / CURRENT_LINK / f'{MANIFEST_NAME}.gz'
+    try:
+        with gzip.open(path, 'rb') as file:
+            return json.loads(file.read())
+    except (OSError, ValueError):
+        return None
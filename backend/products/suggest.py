@@ -0,0 +1,176 @@
+# ایندکس درون‌پردازه‌ای برای پیشنهاد خودکار نام محصولات
+#
+# هر worker یک نسخه از ایندکس را در حافظه نگه می‌دارد:
+# - پیشوندهای یکسان‌شده‌ی کلمات نام و کد محصول برای تطبیق هنگام تایپ
+# - سه‌حرفی‌ها (trigram) برای تحمل غلط تایپی
+# با تغییر نسخه‌ی کاتالوگ، فقط محصولات تغییرکرده دوباره خوانده می‌شوند.
+
+import heapq
+import logging
+import threading
+from collections import Counter, defaultdict
+from itertools import chain
+from datetime import timedelta
+
+from django.db import DatabaseError
+from django.db.models import Q
+
+from .cache import get_catalog_version
+from .models import Product
+from .search import search_tokens
+
+logger = logging.getLogger(__name__)
+
+MAX_PREFIX_LENGTH = 15
+MIN_TRIGRAM_SIMILARITY = 0.5
+
+# تراکنش‌هایی که دیرتر commit می‌شوند ممکن است updated_at قدیمی‌تری داشته باشند
+SYNC_OVERLAP = timedelta(minutes=1)
+
+
+def _trigrams(tokens):
+    grams = set()
+    for token in tokens:
+        padded = f'  {token} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+class SuggestIndex:
+    """ایندکس پیشوندی و سه‌حرفی نام و کد محصولات فعال"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.version = None
+        self.synced_at = None
+        self._entries = {}
+        self._keys = {}
+        self._prefixes = defaultdict(set)
+        self._trigrams = defaultdict(set)
+
+    # ----- نگه‌داری ایندکس -----
+
+    def _add(self, row):
+        product_id = row['id']
+        tokens = search_tokens(row['name'])
+        if row['product_code']:
+            code = row['product_code'].lower()
+            tokens += search_tokens(code) + [code.replace('-', '')]
+
+        prefixes = {token[:i] for token in tokens for i in range(1, min(len(token), MAX_PREFIX_LENGTH) + 1)}
+        trigrams = _trigrams(tokens)
+        for prefix in prefixes:
+            self._prefixes[prefix].add(product_id)
+        for gram in trigrams:
+            self._trigrams[gram].add(product_id)
+
+        self._keys[product_id] = (prefixes, trigrams)
+        self._entries[product_id] = {
+            'id': product_id,
+            'name': row['name'],
+            'product_code': row['product_code'],
+            'image': row['image'],
+        }
+
+    def _remove(self, product_id):
+        keys = self._keys.pop(product_id, None)
+        if keys is None:
+            return
+        prefixes, trigrams = keys
+        for prefix in prefixes:
+            self._prefixes[prefix].discard(product_id)
+        for gram in trigrams:
+            self._trigrams[gram].discard(product_id)
+        del self._entries[product_id]
+
+    def _load(self, condition):
+        return Product.objects.filter(condition).values(
+            'id', 'name', 'product_code', 'image', 'is_active', 'updated_at'
+        )
+
+    def build(self):
+        """ساخت کامل ایندکس از روی محصولات فعال"""
+        version = get_catalog_version()
+        rows = list(self._load(Q(is_active=True)))
+        with self._lock:
+            self._entries, self._keys = {}, {}
+            self._prefixes, self._trigrams = defaultdict(set), defaultdict(set)
+            for row in rows:
+                self._add(row)
+            self.synced_at = max((row['updated_at'] for row in rows), default=None)
+            self.version = version
+
+    def refresh(self):
+        """
+        به‌روزرسانی افزایشی: فقط محصولاتی که بعد از آخرین همگام‌سازی تغییر کرده‌اند،
+        به‌علاوه‌ی حذف محصولاتی که دیگر فعال نیستند
+        """
+        version = get_catalog_version()
+        if self.synced_at is None:
+            return self.build()
+
+        changed = list(self._load(Q(updated_at__gte=self.synced_at - SYNC_OVERLAP)))
+        active_ids = set(Product.objects.filter(is_active=True).values_list('id', flat=True))
+        with self._lock:
+            for product_id in set(self._entries) - active_ids:
+                self._remove(product_id)
+            for row in changed:
+                self._remove(row['id'])
+                if row['is_active']:
+                    self._add(row)
+                if row['updated_at'] > self.synced_at:
+                    self.synced_at = row['updated_at']
+            self.version = version
+
+    def ensure_fresh(self):
+        """اگر نسخه‌ی کاتالوگ تغییر کرده، ایندکس به‌روزرسانی می‌شود"""
+        if self.version is None:
+            self.build()
+        elif self.version != get_catalog_version():
+            self.refresh()
+
+    # ----- جستجو -----
+
+    def search(self, query, limit=8):
+        """
+        پیشنهاد محصولات: ابتدا محصولاتی که همه کلمات جستجو پیشوند کلمات آن‌ها هستند،
+        سپس نزدیک‌ترین‌ها بر اساس شباهت سه‌حرفی
+        """
+        tokens = [token[:MAX_PREFIX_LENGTH] for token in search_tokens(query)]
+        if not tokens:
+            return []
+
+        with self._lock:
+            sets = sorted((self._prefixes.get(token, set()) for token in tokens), key=len)
+            exact = set.intersection(*sets) if sets[0] else set()
+            ranked = heapq.nsmallest(limit, exact, key=lambda pid: (len(self._entries[pid]['name']), pid))
+
+            if len(ranked) < limit:
+                query_grams = _trigrams(tokens)
+                shared = Counter(chain.from_iterable(
+                    self._trigrams[gram] for gram in query_grams if gram in self._trigrams
+                ))
+                # سهمی از سه‌حرفی‌های عبارت جستجو که در محصول وجود دارد
+                min_shared = MIN_TRIGRAM_SIMILARITY * len(query_grams)
+                candidates = (
+                    (count, product_id) for product_id, count in shared.items()
+                    if count >= min_shared and product_id not in exact
+                )
+                best = heapq.nlargest(
+                    limit - len(ranked), candidates,
+                    key=lambda item: (item[0], -len(self._entries[item[1]]['name'])),
+                )
+                ranked += [product_id for _, product_id in best]
+
+            return [self._entries[product_id] for product_id in ranked]
+
+
+suggest_index = SuggestIndex()
+
+
+def warm_up_suggest_index():
+    """ساخت ایندکس هنگام شروع worker - خطای دیتابیس شروع سرور را متوقف نمی‌کند"""
+    try:
+        suggest_index.build()
+    except DatabaseError:
+        logger.warning('Could not build product suggest index at startup', exc_info=True)
@@ -1,8 +1,22 @@
-from django.test import TestCase
+import io
+import os
+import shutil
+import tempfile
+import unittest
+
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.utils import timezone
+from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Product
+from PIL import Image
+from .models import Product, ProductVariant
 
 User = get_user_model()
 
@@ -43,3 +57,1096 @@ class ProductTestCase(APITestCase):
         url = '/api/products/?search=تست'
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+
+class ProductVariantAggregatesTestCase(TestCase):
+    """تست‌های خلاصه‌ی تنوع‌ها روی محصول"""
+
+    def setUp(self):
+        self.product = Product.objects.create(
+            name='بادی نوزادی',
+            description='توضیحات تست',
+            price=100000,
+            category='baby',
+            season='spring',
+        )
+
+    def test_product_without_variants(self):
+        """محصول بدون تنوع: بازه قیمت همان قیمت پایه است"""
+        self.assertEqual(self.product.min_price, 100000)
+        self.assertEqual(self.product.max_price, 100000)
+        self.assertFalse(self.product.in_stock)
+        self.assertEqual(self.product.variants_count, 0)
+
+    def test_aggregates_follow_variant_writes(self):
+        """ذخیره، به‌روزرسانی گروهی و حذف تنوع‌ها خلاصه را به‌روز می‌کند"""
+        red = ProductVariant.objects.create(
+            product=self.product, color='red', size='3-6m', price=90000, stock=0
+        )
+        ProductVariant.objects.create(
+            product=self.product, color='blue', size='0-3m', price=120000, stock=4
+        )
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.min_price, 90000)
+        self.assertEqual(self.product.max_price, 120000)
+        self.assertEqual(self.product.total_stock, 4)
+        self.assertTrue(self.product.in_stock)
+        self.assertEqual(self.product.variants_count, 2)
+        self.assertEqual(self.product.available_colors, ['red', 'blue'])
+        self.assertEqual(self.product.available_sizes, ['0-3m', '3-6m'])
+
+        ProductVariant.objects.filter(product=self.product).update(stock=0)
+        self.product.refresh_from_db()
+        self.assertFalse(self.product.in_stock)
+        self.assertEqual(self.product.total_stock, 0)
+
+        red.delete()
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.variants_count, 1)
+        self.assertEqual(self.product.min_price, 120000)
+        self.assertEqual(self.product.available_colors, ['blue'])
+
+    def test_refresh_shares_the_variant_transaction(self):
+        """اگر به‌روزرسانی خلاصه شکست بخورد، ذخیره‌ی تنوع هم برمی‌گردد"""
+        from unittest import mock
+        from django.db import DatabaseError
+        from .models import ProductQuerySet
+
+        with mock.patch.object(ProductQuerySet, 'refresh_variant_aggregates', side_effect=DatabaseError):
+            with self.assertRaises(DatabaseError):
+                ProductVariant.objects.create(
+                    product=self.product, color='red', size='3-6m', price=90000, stock=2
+                )
+        self.assertFalse(ProductVariant.objects.exists())
+
+    def test_rebuild_command_reconciles_columns(self):
+        """rebuild_product_aggregates ستون‌های خلاصه‌ی ناهماهنگ را درست می‌کند"""
+        ProductVariant.objects.create(
+            product=self.product, color='red', size='3-6m', price=90000, stock=2
+        )
+        Product.objects.filter(pk=self.product.pk).update(total_stock=0, in_stock=False, variants_count=0)
+
+        call_command('rebuild_product_aggregates', stdout=io.StringIO())
+        self.product.refresh_from_db()
+        self.assertEqual((self.product.total_stock, self.product.variants_count), (2, 1))
+        self.assertTrue(self.product.in_stock)
+
+    def test_list_reads_stored_columns(self):
+        """لیست محصولات مقادیر خلاصه را از ستون‌های ذخیره‌شده می‌خواند"""
+        for i in range(5):
+            product = Product.objects.create(
+                name=f'محصول {i}', description='-', price=50000,
+                category='girl', season='summer',
+            )
+            ProductVariant.objects.create(
+                product=product, color='pink', size='2y', price=50000, stock=3
+            )
+        response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        first = response.data['results'][0]
+        self.assertTrue(first['is_in_stock'])
+        self.assertEqual(first['variants_count'], 1)
+
+
+class ProductListQueryPlanTestCase(APITestCase):
+    """تست‌های برنامه‌ی query لیست محصولات"""
+
+    def setUp(self):
+        cache.clear()
+        for i in range(15):
+            product = Product.objects.create(
+                name=f'محصول {i}', description='توضیحات بلند ' * 50, price=80000,
+                category='boy', season='winter',
+            )
+            for size in ['2y', '3y', '4y']:
+                ProductVariant.objects.create(
+                    product=product, color='navy', size=size, price=80000 + i, stock=i % 2
+                )
+
+    def test_list_query_count_is_constant(self):
+        """تعداد queries لیست به اندازه صفحه و تعداد تنوع‌ها بستگی ندارد"""
+        with self.assertNumQueries(2):  # COUNT + SELECT
+            response = self.client.get('/api/products/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 12)
+
+    def test_staff_list_uses_live_annotations(self):
+        """لیست ادمین آمار تنوع‌ها را با subquery محاسبه می‌کند"""
+        staff = User.objects.create_user(username='staff', password='x', is_staff=True)
+        self.client.force_authenticate(user=staff)
+        product = Product.objects.order_by('-created_at').first()
+        # خراب کردن عمدی ستون ذخیره‌شده
+        Product.objects.filter(pk=product.pk).update(variants_count=0)
+
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/')
+        row = next(r for r in response.data['results'] if r['id'] == product.id)
+        self.assertEqual(row['variants_count'], 3)
+
+
+class ProductSearchTestCase(APITestCase):
+    """تست‌های جستجوی محصولات"""
+
+    def test_normalize_persian(self):
+        """یکسان‌سازی ی/ک عربی، نیم‌فاصله و ارقام"""
+        from .search import normalize_persian
+        self.assertEqual(normalize_persian('كفش مي‌خواهم'), 'کفش میخواهم')
+        self.assertEqual(normalize_persian('سایز ۱۲ و ٣'), 'سایز 12 و 3')
+
+    def test_search_fallback(self):
+        """روی SQLite جستجو به icontains برمی‌گردد"""
+        cache.clear()
+        Product.objects.create(
+            name='پیراهن دخترانه', description='نخی', price=90000,
+            category='girl', season='summer',
+        )
+        response = self.client.get('/api/products/', {'search': 'پیراهن'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['count'], 1)
+
+    def test_query_keeps_only_words(self):
+        """عملگرهای tsquery در ورودی کاربر به query خام نمی‌رسند (خطای دیتابیس به‌جای 400)"""
+        from .search import product_search_query
+        query = product_search_query("كفش' & بچ|:*")
+        self.assertEqual(query.source_expressions[-1].value, 'کفش:* & بچ:*')
+        self.assertIsNone(product_search_query("' : & | !"))
+
+
+@unittest.skipUnless(connection.vendor == 'postgresql', 'جستجوی متنی فقط روی PostgreSQL است')
+class ProductFullTextSearchTestCase(APITestCase):
+    """تست‌های full-text search روی PostgreSQL"""
+
+    def setUp(self):
+        cache.clear()
+        self.shoe = Product.objects.create(
+            name='کفش اسپرت', description='-', price=90000, category='boy', season='summer',
+        )
+        # جدیدتر است؛ بدون رتبه‌بندی اول می‌آمد
+        self.sock = Product.objects.create(
+            name='جوراب', description='مناسب کفش بچگانه', price=20000, category='boy', season='summer',
+        )
+
+    def search(self, text):
+        response = self.client.get('/api/products/', {'search': text})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row['id'] for row in response.json()['results']]
+
+    def test_name_match_ranks_first(self):
+        self.assertEqual(self.search('کفش'), [self.shoe.id, self.sock.id])
+
+    def test_prefix_match(self):
+        self.assertEqual(self.search('اسپ'), [self.shoe.id])
+        self.assertEqual(self.search('كف بچ'), [self.sock.id])
+
+    def test_operators_in_input(self):
+        self.assertEqual(self.search("کفش' & اسپرت|:*"), [self.shoe.id])
+        self.assertEqual(self.search("' : & |"), [])
+
+
+class ProductSuggestTestCase(APITestCase):
+    """تست‌های پیشنهاد خودکار جستجو"""
+
+    def setUp(self):
+        from .suggest import suggest_index
+        self.index = suggest_index
+        self.shirt = Product.objects.create(
+            name='پیراهن چهارخانه پسرانه', description='-', price=70000,
+            category='boy', season='spring',
+        )
+        self.dress = Product.objects.create(
+            name='پيراهن مجلسی دخترانه', description='-', price=150000,
+            category='girl', season='summer',
+        )
+        self.index.build()
+
+    def test_prefix_and_typo(self):
+        """تطبیق پیشوندی با ی عربی و تحمل غلط تایپی"""
+        ids = [p['id'] for p in self.index.search('پیراه دختر')]
+        self.assertEqual(ids, [self.dress.id])
+        ids = [p['id'] for p in self.index.search('چهارخونه')]
+        self.assertEqual(ids, [self.shirt.id])
+        ids = [p['id'] for p in self.index.search(self.shirt.product_code)]
+        self.assertEqual(ids[0], self.shirt.id)
+
+    def test_suggest_endpoint_without_queries(self):
+        """endpoint پیشنهاد وقتی نسخه تغییر نکرده به دیتابیس نمی‌رود"""
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/suggest/', {'q': 'پیراهن'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+        self.assertEqual(set(response.data[0]), {'id', 'name', 'product_code', 'image'})
+
+    def test_incremental_refresh(self):
+        """با تغییر نسخه‌ی کاتالوگ، محصولات جدید و غیرفعال‌شده اعمال می‌شوند"""
+        with self.captureOnCommitCallbacks(execute=True):
+            Product.objects.create(
+                name='شلوار جین', description='-', price=90000,
+                category='boy', season='fall',
+            )
+            self.dress.is_active = False
+            self.dress.save()
+        self.index.ensure_fresh()
+        self.assertEqual(len(self.index.search('شلوار')), 1)
+        self.assertEqual([p['id'] for p in self.index.search('مجلسی')], [])
+
+
+class ProductFacetsTestCase(APITestCase):
+    """تست‌های facetهای کاتالوگ"""
+
+    def setUp(self):
+        cache.clear()
+        self.girl = Product.objects.create(
+            name='پیراهن', description='-', price=120000, category='girl', season='summer',
+        )
+        ProductVariant.objects.create(product=self.girl, color='pink', size='2y', price=120000, stock=2)
+        ProductVariant.objects.create(product=self.girl, color='red', size='3y', price=130000, stock=0)
+        self.boy = Product.objects.create(
+            name='شلوار', description='-', price=80000, category='boy', season='winter',
+        )
+        ProductVariant.objects.create(product=self.boy, color='blue', size='2y', price=80000, stock=0)
+
+    def test_facets_counts(self):
+        """هر facet با فیلترهای دیگر شمرده می‌شود"""
+        with self.assertNumQueries(6):
+            response = self.client.get('/api/products/facets/', {'size': '2y', 'category': 'girl'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = response.data
+        self.assertEqual(data['count'], 1)
+        # facet دسته‌بندی فیلتر category را نادیده می‌گیرد
+        self.assertEqual({c['value']: c['count'] for c in data['category']}, {'girl': 1, 'boy': 1})
+        # قرمز فقط سایز ۳ سال دارد
+        self.assertEqual({c['value'] for c in data['color']}, {'pink'})
+        self.assertEqual(data['in_stock'], {'true': 1, 'false': 0})
+        self.assertEqual(data['price']['min'], 120000)
+
+        # درخواست دوم با همان فیلترها (ترتیب متفاوت) از cache خوانده می‌شود
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/facets/', {'category': 'girl', 'sizes': '2y'})
+
+    def test_facets_invalidated_on_catalog_change(self):
+        """تغییر کاتالوگ cache را بی‌اعتبار می‌کند"""
+        self.client.get('/api/products/facets/')
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductVariant.objects.filter(product=self.boy).update(stock=5)
+        response = self.client.get('/api/products/facets/')
+        self.assertEqual(response.data['in_stock'], {'true': 2, 'false': 0})
+
+    def test_list_filters(self):
+        """فیلترهای رنگ، سایز و قیمت روی لیست محصولات"""
+        response = self.client.get('/api/products/', {'colors': 'pink,blue', 'max_price': 100000})
+        self.assertEqual([p['id'] for p in response.data['results']], [self.boy.id])
+
+    def test_variant_filters_match_same_variant(self):
+        """رنگ، سایز و موجودی باید روی یک تنوع برقرار باشند"""
+        def ids(params):
+            return [p['id'] for p in self.client.get('/api/products/', params).data['results']]
+
+        # قرمز هست و سایز ۲ سال هم هست، ولی نه روی یک تنوع
+        self.assertEqual(ids({'color': 'red', 'size': '2y'}), [])
+        self.assertEqual(ids({'color': 'pink', 'size': '2y'}), [self.girl.id])
+        # قرمز ناموجود است
+        self.assertEqual(ids({'color': 'red', 'in_stock': 'true'}), [])
+        self.assertEqual(ids({'in_stock': 'false'}), [self.boy.id])
+        self.assertEqual(ids({'min_price': 125000}), [self.girl.id])
+
+    def test_facet_counts_match_list(self):
+        """هر شمارش facet با count لیست همان فیلترها به‌علاوه‌ی گزینه‌ی facet یکی است"""
+        def list_count(params):
+            return self.client.get('/api/products/', params).json()['count']
+
+        ProductVariant.objects.create(product=self.boy, color='red', size='2y', price=90000, stock=1)
+        for params in ({}, {'size': '2y'}, {'color': 'red', 'in_stock': 'true'}, {'category': 'girl', 'color': 'red'},
+                       {'in_stock': 'false'}, {'max_price': 100000, 'size': '3y'}):
+            data = self.client.get('/api/products/facets/', params).data
+            self.assertEqual(data['count'], list_count(params), params)
+            for facet in ('category', 'season', 'color', 'size'):
+                for option in data[facet]:
+                    self.assertEqual(option['count'], list_count({**params, facet: option['value']}), (params, option))
+            for value, facet_count in data['in_stock'].items():
+                self.assertEqual(facet_count, list_count({**params, 'in_stock': value}), (params, value))
+            for option in data['price']['ranges']:
+                bounds = {
+                    key: bound for key, bound in (('min_price', option['min']), ('max_price', option['max'] and option['max'] - 1))
+                    if bound is not None
+                }
+                self.assertEqual(option['count'], list_count({**params, **bounds}), (params, option))
+
+
+class ProductCursorPaginationTestCase(APITestCase):
+    """تست‌های صفحه‌بندی cursor لیست محصولات"""
+
+    def setUp(self):
+        cache.clear()
+        now = timezone.now()
+        self.products = []
+        for index in range(30):
+            product = Product.objects.create(
+                name=f'محصول {index}', description='-', price=10000 + (index % 5) * 1000,
+                category='girl', season='summer',
+            )
+            self.products.append(product)
+        # چند محصول با created_at یکسان تا id گره را باز کند
+        Product.objects.filter(id__in=[p.id for p in self.products[:10]]).update(created_at=now)
+
+    def _walk(self, url, params=None):
+        ids = []
+        response = self.client.get(url, params)
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            self.assertNotIn('count', response.data)
+            ids += [item['id'] for item in response.data['results']]
+            if not response.data['next']:
+                return ids, response
+            response = self.client.get(response.data['next'])
+
+    def test_walks_default_ordering_without_duplicates(self):
+        """پیمایش کامل با ترتیب -created_at, -id"""
+        ids, _ = self._walk('/api/products/', {'pagination': 'cursor'})
+        expected = list(
+            Product.objects.order_by('-created_at', '-id').values_list('id', flat=True)
+        )
+        self.assertEqual(ids, expected)
+
+    def test_price_ordering_and_previous(self):
+        """ترتیب قیمت و بازگشت به صفحه‌ی قبل"""
+        ids, last = self._walk('/api/products/', {'pagination': 'cursor', 'ordering': 'price'})
+        expected = list(Product.objects.order_by('price', 'id').values_list('id', flat=True))
+        self.assertEqual(ids, expected)
+
+        previous = self.client.get(last.data['previous'])
+        self.assertEqual([item['id'] for item in previous.data['results']], expected[12:24])
+
+    def test_constant_queries_and_invalid_cursor(self):
+        """بدون COUNT؛ cursor نامعتبر 404 می‌دهد"""
+        with self.assertNumQueries(1):
+            self.client.get('/api/products/', {'pagination': 'cursor'})
+        response = self.client.get('/api/products/', {'cursor': 'invalid'})
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+
+
+class CatalogCacheTestCase(APITestCase):
+    """تست‌های cache نسخه‌دار کاتالوگ"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='reviewer', password='pass12345')
+        self.product = Product.objects.create(
+            name='کلاه', description='-', price=50000, category='baby', season='winter',
+        )
+
+    def test_featured_invalidated_on_product_change(self):
+        """تغییر محصول، cache محصولات ویژه را بی‌اعتبار می‌کند"""
+        self.client.get('/api/products/featured/')
+        with self.assertNumQueries(0):
+            self.client.get('/api/products/featured/')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.name = 'کلاه زمستانی'
+            self.product.save()
+        response = self.client.get('/api/products/featured/')
+        self.assertEqual(response.data[0]['name'], 'کلاه زمستانی')
+
+    def test_review_bumps_catalog_version(self):
+        """ثبت نظر نسخه‌ی کاتالوگ را افزایش می‌دهد"""
+        from reviews.models import Review
+        from .cache import get_catalog_version
+
+        version = get_catalog_version()
+        with self.captureOnCommitCallbacks(execute=True):
+            Review.objects.create(product=self.product, user=self.user, rating=5, comment='عالی')
+        self.assertGreater(get_catalog_version(), version)
+
+    def test_cache_manager_invalidation(self):
+        """invalidate_product_cache همه صفحه‌ها و اندازه‌ها را بی‌اعتبار می‌کند"""
+        from .optimizations import ProductCacheManager
+
+        self.assertEqual(ProductCacheManager.get_category_products('baby', page=7, page_size=5), [])
+        self.assertEqual(len(ProductCacheManager.get_category_products('baby', page=1, page_size=30)), 0)
+        # محصول موجود می‌شود؛ بدون افزایش نسخه، نتیجه‌ی قبلی از cache برمی‌گردد
+        ProductVariant.objects.create(product=self.product, color='red', size='1y', price=50000, stock=1)
+        self.assertEqual(len(ProductCacheManager.get_category_products('baby', page=1, page_size=30)), 0)
+        ProductCacheManager.invalidate_product_cache(self.product.pk)
+        self.assertEqual(len(ProductCacheManager.get_category_products('baby', page=1, page_size=30)), 1)
+
+
+class CatalogResponseCacheTestCase(APITestCase):
+    """تست‌های cache پاسخ‌های کاتالوگ و ETag"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='جوراب', description='-', price=30000, category='baby', season='spring',
+        )
+
+    def test_etag_and_not_modified(self):
+        """پاسخ دوم از cache و If-None-Match منطبق با 304 بدون query"""
+        response = self.client.get('/api/products/', {'category': 'baby'})
+        etag = response['ETag']
+        self.assertTrue(etag.startswith('"'))
+        self.assertIn('Authorization', response['Vary'])
+
+        with self.assertNumQueries(0):
+            cached = self.client.get('/api/products/', {'category': 'baby'})
+        self.assertEqual(cached.content, response.content)
+        self.assertEqual(cached['ETag'], etag)
+
+        # ETag لیست برای جزئیات معتبر نیست
+        response = self.client.get(f'/api/products/{self.product.id}/', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with self.assertNumQueries(0):
+            response = self.client.get(
+                '/api/products/', {'category': 'baby'}, HTTP_IF_NONE_MATCH=etag
+            )
+        self.assertEqual(response.status_code, status.HTTP_304_NOT_MODIFIED)
+
+    def test_catalog_change_invalidates(self):
+        """تغییر محصول ETag و بدنه را عوض می‌کند"""
+        url = f'/api/products/{self.product.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product.price = 35000
+            self.product.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(float(response.data['price']), 35000)
+
+    def test_staff_scope(self):
+        """پاسخ ادمین جدا cache می‌شود و private است"""
+        Product.objects.create(
+            name='غیرفعال', description='-', price=1000, category='baby', season='spring',
+            is_active=False,
+        )
+        public = self.client.get('/api/products/')
+        self.assertIn('public', public['Cache-Control'])
+
+        staff = User.objects.create_user(username='staff', password='x', is_staff=True)
+        self.client.force_authenticate(user=staff)
+        response = self.client.get('/api/products/')
+        self.assertIn('private', response['Cache-Control'])
+        self.assertEqual(response.data['count'], 2)
+
+
+class ProductImageVariantsTestCase(APITestCase):
+    """تست‌های نسخه‌های واکنش‌گرای تصاویر"""
+
+    def setUp(self):
+        cache.clear()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root, ignore_errors=True)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def _upload(self, size=(1200, 900)):
+        buffer = io.BytesIO()
+        Image.new('RGB', size, 'pink').save(buffer, 'JPEG')
+        return SimpleUploadedFile('dress.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_variants_generated_on_save(self):
+        """بعد از ذخیره، نسخه‌های WebP و JPEG ساخته و در API برگردانده می‌شوند"""
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='پیراهن', description='-', price=100000, category='girl',
+                season='summer', image=self._upload(),
+            )
+        product.refresh_from_db()
+        self.assertEqual(product.image_variants['v'], [[320, 240], [640, 480], [1024, 768]])
+
+        from .images import derivative_name
+        storage = product.image.storage
+        for fmt in ('webp', 'jpeg'):
+            self.assertTrue(storage.exists(derivative_name(product.image.name, 640, fmt)))
+
+        response = self.client.get(f'/api/products/{product.id}/')
+        image = response.data['image_variants']
+        self.assertEqual((image['width'], image['height']), (1200, 900))
+        self.assertIn('-320w.webp 320w', image['srcset']['webp'])
+        self.assertTrue(image['sources'][0]['jpeg'].startswith('http://testserver/'))
+
+    def test_import_rebuilds_changed_image(self):
+        """تصویر عوض‌شده در import_catalog نسخه‌های تازه می‌گیرد و نسخه‌های قبلی حذف می‌شوند"""
+        from .images import derivative_name
+        with self.captureOnCommitCallbacks(execute=True):
+            product = Product.objects.create(
+                name='پیراهن', description='-', price=100000, category='girl',
+                season='summer', image=self._upload(),
+            )
+        storage = product.image.storage
+        old_image = product.image.name
+        new_image = storage.save('products/new.jpg', self._upload(size=(800, 800)))
+
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as file:
+            file.write(f'product_code,image\n{product.product_code},{new_image}\n')
+        self.addCleanup(os.unlink, file.name)
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('import_catalog', file.name, stdout=io.StringIO(), stderr=io.StringIO())
+
+        product.refresh_from_db()
+        self.assertEqual(product.image.name, new_image)
+        self.assertEqual(product.image_variants['src'], new_image)
+        self.assertTrue(storage.exists(derivative_name(new_image, 640, 'webp')))
+        self.assertFalse(storage.exists(derivative_name(old_image, 640, 'webp')))
+
+    def test_backfill_command(self):
+        """دستور build_image_variants تصاویر بدون نسخه را پردازش می‌کند"""
+        product = Product.objects.create(
+            name='کت', description='-', price=300000, category='boy',
+            season='winter', image=self._upload(size=(500, 500)),
+        )
+        self.assertEqual(product.image_variants, {})
+
+        call_command('build_image_variants', workers=1, stdout=io.StringIO())
+        product.refresh_from_db()
+        # تصویر بزرگ‌تر از اندازه‌ی اصلی نمی‌شود
+        self.assertEqual(product.image_variants['v'], [[320, 320]])
+
+
+class ProductByCategoryTestCase(APITestCase):
+    """تست‌های محصولات هر دسته برای صفحه اصلی"""
+
+    def setUp(self):
+        cache.clear()
+        for category in ('baby', 'girl', 'boy'):
+            for index in range(6):
+                Product.objects.create(
+                    name=f'{category} {index}', description='-', price=50000,
+                    category=category, season='summer',
+                )
+
+    def test_single_query(self):
+        """همه دسته‌ها با یک query و جدیدترین‌ها اول"""
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/by_category/')
+        self.assertEqual(list(response.data), ['baby', 'girl', 'boy'])
+        names = [p['name'] for p in response.data['girl']['products']]
+        self.assertEqual(names, ['girl 5', 'girl 4', 'girl 3', 'girl 2'])
+
+    def test_params(self):
+        """فیلتر دسته‌ها و محدودیت تعداد"""
+        response = self.client.get('/api/products/by_category/', {'categories': 'boy', 'limit': 100})
+        self.assertEqual(list(response.data), ['boy'])
+        self.assertEqual(len(response.data['boy']['products']), 6)
+
+
+class ImportCatalogTestCase(TestCase):
+    """تست‌های دستور import_catalog"""
+
+    CSV = (
+        'product_code,name,description,price,category,season,color,size,variant_price,stock,sku\n'
+        'IMP-1,پیراهن,نخی,100000,girl,summer,pink,2y,,3,\n'
+        'IMP-1,پیراهن,نخی,100000,girl,summer,red,3y,120000,0,\n'
+        ',شلوار,جین,90000,boy,winter,blue,4y,,5,JEAN-4\n'
+        'IMP-2,بد,-,abc,girl,summer,,,,,\n'
+    )
+
+    def _import(self, content, suffix='.csv'):
+        with tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8') as file:
+            file.write(content)
+        self.addCleanup(os.unlink, file.name)
+        out, err = io.StringIO(), io.StringIO()
+        call_command('import_catalog', file.name, batch_size=2, stdout=out, stderr=err)
+        return out.getvalue(), err.getvalue()
+
+    def test_import_and_upsert(self):
+        """درج، رد ردیف نامعتبر، خلاصه‌ها و به‌روزرسانی در اجرای دوم"""
+        out, err = self._import(self.CSV)
+        self.assertIn('خط 5', err)
+        self.assertIn('ردیف در ثانیه', out)
+
+        shirt = Product.objects.get(product_code='IMP-1')
+        self.assertEqual(shirt.variants_count, 2)
+        self.assertEqual((shirt.min_price, shirt.max_price, shirt.total_stock), (100000, 120000, 3))
+        self.assertEqual(shirt.available_colors, ProductVariant.sort_colors(['pink', 'red']))
+        self.assertEqual(
+            sorted(shirt.variants.values_list('sku', flat=True)),
+            [f'{shirt.id}-pink-2y', f'{shirt.id}-red-3y'],
+        )
+        jeans = Product.objects.get(name='شلوار')
+        self.assertTrue(jeans.product_code.startswith('PKP-'))
+
+        # اجرای دوم: به‌روزرسانی بدون ردیف تکراری
+        self._import(
+            '{"product_code": "IMP-1", "name": "پیراهن نو", "price": 110000, "category": "girl", '
+            '"season": "summer", "variants": [{"color": "pink", "size": "2y", "stock": 0}]}\n',
+            suffix='.jsonl',
+        )
+        shirt.refresh_from_db()
+        self.assertEqual(shirt.name, 'پیراهن نو')
+        self.assertEqual(Product.objects.count(), 2)
+        self.assertEqual(ProductVariant.objects.count(), 3)
+        self.assertFalse(shirt.in_stock)
+
+    def test_partial_columns_keep_other_fields(self):
+        """فایلی که فقط قیمت و موجودی دارد توضیحات و تصویر را پاک نمی‌کند"""
+        self._import(
+            'product_code,name,description,price,category,season,image,color,size,stock\n'
+            'IMP-1,پیراهن,نخی,100000,girl,summer,products/shirt.jpg,pink,2y,3\n'
+        )
+        out, err = self._import(
+            'product_code,price,color,size,stock\n'
+            'IMP-1,105000,pink,2y,7\n'
+            'IMP-9,50000,pink,2y,1\n'
+        )
+        shirt = Product.objects.get(product_code='IMP-1')
+        self.assertEqual(
+            (shirt.name, shirt.description, shirt.image.name, shirt.category, shirt.price),
+            ('پیراهن', 'نخی', 'products/shirt.jpg', 'girl', 105000),
+        )
+        self.assertEqual(shirt.total_stock, 7)
+        # محصول جدید بدون ستون‌های لازم رد می‌شود
+        self.assertIn('IMP-9', err)
+        self.assertFalse(Product.objects.filter(product_code='IMP-9').exists())
+
+    def test_variant_upsert_by_combination(self):
+        """تنوع بر اساس (محصول، رنگ، سایز) به‌روز می‌شود؛ sku تکراری فقط همان ردیف را رد می‌کند"""
+        self._import(self.CSV)
+        shirt = Product.objects.get(product_code='IMP-1')
+        out, err = self._import(
+            'product_code,color,size,stock,sku\n'
+            'IMP-1,pink,2y,4,SHIRT-PINK-2\n'
+            'IMP-1,red,3y,9,JEAN-4\n'
+        )
+        self.assertIn('JEAN-4', err)
+        self.assertEqual(
+            list(shirt.variants.order_by('color').values_list('color', 'sku', 'stock', 'price')),
+            [('pink', 'SHIRT-PINK-2', 4, 100000), ('red', f'{shirt.id}-red-3y', 0, 120000)],
+        )
+        self.assertEqual(ProductVariant.objects.count(), 3)
+
+
+class ProductCodeTestCase(TestCase):
+    """تست‌های تخصیص کد محصول"""
+
+    def _product(self, **kwargs):
+        return Product(
+            name='محصول', description='-', price=10000, category='baby', season='summer', **kwargs
+        )
+
+    def test_single_insert(self):
+        """کد قبل از درج معلوم است و ذخیره یک INSERT دارد"""
+        product = self._product()
+        with CaptureQueriesContext(connection) as queries:
+            product.save()
+        writes = [q['sql'] for q in queries if q['sql'].startswith(('INSERT', 'UPDATE "products_product"'))]
+        self.assertEqual(len(writes), 1)
+        self.assertRegex(product.product_code, r'^PKP-\d{5,}$')
+
+    def test_bulk_create_and_backfill(self):
+        """bulk_create کد می‌گیرد و دستور generate_product_codes کدهای خالی را پر می‌کند"""
+        created = Product.objects.bulk_create([self._product(), self._product()])
+        codes = [p.product_code for p in created]
+        self.assertEqual(len(set(codes)), 2)
+
+        Product.objects.filter(pk=Product.objects.first().pk).update(product_code=None)
+        call_command('generate_product_codes', stdout=io.StringIO())
+        self.assertFalse(Product.objects.filter(product_code__isnull=True).exists())
+        self.assertEqual(Product.objects.values('product_code').distinct().count(), 2)
+
+    def test_imported_codes_advance_counter(self):
+        """کد PKP صریح در ورود گروهی شمارنده را جلو می‌برد"""
+        from products.codes import format_product_code, product_code_number
+        first = product_code_number(Product.objects.create(
+            name='محصول', description='-', price=10000, category='baby', season='summer',
+        ).product_code)
+        imported = format_product_code(first + 1)
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8') as file:
+            file.write(f'product_code,name,price,category,season\n{imported},وارداتی,10000,baby,summer\n')
+        self.addCleanup(os.unlink, file.name)
+        call_command('import_catalog', file.name, stdout=io.StringIO(), stderr=io.StringIO())
+
+        product = Product.objects.create(
+            name='بعدی', description='-', price=10000, category='baby', season='summer',
+        )
+        self.assertGreater(product_code_number(product.product_code), first + 1)
+        self.assertTrue(Product.objects.filter(product_code=imported).exists())
+
+
+class BulkVariantsTestCase(APITestCase):
+    """تست‌های ساخت گروهی تنوع‌ها"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='سرهمی', description='-', price=150000, category='baby', season='spring',
+        )
+        ProductVariant.objects.create(product=self.product, color='red', size='2y', price=150000, stock=1)
+        self.url = f'/api/products/{self.product.id}/variants/bulk/'
+
+    def test_admin_creates_missing_combinations(self):
+        """فقط ترکیب‌های ناموجود با یک bulk_create ساخته می‌شوند"""
+        admin_user = User.objects.create_user(username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(user=admin_user)
+
+        response = self.client.post(
+            self.url, {'colors': ['red', 'pink'], 'sizes': ['2y', '3y'], 'stock': 4}, format='json'
+        )
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual((response.data['created'], response.data['skipped']), (3, 1))
+        self.assertEqual(response.data['variants_count'], 4)
+
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.total_stock, 13)
+        self.assertTrue(ProductVariant.objects.filter(sku=f'{self.product.id}-pink-3y').exists())
+
+        response = self.client.post(self.url, {'colors': ['purple-ish'], 'sizes': ['2y']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_admin_action(self):
+        """اکشن ادمین با صفحه‌ی میانی همان ورودی endpoint را می‌گیرد"""
+        admin_user = User.objects.create_superuser(username='admin', password='x')
+        self.client.force_login(admin_user)
+        url = reverse('admin:products_product_changelist')
+        data = {'action': 'complete_variant_matrix', '_selected_action': [self.product.id]}
+
+        response = self.client.post(url, data)
+        self.assertEqual(response.status_code, 200)
+        self.assertTemplateUsed(response, 'admin/products/product/variant_matrix.html')
+        self.assertEqual(self.product.variants.count(), 1)
+
+        response = self.client.post(url, {
+            **data, 'apply': '1', 'colors': ['red', 'blue'], 'sizes': ['2y', '4y'], 'price': 99000, 'stock': 2,
+        }, follow=True)
+        self.assertContains(response, '3 تنوع جدید ساخته شد؛ 1 ترکیب از قبل وجود داشت')
+        variant = ProductVariant.objects.get(product=self.product, color='blue', size='4y')
+        self.assertEqual((variant.price, variant.stock), (99000, 2))
+
+    def test_requires_admin(self):
+        """کاربر عادی دسترسی ندارد"""
+        user = User.objects.create_user(username='user', password='x')
+        self.client.force_authenticate(user=user)
+        response = self.client.post(self.url, {'colors': ['red'], 'sizes': ['3y']}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class CatalogSnapshotTestCase(APITestCase):
+    """تست‌های snapshot ایستای کاتالوگ"""
+
+    def setUp(self):
+        cache.clear()
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root, ignore_errors=True)
+        self.settings_override = override_settings(CATALOG_SNAPSHOT_ROOT=self.root)
+        self.settings_override.enable()
+        self.addCleanup(self.settings_override.disable)
+        self.product = Product.objects.create(
+            name='کلاه', description='-', price=40000, category='baby', season='winter',
+        )
+
+    def _read(self, *parts):
+        import gzip
+        import json
+        import os
+        with gzip.open(os.path.join(self.root, 'current', *parts) + '.gz') as file:
+            return json.loads(file.read())
+
+    def test_build_and_publish(self):
+        """ساخت فایل‌ها، انتشار با symlink و manifest در API"""
+        from .cache import bump_catalog_version, get_catalog_version
+        from .snapshots import build_snapshot
+
+        self.assertEqual(self.client.get('/api/products/snapshot/').status_code, 404)
+        manifest = build_snapshot()
+        self.assertEqual(self._read('products', f'{self.product.id}.json')['name'], 'کلاه')
+        self.assertEqual(self._read('categories', 'baby', 'page-1.json')['count'], 1)
+        self.assertEqual(self._read('featured.json')[0]['id'], self.product.id)
+
+        response = self.client.get('/api/products/snapshot/')
+        self.assertEqual(response.data['version'], manifest['version'])
+
+        # همان نسخه دوباره ساخته نمی‌شود؛ نسخه‌ی جدید جای current را می‌گیرد
+        self.assertEqual(build_snapshot()['built_at'], manifest['built_at'])
+        bump_catalog_version()
+        self.assertNotEqual(build_snapshot()['version'], manifest['version'])
+        self.assertEqual(self._read('manifest.json')['version'], str(get_catalog_version()))
+
+    def test_detail_files_have_no_variant_stock(self):
+        """موجودی تنوع‌ها با فروش کهنه می‌شود و در فایل جزئیات نمی‌آید"""
+        from .snapshots import build_snapshot
+
+        ProductVariant.objects.create(
+            product=self.product, color='red', size='0-3m', price=40000, stock=3
+        )
+        build_snapshot()
+        detail = self._read('products', f'{self.product.id}.json')
+        self.assertTrue(detail['is_in_stock'])
+        self.assertEqual(detail['variants'][0]['color'], 'red')
+        self.assertNotIn('stock', detail['variants'][0])
+        self.assertNotIn('is_in_stock', detail['variants'][0])
+
+
+class RelatedProductsTestCase(APITestCase):
+    """تست‌های «معمولاً با هم خریده می‌شوند»"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='x')
+        self.products = [
+            Product.objects.create(
+                name=f'محصول {index}', description='-', price=50000, category='girl', season='summer',
+            )
+            for index in range(4)
+        ]
+
+    def _order(self, products, payment_status='paid'):
+        from orders.models import Order, OrderItem
+        order = Order.objects.create(
+            user=self.user, total_price=0, payment_status=payment_status, payment_date=timezone.now(),
+        )
+        OrderItem.objects.bulk_create(
+            [OrderItem(order=order, product=product, quantity=1, price=product.price) for product in products]
+        )
+        return order
+
+    def test_co_occurrence_counts_pairs(self):
+        """هر جفت در هر سفارش یک‌بار شمرده می‌شود و سفارش‌های بزرگ کنار گذاشته می‌شوند"""
+        import numpy as np
+        from .recommendations import co_occurrence
+
+        order_ids = np.array([1, 1, 1, 2, 2, 3, 4, 4, 4, 4])
+        product_ids = np.array([10, 20, 30, 10, 20, 10, 10, 20, 30, 40])
+        a, b, counts = co_occurrence(order_ids, product_ids, max_items=3)
+        self.assertEqual(
+            list(zip(a.tolist(), b.tolist(), counts.tolist())),
+            [(10, 20, 2), (10, 30, 1), (20, 30, 1)],
+        )
+
+    def test_incremental_build_and_endpoint(self):
+        """فقط سفارش‌های جدید خوانده می‌شوند؛ endpoint ترتیب رتبه را حفظ و با هم‌دسته‌ها تکمیل می‌کند"""
+        from .models import RelatedProduct
+        from .recommendations import build_recommendations
+
+        first, second, third, fourth = self.products
+        self._order([first, second])
+        self._order([first, second, third])
+        self._order([first, fourth], payment_status='pending')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            result = build_recommendations()
+        self.assertEqual(result['orders'], 2)
+        self.assertEqual(
+            list(RelatedProduct.objects.filter(product=first).values_list('related_id', 'score')),
+            [(second.id, 2), (third.id, 1)],
+        )
+        self.assertEqual(build_recommendations()['orders'], 0)
+
+        self._order([first, third])
+        self._order([first, third])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(build_recommendations()['orders'], 2)
+
+        response = self.client.get(f'/api/products/{first.id}/related/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # سوم (۳ بار)، دوم (۲ بار) و سپس جدیدترین هم‌دسته
+        self.assertEqual([item['id'] for item in response.data], [third.id, second.id, fourth.id])
+
+        Product.objects.filter(pk=third.pk).update(is_active=False)
+        cache.clear()
+        response = self.client.get(f'/api/products/{first.id}/related/', {'limit': 1})
+        self.assertEqual([item['id'] for item in response.data], [second.id])
+
+
+class ProductPopularityTestCase(APITestCase):
+    """تست‌های امتیاز محبوبیت"""
+
+    def setUp(self):
+        cache.clear()
+        self.user = User.objects.create_user(username='buyer', password='x')
+        self.old, self.recent, self.rated, self.new = [
+            Product.objects.create(
+                name=name, description='-', price=50000, category='boy', season='fall',
+            )
+            for name in ('قدیمی', 'پرفروش', 'محبوب', 'جدید')
+        ]
+
+    def _sell(self, product, quantity, days_ago):
+        from orders.models import Order, OrderItem
+        order = Order.objects.create(
+            user=self.user, total_price=0, payment_status='paid',
+            payment_date=timezone.now() - timezone.timedelta(days=days_ago),
+        )
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, price=product.price)
+
+    def test_refresh_and_featured_ordering(self):
+        """فروش اخیر وزن بیشتری دارد و featured و ordering=popularity از ستون ذخیره‌شده می‌خوانند"""
+        from reviews.models import Review
+        from .popularity import refresh_popularity
+
+        self._sell(self.old, 4, days_ago=28)  # دو نیمه‌عمر: ۴ × ۰.۲۵ = ۱
+        self._sell(self.recent, 3, days_ago=0)
+        self._sell(self.old, 50, days_ago=200)  # خارج از بازه
+        Review.objects.create(product=self.rated, user=self.user, rating=5, comment='-')
+        Review.objects.create(
+            product=self.old, user=User.objects.create_user(username='other', password='x'),
+            rating=1, comment='-',
+        )
+
+        self.assertEqual(refresh_popularity(), 3)
+        scores = dict(Product.objects.values_list('name', 'popularity'))
+        self.assertAlmostEqual(scores['پرفروش'], 3.0)
+        # میانگین کل ۳؛ میانگین بیزی (۵×۳+۵)/۶ و (۵×۳+۱)/۶
+        self.assertAlmostEqual(scores['محبوب'], round(2.0 * (20 / 6 - 3), 4))
+        self.assertAlmostEqual(scores['قدیمی'], round(1.0 + 2.0 * (16 / 6 - 3), 4))
+        self.assertEqual(scores['جدید'], 0)
+        self.assertEqual(refresh_popularity(), 0)
+
+        expected = [self.recent.id, self.rated.id, self.old.id, self.new.id]
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/featured/')
+        self.assertEqual([item['id'] for item in response.data], expected)
+
+        response = self.client.get('/api/products/', {'ordering': '-popularity'})
+        self.assertEqual([item['id'] for item in response.data['results']], expected)
+
+
+class ProductBatchTestCase(APITestCase):
+    """تست‌های دریافت گروهی محصولات"""
+
+    def setUp(self):
+        cache.clear()
+        self.products = [
+            Product.objects.create(
+                name=f'محصول {index}', description='-', price=30000, category='baby', season='spring',
+            )
+            for index in range(3)
+        ]
+        ProductVariant.objects.create(product=self.products[0], color='red', size='2y', price=30000, stock=2)
+        self.hidden = Product.objects.create(
+            name='غیرفعال', description='-', price=30000, category='baby', season='spring', is_active=False,
+        )
+
+    def test_requested_order_and_fragment_cache(self):
+        """ترتیب درخواست حفظ می‌شود و درخواست بعدی فقط محصولات غایب را می‌خواند"""
+        first, second, third = self.products
+        ids = f'{third.id},{self.hidden.id},{first.id},{third.id}'
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/batch/', {'ids': ids, 'shape': 'detail'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([item['id'] for item in response.data], [third.id, first.id])
+        self.assertEqual(len(response.data[1]['variants']), 1)
+
+        with self.assertNumQueries(0):
+            response = self.client.get('/api/products/batch/', {'ids': f'{first.id},{third.id}', 'shape': 'detail'})
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/products/batch/', {'ids': f'{second.id},{first.id}'})
+        self.assertEqual([item['id'] for item in response.data], [second.id, first.id])
+        self.assertNotIn('variants', response.data[0])
+
+    def test_invalid_params(self):
+        """شناسه‌ی نامعتبر، بیش از ۵۰ شناسه یا shape نامعتبر"""
+        for params in ({'ids': '1,x'}, {'ids': ','.join(map(str, range(1, 52)))}, {'ids': '1', 'shape': 'full'}, {}):
+            response = self.client.get('/api/products/batch/', params)
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+
+class ProductSparseFieldsetsTestCase(APITestCase):
+    """تست‌های ?fields= و ?omit= روی محصولات"""
+
+    def setUp(self):
+        cache.clear()
+        self.product = Product.objects.create(
+            name='شلوار', description='-', price=90000, category='boy', season='winter',
+        )
+        ProductVariant.objects.create(product=self.product, color='blue', size='4y', price=90000, stock=3)
+        self.url = f'/api/products/{self.product.id}/'
+
+    def test_detail_fields_skip_variant_prefetch(self):
+        """بدون variants، تنوع‌ها prefetch نمی‌شوند"""
+        with self.assertNumQueries(1):
+            response = self.client.get(self.url, {'fields': 'id,name,min_price'})
+        self.assertEqual(set(response.data), {'id', 'name', 'min_price'})
+
+        response = self.client.get(self.url, {'fields': 'id,variants.sku', 'omit': 'id'})
+        self.assertEqual(response.data, {'variants': [{'sku': f'{self.product.id}-blue-4y'}]})
+
+    def test_list_and_featured(self):
+        """فیلدهای لیست و featured جدا از پاسخ کامل cache می‌شوند"""
+        response = self.client.get('/api/products/', {'fields': 'id,name'})
+        self.assertEqual(response.data['results'], [{'id': self.product.id, 'name': 'شلوار'}])
+
+        self.assertIn('image_variants', self.client.get('/api/products/featured/').data[0])
+        response = self.client.get('/api/products/featured/', {'omit': 'image_variants,created_at'})
+        self.assertNotIn('image_variants', response.data[0])
+        self.assertIn('price', response.data[0])
+
+
+class ProductFastSerializationContractTestCase(APITestCase):
+    """قرارداد مسیر سریع: خروجی لیست محصولات بایت‌به‌بایت با ProductListSerializer یکسان است"""
+
+    def setUp(self):
+        cache.clear()
+        self.admin = User.objects.create_user(username='admin', password='x', is_staff=True)
+        for index, (category, season) in enumerate([('baby', 'winter'), ('girl', 'summer'), ('boy', 'fall')]):
+            product = Product.objects.create(
+                name=f'محصول {index}', description='-', price=45000 + index * 1000,
+                category=category, season=season, image=f'products/p{index}.jpg' if index else '',
+            )
+            ProductVariant.objects.create(
+                product=product, color='red', size='2y', price=40000 + index * 5000, stock=index,
+            )
+        Product.objects.filter(name='محصول 1').update(image_variants={
+            'src': 'products/p1.jpg', 'w': 800, 'h': 600, 'v': [[320, 240], [640, 480]],
+        })
+        Product.objects.create(
+            name='غیرفعال', description='-', price=10000, category='baby', season='spring', is_active=False,
+        )
+
+    def assertSameOutput(self, params=None, user=None):
+        from unittest import mock
+        from .fast_serializers import ProductListFastSerializer
+
+        self.client.force_authenticate(user=user)
+        cache.clear()
+        with override_settings(FAST_SERIALIZATION_VIEWS=[]):
+            expected = self.client.get('/api/products/', params)
+        cache.clear()
+        with override_settings(FAST_SERIALIZATION_VIEWS=['products.list']), mock.patch.object(
+            ProductListFastSerializer, 'many', autospec=True, side_effect=ProductListFastSerializer.many,
+        ) as many:
+            response = self.client.get('/api/products/', params)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        many.assert_called_once()
+        self.assertEqual(response.content, expected.content)
+
+    def test_list_contract(self):
+        self.assertSameOutput()
+        self.assertSameOutput({'ordering': 'price', 'season': 'summer'})
+        self.assertSameOutput({'fields': 'id,price,image_variants', 'omit': 'id'})
+        self.assertSameOutput(user=self.admin)
+
+    def test_cursor_contract(self):
+        import json
+        from unittest import mock
+        from urllib.parse import parse_qs, urlparse
+        from .pagination import ProductCursorPagination
+
+        self.enterContext(mock.patch.object(ProductCursorPagination, 'page_size', 2))
+        self.assertSameOutput({'pagination': 'cursor', 'ordering': '-price'})
+        first = json.loads(self.client.get('/api/products/', {'pagination': 'cursor', 'ordering': '-price'}).content)
+        self.assertSameOutput({'cursor': parse_qs(urlparse(first['next']).query)['cursor'][0], 'ordering': '-price'})
+
+
+class ORJSONRendererTestCase(APITestCase):
+    """تست‌های renderer و parser مبتنی بر orjson"""
+
+    def test_render_matches_json_renderer(self):
+        """فارسی بدون escape، Decimal و رشته‌ی lazy مثل JSONRenderer"""
+        from decimal import Decimal
+        from django.utils.translation import gettext_lazy
+        from rest_framework.renderers import JSONRenderer
+        from pokopini.renderers import ORJSONRenderer
+
+        data = {'name': 'پیراهن\u2028', 'price': Decimal('1200.5'), 'label': gettext_lazy('زمستان'), 'ids': [1, 2]}
+        content = ORJSONRenderer().render(data)
+        self.assertEqual(content, JSONRenderer().render(data))
+        self.assertIn('پیراهن'.encode('utf-8'), content)
+        self.assertEqual(ORJSONRenderer().render(None), b'')
+
+    def test_api_uses_orjson(self):
+        """پاسخ‌ها و درخواست‌های JSON از renderer و parser پروژه می‌گذرند"""
+        response = self.client.get('/api/products/colors/')
+        self.assertEqual(response.accepted_renderer.__class__.__name__, 'ORJSONRenderer')
+
+        user = User.objects.create_user(username='admin', password='x', is_staff=True)
+        self.client.force_authenticate(user=user)
+        response = self.client.post('/api/products/', data='{"name": NaN}', content_type='application/json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertIn('JSON parse error', response.data['detail'])
@@ -2,12 +2,28 @@ from rest_framework import viewsets, filters, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly, IsAdminUser
+from django.core.cache import cache
 from django_filters.rest_framework import DjangoFilterBackend
-from .models import Product
-from .serializers import ProductSerializer, ProductListSerializer
+from django_filters.utils import translate_validation
+from pokopini.fast_serializers import FastSerializationMixin
+from pokopini.serializers import is_field_requested, sparse_fieldsets
+from .cache import (
+    CATALOG_CACHE_TIMEOUT, cache_catalog_response, catalog_cache_key, get_stock_versions,
+)
+from .facets import get_facets, normalize_facet_params
+from .fast_serializers import COLOR_LABELS, SIZE_LABELS, ProductListFastSerializer
+from .filters import ProductFilter
+from .models import Product, RelatedProduct
+from .pagination import ProductCursorPagination
+from .search import ProductSearchFilter
+from .serializers import (
+    ProductSerializer, ProductListSerializer, ProductBatchSerializer, VariantMatrixSerializer,
+)
+from .snapshots import read_manifest
+from .suggest import suggest_index
 
 
-class ProductViewSet(viewsets.ModelViewSet):
+class ProductViewSet(FastSerializationMixin, viewsets.ModelViewSet):
     """
     ViewSet برای مدیریت محصولات
     - خواندن برای همه
@@ -15,90 +31,300 @@ class ProductViewSet(viewsets.ModelViewSet):
     """
     queryset = Product.objects.all()
     permission_classes = [IsAuthenticatedOrReadOnly]
-    filter_backends = [DjangoFilterBackend, filters.SearchFilter, filters.OrderingFilter]
-    filterset_fields = ['category', 'season']
+    # جستجو بعد از ordering اعمال می‌شود تا بدون ordering صریح، بر اساس رتبه مرتب شود
+    filter_backends = [DjangoFilterBackend, filters.OrderingFilter, ProductSearchFilter]
+    filterset_class = ProductFilter
     search_fields = ['name', 'description']
-    ordering_fields = ['price', 'created_at', 'name']
+    ordering_fields = ['price', 'created_at', 'name', 'popularity']
     ordering = ['-created_at']
 
+    # actionهایی که با ProductListSerializer خروجی می‌دهند
+    list_actions = ['list', 'featured', 'by_category', 'related']
+    by_category_max_limit = 12
+    related_max_limit = 20
+
     def get_queryset(self):
         """
         برای ادمین همه محصولات، برای کاربران عادی فقط محصولات فعال
-        با بهینه‌سازی برای کاهش تعداد queries
+        با برنامه‌ی query جداگانه برای هر action
         """
-        queryset = Product.objects.select_related().prefetch_related('reviews', 'variants')
-        
-        if self.request.user.is_staff:
+        queryset = Product.objects.all()
+        if not self.request.user.is_staff:
+            queryset = queryset.filter(is_active=True)
+
+        if self.action in self.list_actions:
+            return self.get_list_queryset(queryset)
+        if self.action in ('facets', 'bulk_variants', 'batch'):
             return queryset
-        return queryset.filter(is_active=True)
+        return queryset.for_detail(variants=is_field_requested(self.request, 'variants'))
+
+    def get_list_queryset(self, queryset):
+        """
+        لیست: فقط ستون‌های لازم و بدون prefetch؛ تعداد queries ثابت است.
+        ادمین محصولات غیرفعال را هم می‌بیند، پس آمار تنوع‌ها به‌صورت زنده محاسبه می‌شود
+        """
+        queryset = queryset.for_list()
+        stats_requested = any(
+            is_field_requested(self.request, field)
+            for field in ProductListSerializer.VARIANT_STATS_ANNOTATIONS
+        )
+        if self.request.user.is_staff and stats_requested:
+            queryset = queryset.with_variant_stats()
+        return queryset
+
+    @cache_catalog_response
+    def list(self, request, *args, **kwargs):
+        if self.use_fast_serialization('products.list'):
+            return self.fast_list(request)
+        return super().list(request, *args, **kwargs)
+
+    def fast_list(self, request):
+        """
+        list با ردیف‌های .values() و ProductListFastSerializer؛ خروجی همان مسیر عادی است
+        """
+        queryset = self.filter_queryset(self.get_queryset())
+        fast = ProductListFastSerializer(self.get_serializer().fields, request)
+        extra = ()
+        if isinstance(self.paginator, ProductCursorPagination):
+            # مقدار فیلد keyset برای ساخت cursor
+            extra = (self.paginator.get_ordering(queryset, self).lstrip('-'),)
+        rows = fast.values(queryset, extra)
+        page = self.paginate_queryset(rows)
+        if page is not None:
+            return self.get_paginated_response(fast.many(page))
+        return Response(fast.many(rows))
+
+    @cache_catalog_response
+    def retrieve(self, request, *args, **kwargs):
+        return super().retrieve(request, *args, **kwargs)
+
+    @property
+    def paginator(self):
+        """صفحه‌بندی cursor برای اسکرول بی‌پایان لیست محصولات (اختیاری)"""
+        if (
+            not hasattr(self, '_paginator')
+            and self.action == 'list'
+            and ProductCursorPagination.is_requested(self.request)
+        ):
+            self._paginator = ProductCursorPagination()
+        return super().paginator
 
     def get_permissions(self):
         """
         تنظیم دسترسی‌ها
         """
-        if self.action in ['create', 'update', 'partial_update', 'destroy']:
+        if self.action in ['create', 'update', 'partial_update', 'destroy', 'bulk_variants']:
             return [IsAdminUser()]
         return [IsAuthenticatedOrReadOnly()]
 
     def get_serializer_class(self):
         """استفاده از serializer مناسب بر اساس action"""
-        if self.action == 'list':
+        if self.action in ('list', 'related'):
             return ProductListSerializer
         return ProductSerializer
 
+    @action(detail=True, methods=['post'], url_path='variants/bulk')
+    def bulk_variants(self, request, pk=None):
+        """
+        ساخت گروهی تنوع‌ها (فقط ادمین): ترکیب‌های رنگ × سایزی که وجود ندارند
+        با قیمت و موجودی پیش‌فرض ساخته می‌شوند
+        """
+        product = self.get_object()
+        serializer = VariantMatrixSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        created, skipped = product.create_variant_matrix(**serializer.validated_data)
+        return Response(
+            {'created': created, 'skipped': skipped, 'variants_count': product.variants_count},
+            status=status.HTTP_201_CREATED if created else status.HTTP_200_OK,
+        )
+
     @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def featured(self, request):
         """
         محصولات ویژه برای صفحه اصلی
-        (۸ محصول جدید) با caching
-        """
-        from django.core.cache import cache
-        
-        cache_key = 'featured_products'
-        products = cache.get(cache_key)
-        
-        if products is None:
-            products = list(self.get_queryset().order_by('-created_at')[:8])
-            cache.set(cache_key, products, 300)  # Cache for 5 minutes
-        
-        serializer = ProductListSerializer(products, many=True)
-        return Response(serializer.data)
+        (۸ محصول محبوب بر اساس ستون popularity، برای تساوی جدیدترها) با cache نسخه‌دار کاتالوگ
+        """
+        products = self.get_queryset().order_by('-popularity', '-created_at')[:8]
+        return Response(ProductListSerializer(products, many=True, **sparse_fieldsets(request)).data)
+
+    @action(detail=False, methods=['get'])
+    def batch(self, request):
+        """
+        دریافت گروهی محصولات به ترتیب درخواست (بازدیدهای اخیر، سبد خرید)
+        پارامترها: ids=1,5,9 (حداکثر ۵۰) و shape=list|detail
+        هر محصول جداگانه در cache نسخه‌دار کاتالوگ نگه داشته می‌شود و فقط
+        محصولات غایب با یک query (و برای detail یک prefetch تنوع‌ها) خوانده می‌شوند.
+        شناسه‌های ناموجود یا غیرفعال در خروجی نیستند
+        """
+        params = ProductBatchSerializer(data=request.query_params)
+        params.is_valid(raise_exception=True)
+        ids, shape = params.validated_data['ids'], params.validated_data['shape']
+
+        scope = 'staff' if request.user.is_staff else 'public'
+        # خروجی detail موجودی تنوع‌ها را دارد، پس نسخه‌ی موجودی محصول هم جزو کلید است
+        stock_versions = get_stock_versions(ids) if shape == 'detail' else {}
+        # آدرس تصاویر مطلق است، پس host هم جزو کلید است
+        keys = {
+            pk: catalog_cache_key(
+                f'product-{shape}', scope, request.scheme, request.get_host(),
+                sorted(sparse_fieldsets(request).items()), pk, stock_versions.get(pk),
+            )
+            for pk in ids
+        }
+        cached = cache.get_many(keys.values())
+        fragments = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+        missing = [pk for pk in ids if pk not in fragments]
+        if missing:
+            queryset = self.get_queryset().filter(pk__in=missing)
+            if shape == 'detail':
+                queryset = queryset.for_detail(variants=is_field_requested(request, 'variants'))
+                serializer_class = ProductSerializer
+            else:
+                queryset, serializer_class = self.get_list_queryset(queryset), ProductListSerializer
+            context = self.get_serializer_context()
+            loaded = {
+                product.pk: serializer_class(product, context=context).data
+                for product in queryset
+            }
+            cache.set_many({keys[pk]: data for pk, data in loaded.items()}, CATALOG_CACHE_TIMEOUT)
+            fragments.update(loaded)
+
+        return Response([fragments[pk] for pk in ids if pk in fragments])
 
     @action(detail=False, methods=['get'])
+    def snapshot(self, request):
+        """
+        manifest آخرین snapshot ایستای کاتالوگ (نسخه و آدرس پایه‌ی فایل‌ها)
+        """
+        manifest = read_manifest()
+        if manifest is None:
+            return Response({'detail': 'snapshot منتشر نشده است'}, status=status.HTTP_404_NOT_FOUND)
+        response = Response(manifest)
+        response['Cache-Control'] = 'no-cache'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        پیشنهاد خودکار برای جعبه جستجو از ایندکس درون‌پردازه‌ای (بدون query دیتابیس)
+        """
+        query = request.query_params.get('q', '').strip()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), 20)
+        except ValueError:
+            limit = 8
+        if not query:
+            return Response([])
+
+        suggest_index.ensure_fresh()
+        storage = Product._meta.get_field('image').storage
+        result = [
+            {
+                'id': entry['id'],
+                'name': entry['name'],
+                'product_code': entry['product_code'],
+                'image': request.build_absolute_uri(storage.url(entry['image'])) if entry['image'] else None,
+            }
+            for entry in suggest_index.search(query, limit=limit)
+        ]
+        return Response(result)
+
+    @action(detail=False, methods=['get'])
+    def facets(self, request):
+        """
+        شمارش محصولات برای همه گزینه‌های فیلتر (دسته، فصل، رنگ، سایز، قیمت، موجودی)
+        با همان فیلترهای لیست محصولات
+        """
+        params = normalize_facet_params(request.query_params)
+        filterset = ProductFilter(params, queryset=Product.objects.none())
+        if not filterset.is_valid():
+            raise translate_validation(filterset.errors)
+
+        queryset = ProductSearchFilter().filter_queryset(request, self.get_queryset(), self)
+        return Response(get_facets(queryset, params, is_staff=request.user.is_staff))
+
+    @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def by_category(self, request):
         """
-        دسته‌بندی محصولات بر اساس category
+        جدیدترین محصولات هر دسته برای صفحه اصلی در یک query
+        پارامترها: categories (لیست با کاما، پیش‌فرض همه) و limit (پیش‌فرض ۴، حداکثر ۱۲)
         """
-        categories = Product.CATEGORY_CHOICES
-        result = {}
-        
-        for category_code, category_name in categories:
-            products = self.get_queryset().filter(category=category_code)[:4]
-            result[category_code] = {
-                'name': category_name,
-                'products': ProductListSerializer(products, many=True).data
+        category_names = dict(Product.CATEGORY_CHOICES)
+        requested = [
+            code for code in request.query_params.get('categories', '').split(',') if code
+        ]
+        categories = [code for code in category_names if not requested or code in requested]
+        try:
+            limit = min(max(int(request.query_params.get('limit', 4)), 1), self.by_category_max_limit)
+        except ValueError:
+            limit = 4
+
+        sparse = sparse_fieldsets(request)
+        grouped = {code: [] for code in categories}
+        for product in self.get_queryset().top_per_category(limit, categories):
+            grouped[product.category].append(product)
+
+        result = {
+            code: {
+                'name': category_names[code],
+                'products': ProductListSerializer(products, many=True, **sparse).data,
             }
-        
+            for code, products in grouped.items()
+        }
         return Response(result)
 
+    @action(detail=True, methods=['get'])
+    @cache_catalog_response
+    def related(self, request, pk=None):
+        """
+        محصولاتی که معمولاً با این محصول خریده می‌شوند (products/recommendations.py)
+        اگر داده‌ی هم‌خریدی کافی نباشد، با جدیدترین محصولات همان دسته تکمیل می‌شود
+        پارامتر: limit (پیش‌فرض ۸، حداکثر ۲۰)
+        """
+        product = self.get_object()
+        try:
+            limit = min(max(int(request.query_params.get('limit', 8)), 1), self.related_max_limit)
+        except ValueError:
+            limit = 8
+
+        queryset = self.get_queryset()
+        related_ids = list(
+            RelatedProduct.objects.filter(product=product)
+            .order_by('rank').values_list('related_id', flat=True)
+        )
+        # محصولات غیرفعال با فیلتر get_queryset حذف می‌شوند و ترتیب رتبه حفظ می‌شود
+        found = {item.pk: item for item in queryset.filter(pk__in=related_ids)}
+        products = [found[pk] for pk in related_ids if pk in found][:limit]
+
+        if len(products) < limit:
+            products += list(
+                queryset.filter(category=product.category)
+                .exclude(pk__in=[product.pk] + [item.pk for item in products])
+                .order_by('-created_at', '-id')[:limit - len(products)]
+            )
+        return Response(self.get_serializer(products, many=True).data)
+
     @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def colors(self, request):
         """
         لیست رنگ‌های موجود از variants با نمایش فارسی
         """
         from .models import ProductVariant
         colors = ProductVariant.objects.filter(is_active=True).values_list('color', flat=True).distinct()
-        color_choices = dict(ProductVariant.COLOR_CHOICES)
-        result = [{'value': c, 'label': color_choices.get(c, c)} for c in colors if c]
+        result = [{'value': c, 'label': COLOR_LABELS.get(c, c)} for c in colors if c]
         return Response(result)
 
     @action(detail=False, methods=['get'])
+    @cache_catalog_response
     def sizes(self, request):
         """
         لیست سایزهای موجود از variants با نمایش فارسی
         """
         from .models import ProductVariant
         sizes = ProductVariant.objects.filter(is_active=True).values_list('size', flat=True).distinct()
-        size_choices = dict(ProductVariant.SIZE_CHOICES)
-        result = [{'value': s, 'label': size_choices.get(s, s)} for s in sizes if s]
+        result = [{'value': s, 'label': SIZE_LABELS.get(s, s)} for s in sizes if s]
         return Response(result)
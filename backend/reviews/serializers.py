@@ -1,9 +1,10 @@
 from rest_framework import serializers
+from pokopini.serializers import SparseFieldsetsMixin
 from .models import Review
 from orders.models import OrderItem
 
 
-class ReviewSerializer(serializers.ModelSerializer):
+class ReviewSerializer(SparseFieldsetsMixin, serializers.ModelSerializer):
     """
     Serializer برای نظرات
     """
@@ -0,0 +1,13 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from products.cache import bump_catalog_version
+from .models import Review
+
+
+@receiver(post_save, sender=Review)
+@receiver(post_delete, sender=Review)
+def bump_catalog_version_on_review_change(sender, instance, using, **kwargs):
+    """نظرات در امتیاز محصولات اثر دارند - افزایش نسخه‌ی کاتالوگ بعد از commit"""
+    transaction.on_commit(bump_catalog_version, using=using)
@@ -2,6 +2,7 @@ from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import IsAuthenticatedOrReadOnly
+from pokopini.serializers import is_field_requested
 from .models import Review
 from .serializers import ReviewSerializer
 from .permissions import IsOwnerOrReadOnly
@@ -16,7 +17,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
 
     def get_queryset(self):
         """فیلتر نظرات بر اساس محصول"""
-        queryset = Review.objects.select_related('user', 'product')
+        queryset = self.with_related(Review.objects.all())
         product_id = self.request.query_params.get('product_id')
         
         if product_id:
@@ -24,6 +25,17 @@ class ReviewViewSet(viewsets.ModelViewSet):
         
         return queryset
 
+    def with_related(self, queryset):
+        """join کاربر و محصول فقط وقتی فیلدهای نام آن‌ها در خروجی خواسته شده باشد"""
+        related = [
+            name for name, fields in (
+                ('user', ('user_username', 'user_first_name')),
+                ('product', ('product_name',)),
+            )
+            if any(is_field_requested(self.request, field) for field in fields)
+        ]
+        return queryset.select_related(*related) if related else queryset
+
     def perform_create(self, serializer):
         """ذخیره نظر با کاربر فعلی"""
         serializer.save(user=self.request.user)
@@ -33,7 +45,7 @@ class ReviewViewSet(viewsets.ModelViewSet):
         """
         دریافت نظرات یک محصول خاص
         """
-        reviews = Review.objects.filter(product_id=product_id).select_related('user', 'product')
+        reviews = self.with_related(Review.objects.filter(product_id=product_id))
         serializer = self.get_serializer(reviews, many=True)
         
         # محاسبه میانگین امتیاز
@@ -53,6 +65,6 @@ class ReviewViewSet(viewsets.ModelViewSet):
         """
         دریافت نظرات خود کاربر
         """
-        reviews = Review.objects.filter(user=request.user).select_related('product')
+        reviews = self.with_related(Review.objects.filter(user=request.user))
         serializer = self.get_serializer(reviews, many=True)
         return Response(serializer.data)
@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# مقایسه‌ی سرعت JSONRenderer/JSONParser پیش‌فرض DRF با نسخه‌ی orjson روی داده‌های واقعی
+#
+# استفاده (از پوشه‌ی backend):
+#   python scripts/benchmark_renderers.py --products 200 --orders 100 --repeat 50
+#
+# داده‌ها از دیتابیس تنظیم‌شده خوانده و با همان serializerهای API ساخته می‌شوند:
+# لیست محصولات، جزئیات محصول با تنوع‌ها و سفارش‌ها با اقلام تو در تو.
+
+import argparse
+import io
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'pokopini.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from rest_framework.parsers import JSONParser  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from orders.models import Order  # noqa: E402
+from orders.serializers import OrderSerializer  # noqa: E402
+from pokopini.parsers import ORJSONParser  # noqa: E402
+from pokopini.renderers import ORJSONRenderer  # noqa: E402
+from products.models import Product  # noqa: E402
+from products.serializers import ProductListSerializer, ProductSerializer  # noqa: E402
+
+
+def fixtures(products, orders):
+    """payloadهای واقعی API از دیتابیس"""
+    queryset = Product.objects.filter(is_active=True).order_by('-created_at')
+    return {
+        'product list': ProductListSerializer(queryset.for_list()[:products], many=True).data,
+        'product detail': ProductSerializer(queryset.for_detail()[:products], many=True).data,
+        'orders': OrderSerializer(
+            Order.objects.select_related('user').prefetch_related('items__product')[:orders], many=True
+        ).data,
+    }
+
+
+def bench(function, repeat):
+    """کمترین زمان یک اجرا به میلی‌ثانیه"""
+    return min(timeit.repeat(function, number=1, repeat=repeat)) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description='مقایسه‌ی JSONRenderer و ORJSONRenderer')
+    parser.add_argument('--products', type=int, default=200)
+    parser.add_argument('--orders', type=int, default=100)
+    parser.add_argument('--repeat', type=int, default=50)
+    options = parser.parse_args()
+
+    payloads = fixtures(options.products, options.orders)
+    stock_renderer, fast_renderer = JSONRenderer(), ORJSONRenderer()
+    stock_parser, fast_parser = JSONParser(), ORJSONParser()
+
+    print(f"{'payload':<16}{'items':>7}{'KB':>9}{'render':>20}{'parse':>20}")
+    for name, data in payloads.items():
+        if not data:
+            print(f'{name:<16}  بدون داده - ابتدا import_catalog یا داده‌ی نمونه را وارد کنید')
+            continue
+        content = stock_renderer.render(data)
+        if fast_renderer.render(data) != content:
+            print(f'  ⚠ خروجی {name} با JSONRenderer یکسان نیست')
+
+        render = (
+            bench(lambda: stock_renderer.render(data), options.repeat),
+            bench(lambda: fast_renderer.render(data), options.repeat),
+        )
+        parse = (
+            bench(lambda: stock_parser.parse(io.BytesIO(content)), options.repeat),
+            bench(lambda: fast_parser.parse(io.BytesIO(content)), options.repeat),
+        )
+        print(
+            f'{name:<16}{len(data):>7}{len(content) / 1024:>9.1f}'
+            f'{render[0]:>9.2f}→{render[1]:.2f}ms (×{render[0] / render[1]:.1f})'
+            f'{parse[0]:>6.2f}→{parse[1]:.2f}ms (×{parse[0] / parse[1]:.1f})'
+        )
+
+
+if __name__ == '__main__':
+    main()
@@ -1,13 +1,23 @@
 import React, { useState, useEffect } from 'react';
 import { imageUtils, priceUtils } from '../utils';
+import productService from '../services/productService';
 
 const RecentlyViewed = () => {
   const [recentProducts, setRecentProducts] = useState([]);
 
   useEffect(() => {
     // دریافت محصولات اخیراً مشاهده شده از localStorage
-    const viewed = JSON.parse(localStorage.getItem('recentlyViewed') || '[]');
-    setRecentProducts(viewed.slice(0, 4)); // نمایش 4 محصول آخر
+    const viewed = JSON.parse(localStorage.getItem('recentlyViewed') || '[]').slice(0, 4); // نمایش 4 محصول آخر
+    setRecentProducts(viewed);
+
+    // به‌روزرسانی قیمت و تصویر با یک درخواست گروهی؛ محصولات حذف‌شده کنار می‌روند
+    productService.getProductsBatch(viewed.map(product => product.id))
+      .then(products => {
+        if (products.length) {
+          setRecentProducts(products);
+        }
+      })
+      .catch(() => {});
   }, []);
 
   if (recentProducts.length === 0) {
@@ -118,17 +118,9 @@ export const CartProvider = ({ children }) => {
   const { isAuthenticated } = useAuth();
 
   // بارگذاری سبد خرید هنگام mount یا تغییر وضعیت احراز هویت
+  // مهمان‌ها هم سبد سروری دارند (کوکی guest_cart) که هنگام ورود در سبد کاربر ادغام می‌شود
   useEffect(() => {
-    if (isAuthenticated) {
-      fetchCart();
-    } else {
-      // برای کاربران غیر احراز هویت شده، سبد خرید را از localStorage بارگذاری کن
-      const localCart = cartService.getCartFromLocal();
-      dispatch({
-        type: CART_ACTIONS.FETCH_CART_SUCCESS,
-        payload: { items: localCart },
-      });
-    }
+    fetchCart();
   }, [isAuthenticated]);
 
   // تابع دریافت سبد خرید
@@ -172,45 +164,23 @@ export const CartProvider = ({ children }) => {
   };
 
   // تابع افزودن به سبد خرید
-  const addToCart = async (productId, quantity = 1) => {
+  const addToCart = async (productId, quantity = 1, variantId = null) => {
     dispatch({ type: CART_ACTIONS.ADD_TO_CART_START });
 
     try {
-      if (isAuthenticated) {
-        // برای کاربران احراز هویت شده، از API استفاده کن
-        const cartData = await cartService.addToCart(productId, quantity);
-        
-        // اگر response شامل items بود، از اون استفاده کن
-        if (cartData && cartData.items) {
-          dispatch({
-            type: CART_ACTIONS.ADD_TO_CART_SUCCESS,
-            payload: cartData,
-          });
-        } else {
-          // در غیر این صورت، سبد خرید رو دوباره fetch کن
-          await fetchCart();
-        }
-        return cartData;
-      } else {
-        // برای کاربران غیر احراز هویت شده، در localStorage ذخیره کن
-        const localCart = cartService.getCartFromLocal();
-        const existingItemIndex = localCart.findIndex(
-          item => item.product_id === productId
-        );
+      const cartData = await cartService.addToCart(productId, quantity, variantId);
 
-        if (existingItemIndex > -1) {
-          localCart[existingItemIndex].quantity += quantity;
-        } else {
-          localCart.push({ product_id: productId, quantity });
-        }
-
-        cartService.saveCartToLocal(localCart);
+      // اگر response شامل items بود، از اون استفاده کن
+      if (cartData && cartData.items) {
         dispatch({
           type: CART_ACTIONS.ADD_TO_CART_SUCCESS,
-          payload: { items: localCart },
+          payload: cartData,
         });
-        return { items: localCart };
+      } else {
+        // در غیر این صورت، سبد خرید رو دوباره fetch کن
+        await fetchCart();
       }
+      return cartData;
     } catch (error) {
       const errorMessage = error.message || 'خطا در افزودن به سبد خرید';
       dispatch({
@@ -230,31 +200,12 @@ export const CartProvider = ({ children }) => {
     dispatch({ type: CART_ACTIONS.UPDATE_QUANTITY_START });
 
     try {
-      if (isAuthenticated) {
-        // برای کاربران احراز هویت شده، از API استفاده کن
-        const cartData = await cartService.updateCartItem(itemId, quantity);
-        dispatch({
-          type: CART_ACTIONS.UPDATE_QUANTITY_SUCCESS,
-          payload: cartData,
-        });
-        return cartData;
-      } else {
-        // برای کاربران غیر احراز هویت شده، در localStorage به‌روزرسانی کن
-        const localCart = cartService.getCartFromLocal();
-        const itemIndex = localCart.findIndex(item => item.product_id === itemId);
-
-        if (itemIndex > -1) {
-          localCart[itemIndex].quantity = quantity;
-          cartService.saveCartToLocal(localCart);
-          dispatch({
-            type: CART_ACTIONS.UPDATE_QUANTITY_SUCCESS,
-            payload: { items: localCart },
-          });
-          return { items: localCart };
-        } else {
-          throw new Error('محصول در سبد خرید یافت نشد');
-        }
-      }
+      const cartData = await cartService.updateCartItem(itemId, quantity);
+      dispatch({
+        type: CART_ACTIONS.UPDATE_QUANTITY_SUCCESS,
+        payload: cartData,
+      });
+      return cartData;
     } catch (error) {
       const errorMessage = error.message || 'خطا در به‌روزرسانی تعداد';
       dispatch({
@@ -270,25 +221,12 @@ export const CartProvider = ({ children }) => {
     dispatch({ type: CART_ACTIONS.REMOVE_FROM_CART_START });
 
     try {
-      if (isAuthenticated) {
-        // برای کاربران احراز هویت شده، از API استفاده کن
-        const cartData = await cartService.removeFromCart(itemId);
-        dispatch({
-          type: CART_ACTIONS.REMOVE_FROM_CART_SUCCESS,
-          payload: cartData,
-        });
-        return cartData;
-      } else {
-        // برای کاربران غیر احراز هویت شده، از localStorage حذف کن
-        const localCart = cartService.getCartFromLocal();
-        const filteredCart = localCart.filter(item => item.product_id !== itemId);
-        cartService.saveCartToLocal(filteredCart);
-        dispatch({
-          type: CART_ACTIONS.REMOVE_FROM_CART_SUCCESS,
-          payload: { items: filteredCart },
-        });
-        return { items: filteredCart };
-      }
+      const cartData = await cartService.removeFromCart(itemId);
+      dispatch({
+        type: CART_ACTIONS.REMOVE_FROM_CART_SUCCESS,
+        payload: cartData,
+      });
+      return cartData;
     } catch (error) {
       const errorMessage = error.message || 'خطا در حذف از سبد خرید';
       dispatch({
@@ -304,19 +242,10 @@ export const CartProvider = ({ children }) => {
     dispatch({ type: CART_ACTIONS.CLEAR_CART_START });
 
     try {
-      if (isAuthenticated) {
-        // برای کاربران احراز هویت شده، از API استفاده کن
-        await cartService.clearCart();
-        dispatch({
-          type: CART_ACTIONS.CLEAR_CART_SUCCESS,
-        });
-      } else {
-        // برای کاربران غیر احراز هویت شده، localStorage را پاک کن
-        cartService.clearLocalCart();
-        dispatch({
-          type: CART_ACTIONS.CLEAR_CART_SUCCESS,
-        });
-      }
+      await cartService.clearCart();
+      dispatch({
+        type: CART_ACTIONS.CLEAR_CART_SUCCESS,
+      });
     } catch (error) {
       const errorMessage = error.message || 'خطا در خالی کردن سبد خرید';
       dispatch({
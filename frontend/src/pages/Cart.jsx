@@ -153,7 +153,7 @@ const Cart = () => {
                           </div>
                           <div className="mt-2">
                             <span className="text-lg font-semibold text-gray-900">
-                              {priceUtils.formatPersianPrice(item.product?.price || 0)}
+                              {priceUtils.formatPersianPrice(item.unit_price || item.product?.price || 0)}
                             </span>
                           </div>
                         </div>
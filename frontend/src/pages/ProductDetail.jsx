@@ -63,7 +63,11 @@ const ProductDetail = () => {
 
     try {
       setAddingToCart(true);
-      await addToCart(product.id, quantity);
+      // تنوع متناظر با رنگ و سایز انتخاب‌شده (قیمت و موجودی سبد از همین تنوع است)
+      const variant = (product.variants || []).find(
+        v => v.color_display === selectedColor && v.size_display === `${selectedSize} سال`
+      );
+      await addToCart(product.id, quantity, variant ? variant.id : null);
       alert('محصول به سبد خرید اضافه شد');
     } catch (err) {
       console.error('خطا در افزودن به سبد:', err);
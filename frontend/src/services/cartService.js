@@ -12,10 +12,12 @@ const cartService = {
   },
 
   // افزودن محصول به سبد خرید
-  addToCart: async (productId, quantity = 1) => {
+  addToCart: async (productId, quantity = 1, variantId = null) => {
     try {
       const response = await apiRequest.post('/orders/cart/add/', {
         product_id: productId,
+        // رنگ و سایز انتخاب‌شده؛ بدون آن سرور تنوع پیش‌فرض محصول را انتخاب می‌کند
+        ...(variantId ? { variant_id: variantId } : {}),
         quantity: quantity,
       });
       return response.data;
@@ -60,7 +62,7 @@ const cartService = {
   calculateTotal: (cartItems) => {
     if (!cartItems || !Array.isArray(cartItems)) return 0;
     return cartItems.reduce((total, item) => {
-      const price = item.product?.price || item.price || 0;
+      const price = Number(item.unit_price || item.product?.price || item.price || 0);
       const quantity = item.quantity || 0;
       return total + (price * quantity);
     }, 0);
@@ -134,14 +136,24 @@ const cartService = {
     localStorage.removeItem('guest_cart');
   },
 
-  // انتقال سبد خرید محلی به سرور (هنگام ورود)
+  // ادغام سبد مهمان (کوکی) در سبد کاربر؛ ورود و ثبت‌نام این کار را خودکار انجام می‌دهند
+  mergeGuestCart: async () => {
+    try {
+      const response = await apiRequest.post('/orders/cart/merge/');
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
+  // انتقال سبد خرید محلی قدیمی (localStorage) به سرور (هنگام ورود)
   syncLocalCartToServer: async () => {
     try {
       const localCart = cartService.getCartFromLocal();
       
       if (localCart.length > 0) {
         const promises = localCart.map(item => 
-          cartService.addToCart(item.product_id, item.quantity)
+          cartService.addToCart(item.product_id, item.quantity, item.variant_id)
         );
         
         await Promise.all(promises);
@@ -33,6 +33,21 @@ const productService = {
     }
   },
 
+  // دریافت گروهی محصولات با یک درخواست (حداکثر ۵۰ شناسه، به همان ترتیب)
+  getProductsBatch: async (productIds, shape = 'list') => {
+    try {
+      if (!productIds.length) {
+        return [];
+      }
+      const response = await apiRequest.get(
+        `/products/batch/?ids=${productIds.join(',')}&shape=${shape}`
+      );
+      return response.data;
+    } catch (error) {
+      throw error;
+    }
+  },
+
   // دریافت محصولات ویژه
   getFeaturedProducts: async () => {
     try {